@@ -0,0 +1,68 @@
+"""hot_path_indexes
+
+Revision ID: 7c2e9a41d5b3
+Revises: 43eb54068552
+Create Date: 2026-10-16 09:00:00.000000
+
+"""
+
+from collections.abc import Sequence
+
+import sqlalchemy as sa
+
+from alembic import op
+
+# revision identifiers, used by Alembic.
+revision: str = "7c2e9a41d5b3"
+down_revision: str | Sequence[str] | None = "43eb54068552"
+branch_labels: str | Sequence[str] | None = None
+depends_on: str | Sequence[str] | None = None
+
+ACTIVE_PRODUCT_WHERE = sa.text("status = 'ACTIVE' AND deleted_at IS NULL")
+PENDING_ALERT_WHERE = sa.text("is_active AND NOT is_triggered AND deleted_at IS NULL")
+
+
+def upgrade() -> None:
+    """Upgrade schema."""
+    with op.batch_alter_table("products", schema=None) as batch_op:
+        batch_op.create_index(
+            "ix_products_status_active",
+            ["status"],
+            unique=False,
+            sqlite_where=ACTIVE_PRODUCT_WHERE,
+            postgresql_where=ACTIVE_PRODUCT_WHERE,
+        )
+
+    with op.batch_alter_table("alerts", schema=None) as batch_op:
+        batch_op.create_index(
+            "ix_alerts_active_untriggered",
+            ["product_id"],
+            unique=False,
+            sqlite_where=PENDING_ALERT_WHERE,
+            postgresql_where=PENDING_ALERT_WHERE,
+        )
+
+    with op.batch_alter_table("price_history", schema=None) as batch_op:
+        batch_op.create_index(
+            "ix_price_history_product_scraped", ["product_id", "scraped_at"], unique=False
+        )
+
+    with op.batch_alter_table("scrape_logs", schema=None) as batch_op:
+        batch_op.create_index(
+            "ix_scrape_logs_product_scraped", ["product_id", "scraped_at"], unique=False
+        )
+
+
+def downgrade() -> None:
+    """Downgrade schema."""
+    with op.batch_alter_table("scrape_logs", schema=None) as batch_op:
+        batch_op.drop_index("ix_scrape_logs_product_scraped")
+
+    with op.batch_alter_table("price_history", schema=None) as batch_op:
+        batch_op.drop_index("ix_price_history_product_scraped")
+
+    with op.batch_alter_table("alerts", schema=None) as batch_op:
+        batch_op.drop_index("ix_alerts_active_untriggered")
+
+    with op.batch_alter_table("products", schema=None) as batch_op:
+        batch_op.drop_index("ix_products_status_active")
@@ -0,0 +1,52 @@
+"""cascade_product_children
+
+Revision ID: 9d41f0b8e2a6
+Revises: 7c2e9a41d5b3
+Create Date: 2026-10-16 10:00:00.000000
+
+"""
+
+from collections.abc import Sequence
+
+from alembic import op
+
+# revision identifiers, used by Alembic.
+revision: str = "9d41f0b8e2a6"
+down_revision: str | Sequence[str] | None = "7c2e9a41d5b3"
+branch_labels: str | Sequence[str] | None = None
+depends_on: str | Sequence[str] | None = None
+
+# The initial FKs are unnamed; this convention names them on reflection
+# so batch mode can drop and recreate them.
+NAMING_CONVENTION = {
+    "fk": "fk_%(table_name)s_%(column_0_name)s_%(referred_table_name)s",
+}
+
+PRODUCT_CHILD_TABLES = ("price_history", "alerts", "schedules", "scrape_logs", "notifications")
+
+
+def _replace_fk(
+    table: str,
+    column: str,
+    referent: str,
+    ondelete: str | None,
+) -> None:
+    """Recreate a foreign key with a new ON DELETE action."""
+    name = f"fk_{table}_{column}_{referent}"
+    with op.batch_alter_table(table, schema=None, naming_convention=NAMING_CONVENTION) as batch_op:
+        batch_op.drop_constraint(name, type_="foreignkey")
+        batch_op.create_foreign_key(name, referent, [column], ["id"], ondelete=ondelete)
+
+
+def upgrade() -> None:
+    """Upgrade schema."""
+    for table in PRODUCT_CHILD_TABLES:
+        _replace_fk(table, "product_id", "products", "CASCADE")
+    _replace_fk("notifications", "alert_id", "alerts", "SET NULL")
+
+
+def downgrade() -> None:
+    """Downgrade schema."""
+    _replace_fk("notifications", "alert_id", "alerts", None)
+    for table in PRODUCT_CHILD_TABLES:
+        _replace_fk(table, "product_id", "products", None)
@@ -0,0 +1,41 @@
+"""products_attention_index
+
+Revision ID: a4e8c1f6d2b9
+Revises: d6a1e7f3c5b2
+Create Date: 2026-10-16 14:00:00.000000
+
+"""
+
+from collections.abc import Sequence
+
+import sqlalchemy as sa
+
+from alembic import op
+
+# revision identifiers, used by Alembic.
+revision: str = "a4e8c1f6d2b9"
+down_revision: str | Sequence[str] | None = "d6a1e7f3c5b2"
+branch_labels: str | Sequence[str] | None = None
+depends_on: str | Sequence[str] | None = None
+
+NEEDS_ATTENTION_WHERE = sa.text(
+    "status IN ('NEEDS_ATTENTION', 'PRICE_UNAVAILABLE') AND deleted_at IS NULL"
+)
+
+
+def upgrade() -> None:
+    """Upgrade schema."""
+    with op.batch_alter_table("products", schema=None) as batch_op:
+        batch_op.create_index(
+            "ix_products_attention",
+            ["id"],
+            unique=False,
+            sqlite_where=NEEDS_ATTENTION_WHERE,
+            postgresql_where=NEEDS_ATTENTION_WHERE,
+        )
+
+
+def downgrade() -> None:
+    """Downgrade schema."""
+    with op.batch_alter_table("products", schema=None) as batch_op:
+        batch_op.drop_index("ix_products_attention")
@@ -0,0 +1,34 @@
+"""nullable_notification_product
+
+Revision ID: a7e3c9f1d5b8
+Revises: f2c6d8a4b1e7
+Create Date: 2026-10-16 19:00:00.000000
+
+"""
+
+from collections.abc import Sequence
+
+import sqlalchemy as sa
+
+from alembic import op
+
+# revision identifiers, used by Alembic.
+revision: str = "a7e3c9f1d5b8"
+down_revision: str | Sequence[str] | None = "f2c6d8a4b1e7"
+branch_labels: str | Sequence[str] | None = None
+depends_on: str | Sequence[str] | None = None
+
+
+def upgrade() -> None:
+    """Upgrade schema."""
+    # Store-level notifications have no product; they used to store 0
+    with op.batch_alter_table("notifications", schema=None) as batch_op:
+        batch_op.alter_column("product_id", existing_type=sa.Integer(), nullable=True)
+    op.execute("UPDATE notifications SET product_id = NULL WHERE product_id = 0")
+
+
+def downgrade() -> None:
+    """Downgrade schema."""
+    op.execute("UPDATE notifications SET product_id = 0 WHERE product_id IS NULL")
+    with op.batch_alter_table("notifications", schema=None) as batch_op:
+        batch_op.alter_column("product_id", existing_type=sa.Integer(), nullable=False)
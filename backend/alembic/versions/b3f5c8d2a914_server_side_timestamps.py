@@ -0,0 +1,59 @@
+"""server_side_timestamps
+
+Revision ID: b3f5c8d2a914
+Revises: 9d41f0b8e2a6
+Create Date: 2026-10-16 11:00:00.000000
+
+"""
+
+from collections.abc import Sequence
+
+import sqlalchemy as sa
+
+from alembic import op
+
+# revision identifiers, used by Alembic.
+revision: str = "b3f5c8d2a914"
+down_revision: str | Sequence[str] | None = "9d41f0b8e2a6"
+branch_labels: str | Sequence[str] | None = None
+depends_on: str | Sequence[str] | None = None
+
+TIMESTAMP_COLUMNS = {
+    "stores": ("created_at", "updated_at"),
+    "canonical_products": ("created_at", "updated_at"),
+    "products": ("created_at", "updated_at"),
+    "price_history": ("scraped_at",),
+    "alerts": ("created_at", "updated_at"),
+    "schedules": ("created_at", "updated_at"),
+    "scrape_logs": ("scraped_at",),
+    "notifications": ("created_at", "updated_at"),
+}
+
+
+def _utcnow_default() -> sa.TextClause:
+    """Server default matching src.database.models.utcnow for the current dialect."""
+    if op.get_bind().dialect.name == "sqlite":
+        return sa.text("(STRFTIME('%Y-%m-%d %H:%M:%f000', 'now'))")
+    return sa.text("TIMEZONE('utc', CURRENT_TIMESTAMP)")
+
+
+def _set_defaults(server_default: sa.TextClause | None) -> None:
+    for table, columns in TIMESTAMP_COLUMNS.items():
+        with op.batch_alter_table(table, schema=None) as batch_op:
+            for column in columns:
+                batch_op.alter_column(
+                    column,
+                    existing_type=sa.DateTime(),
+                    existing_nullable=False,
+                    server_default=server_default,
+                )
+
+
+def upgrade() -> None:
+    """Upgrade schema."""
+    _set_defaults(_utcnow_default())
+
+
+def downgrade() -> None:
+    """Downgrade schema."""
+    _set_defaults(None)
@@ -0,0 +1,39 @@
+"""stores_active_index
+
+Revision ID: b7d4f9c2e6a3
+Revises: e5b8a2d4c7f1
+Create Date: 2026-10-16 17:00:00.000000
+
+"""
+
+from collections.abc import Sequence
+
+import sqlalchemy as sa
+
+from alembic import op
+
+# revision identifiers, used by Alembic.
+revision: str = "b7d4f9c2e6a3"
+down_revision: str | Sequence[str] | None = "e5b8a2d4c7f1"
+branch_labels: str | Sequence[str] | None = None
+depends_on: str | Sequence[str] | None = None
+
+ACTIVE_STORE_WHERE = sa.text("is_active")
+
+
+def upgrade() -> None:
+    """Upgrade schema."""
+    with op.batch_alter_table("stores", schema=None) as batch_op:
+        batch_op.create_index(
+            "ix_stores_active",
+            ["domain"],
+            unique=False,
+            sqlite_where=ACTIVE_STORE_WHERE,
+            postgresql_where=ACTIVE_STORE_WHERE,
+        )
+
+
+def downgrade() -> None:
+    """Downgrade schema."""
+    with op.batch_alter_table("stores", schema=None) as batch_op:
+        batch_op.drop_index("ix_stores_active")
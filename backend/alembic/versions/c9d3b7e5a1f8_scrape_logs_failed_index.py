@@ -0,0 +1,39 @@
+"""scrape_logs_failed_index
+
+Revision ID: c9d3b7e5a1f8
+Revises: a4e8c1f6d2b9
+Create Date: 2026-10-16 15:00:00.000000
+
+"""
+
+from collections.abc import Sequence
+
+import sqlalchemy as sa
+
+from alembic import op
+
+# revision identifiers, used by Alembic.
+revision: str = "c9d3b7e5a1f8"
+down_revision: str | Sequence[str] | None = "a4e8c1f6d2b9"
+branch_labels: str | Sequence[str] | None = None
+depends_on: str | Sequence[str] | None = None
+
+FAILED_SCRAPE_WHERE = sa.text("NOT success")
+
+
+def upgrade() -> None:
+    """Upgrade schema."""
+    with op.batch_alter_table("scrape_logs", schema=None) as batch_op:
+        batch_op.create_index(
+            "ix_scrape_logs_product_failed",
+            ["product_id", "scraped_at"],
+            unique=False,
+            sqlite_where=FAILED_SCRAPE_WHERE,
+            postgresql_where=FAILED_SCRAPE_WHERE,
+        )
+
+
+def downgrade() -> None:
+    """Downgrade schema."""
+    with op.batch_alter_table("scrape_logs", schema=None) as batch_op:
+        batch_op.drop_index("ix_scrape_logs_product_failed")
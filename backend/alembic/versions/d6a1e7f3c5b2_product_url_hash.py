@@ -0,0 +1,56 @@
+"""product_url_hash
+
+Revision ID: d6a1e7f3c5b2
+Revises: b3f5c8d2a914
+Create Date: 2026-10-16 12:00:00.000000
+
+"""
+
+import hashlib
+from collections.abc import Sequence
+
+import sqlalchemy as sa
+
+from alembic import op
+
+# revision identifiers, used by Alembic.
+revision: str = "d6a1e7f3c5b2"
+down_revision: str | Sequence[str] | None = "b3f5c8d2a914"
+branch_labels: str | Sequence[str] | None = None
+depends_on: str | Sequence[str] | None = None
+
+
+def _url_hash(url: str) -> int:
+    """Same as src.database.models.url_hash, frozen for this migration."""
+    return int.from_bytes(hashlib.sha256(url.encode()).digest()[:8], "big", signed=True)
+
+
+def upgrade() -> None:
+    """Upgrade schema."""
+    with op.batch_alter_table("products", schema=None) as batch_op:
+        batch_op.add_column(sa.Column("url_hash", sa.BigInteger(), nullable=True))
+
+    # Backfill existing rows
+    bind = op.get_bind()
+    products = sa.table("products", sa.column("id"), sa.column("url"), sa.column("url_hash"))
+    rows = bind.execute(sa.select(products.c.id, products.c.url)).all()
+    if rows:
+        bind.execute(
+            products.update()
+            .where(products.c.id == sa.bindparam("product_id"))
+            .values(url_hash=sa.bindparam("hash")),
+            [{"product_id": row.id, "hash": _url_hash(row.url)} for row in rows],
+        )
+
+    with op.batch_alter_table("products", schema=None) as batch_op:
+        batch_op.alter_column("url_hash", existing_type=sa.BigInteger(), nullable=False)
+        batch_op.create_index(batch_op.f("ix_products_url_hash"), ["url_hash"], unique=False)
+        batch_op.drop_index(batch_op.f("ix_products_url"))
+
+
+def downgrade() -> None:
+    """Downgrade schema."""
+    with op.batch_alter_table("products", schema=None) as batch_op:
+        batch_op.create_index(batch_op.f("ix_products_url"), ["url"], unique=False)
+        batch_op.drop_index(batch_op.f("ix_products_url_hash"))
+        batch_op.drop_column("url_hash")
@@ -0,0 +1,38 @@
+"""scrape_logs_covering_index
+
+Revision ID: e5b8a2d4c7f1
+Revises: c9d3b7e5a1f8
+Create Date: 2026-10-16 16:00:00.000000
+
+"""
+
+from collections.abc import Sequence
+
+from alembic import op
+
+# revision identifiers, used by Alembic.
+revision: str = "e5b8a2d4c7f1"
+down_revision: str | Sequence[str] | None = "c9d3b7e5a1f8"
+branch_labels: str | Sequence[str] | None = None
+depends_on: str | Sequence[str] | None = None
+
+
+def upgrade() -> None:
+    """Upgrade schema."""
+    # Same leading columns, so the new index replaces the old one
+    with op.batch_alter_table("scrape_logs", schema=None) as batch_op:
+        batch_op.drop_index("ix_scrape_logs_product_scraped")
+        batch_op.create_index(
+            "ix_scrape_logs_product_scraped_success",
+            ["product_id", "scraped_at", "success"],
+            unique=False,
+        )
+
+
+def downgrade() -> None:
+    """Downgrade schema."""
+    with op.batch_alter_table("scrape_logs", schema=None) as batch_op:
+        batch_op.drop_index("ix_scrape_logs_product_scraped_success")
+        batch_op.create_index(
+            "ix_scrape_logs_product_scraped", ["product_id", "scraped_at"], unique=False
+        )
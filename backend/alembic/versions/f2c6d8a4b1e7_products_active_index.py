@@ -0,0 +1,48 @@
+"""products_active_index
+
+Revision ID: f2c6d8a4b1e7
+Revises: b7d4f9c2e6a3
+Create Date: 2026-10-16 18:00:00.000000
+
+"""
+
+from collections.abc import Sequence
+
+import sqlalchemy as sa
+
+from alembic import op
+
+# revision identifiers, used by Alembic.
+revision: str = "f2c6d8a4b1e7"
+down_revision: str | Sequence[str] | None = "b7d4f9c2e6a3"
+branch_labels: str | Sequence[str] | None = None
+depends_on: str | Sequence[str] | None = None
+
+ACTIVE_PRODUCT_WHERE = sa.text("status = 'ACTIVE' AND deleted_at IS NULL")
+
+
+def upgrade() -> None:
+    """Upgrade schema."""
+    # Every row of the old index had the same key, so replace it with one on id
+    with op.batch_alter_table("products", schema=None) as batch_op:
+        batch_op.drop_index("ix_products_status_active")
+        batch_op.create_index(
+            "ix_products_active",
+            ["id"],
+            unique=False,
+            sqlite_where=ACTIVE_PRODUCT_WHERE,
+            postgresql_where=ACTIVE_PRODUCT_WHERE,
+        )
+
+
+def downgrade() -> None:
+    """Downgrade schema."""
+    with op.batch_alter_table("products", schema=None) as batch_op:
+        batch_op.drop_index("ix_products_active")
+        batch_op.create_index(
+            "ix_products_status_active",
+            ["status"],
+            unique=False,
+            sqlite_where=ACTIVE_PRODUCT_WHERE,
+            postgresql_where=ACTIVE_PRODUCT_WHERE,
+        )
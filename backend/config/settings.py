@@ -71,6 +71,7 @@ class Settings(BaseSettings):
         default="sqlite+aiosqlite:///./data/perpee.db",
         description="Database connection URL",
     )
+    database_echo: bool = Field(default=False, description="Log every SQL statement")
     chromadb_path: str = Field(
         default="./data/chromadb",
         description="ChromaDB storage path",
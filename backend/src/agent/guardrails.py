@@ -4,6 +4,7 @@ Protects against runaway costs and ensures responsible API usage.
 """
 
 import asyncio
+import datetime
 import logging
 import time
 from collections import deque
@@ -49,8 +50,6 @@ class DailyTokenTracker:
 
     def _get_day_start(self) -> float:
         """Get timestamp for start of current UTC day."""
-        import datetime
-
         now = datetime.datetime.now(datetime.UTC)
         day_start = now.replace(hour=0, minute=0, second=0, microsecond=0)
         return day_start.timestamp()
@@ -378,7 +378,7 @@ async def get_price_history(
             raise RecordNotFoundError("Product", product_id)
 
         # Get history
-        history = await repository.get_price_history(
+        history, _ = await repository.get_price_history(
             ctx.deps.session,
             product_id=product_id,
             days=days,
@@ -631,13 +631,13 @@ async def list_products(
     """
     try:
         if store:
-            products = await repository.get_products_by_store(
+            products, _ = await repository.get_products_by_store(
                 ctx.deps.session,
                 store_domain=store,
                 limit=min(limit, 100),
             )
         else:
-            products = await repository.get_all(
+            products, _ = await repository.get_all(
                 ctx.deps.session,
                 Product,
                 limit=min(limit, 100),
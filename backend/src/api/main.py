@@ -59,6 +59,14 @@ async def lifespan(app: FastAPI):
     except Exception as e:
         logger.warning(f"Failed to start scheduler: {e}")
 
+    # Heal products as soon as they cross the failure threshold
+    try:
+        from src.healing import get_self_healing_service
+
+        get_self_healing_service().start_event_worker()
+    except Exception as e:
+        logger.warning(f"Failed to start healing worker: {e}")
+
     yield
 
     # Shutdown
@@ -74,6 +82,38 @@ async def lifespan(app: FastAPI):
     except Exception as e:
         logger.warning(f"Failed to stop scheduler: {e}")
 
+    # Stop healing worker
+    try:
+        from src.healing import get_self_healing_service
+
+        await get_self_healing_service().stop_event_worker()
+    except Exception as e:
+        logger.warning(f"Failed to stop healing worker: {e}")
+
+    # Close the scraper's browser
+    try:
+        from src.scraper import get_scraper_engine
+
+        await get_scraper_engine().close()
+    except Exception as e:
+        logger.warning(f"Failed to close scraper: {e}")
+
+    # Stop the email sender threads
+    try:
+        from src.notifications.channels.email import shutdown_resend_executor
+
+        shutdown_resend_executor()
+    except Exception as e:
+        logger.warning(f"Failed to stop email executor: {e}")
+
+    # Write any queued scrape logs
+    try:
+        from src.database.scrape_log_batcher import get_scrape_log_batcher
+
+        await get_scrape_log_batcher().stop()
+    except Exception as e:
+        logger.warning(f"Failed to flush scrape logs: {e}")
+
 
 # Create FastAPI app
 app = FastAPI(
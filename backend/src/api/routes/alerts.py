@@ -2,6 +2,7 @@
 Alert API routes.
 """
 
+from datetime import datetime
 from typing import Annotated
 
 from fastapi import APIRouter, Depends, HTTPException, Query, status
@@ -18,6 +19,7 @@ from src.api.schemas import (
     MessageResponse,
     paginate,
 )
+from src.database import repository
 from src.database.models import Alert, AlertType, Product
 
 router = APIRouter(prefix="/alerts", tags=["alerts"])
@@ -146,22 +148,14 @@ async def update_alert(
     """
     Update an alert.
     """
-    alert = await session.get(Alert, alert_id)
+    alert = await repository.update(session, Alert, alert_id, data.model_dump(exclude_unset=True))
 
-    if not alert or alert.deleted_at is not None:
+    if not alert:
         raise HTTPException(
             status_code=status.HTTP_404_NOT_FOUND,
             detail=f"Alert {alert_id} not found",
         )
 
-    # Update fields
-    update_data = data.model_dump(exclude_unset=True)
-    for key, value in update_data.items():
-        setattr(alert, key, value)
-
-    await session.flush()
-    await session.refresh(alert)
-
     return AlertResponse.model_validate(alert)
 
 
@@ -173,8 +167,6 @@ async def delete_alert(
     """
     Soft delete an alert.
     """
-    from datetime import datetime
-
     alert = await session.get(Alert, alert_id)
 
     if not alert or alert.deleted_at is not None:
@@ -5,7 +5,6 @@ WebSocket chat endpoint for real-time agent interaction.
 import json
 import logging
 import uuid
-from typing import Any
 
 from fastapi import APIRouter, WebSocket, WebSocketDisconnect
 
@@ -52,10 +51,15 @@ class ConnectionManager:
             del self.agents[session_id]
         logger.info(f"WebSocket disconnected: {session_id}")
 
-    async def send_json(self, session_id: str, data: dict[str, Any]) -> None:
-        """Send JSON data to a specific connection."""
+    async def send(self, session_id: str, payload: bytes) -> None:
+        """
+        Send a pre-encoded JSON message to a specific connection.
+
+        Payloads come from the create_*_message() helpers already serialized,
+        so they go out as a text frame without another json.dumps pass.
+        """
         if session_id in self.active_connections:
-            await self.active_connections[session_id].send_json(data)
+            await self.active_connections[session_id].send_text(payload.decode())
 
     def get_agent(self, session_id: str) -> PerpeeAgent | None:
         """Get the agent for a session."""
@@ -97,7 +101,7 @@ async def websocket_endpoint(websocket: WebSocket):
 
     try:
         # Send welcome message
-        await manager.send_json(session_id, create_welcome_message(session_id))
+        await manager.send(session_id, create_welcome_message(session_id))
 
         # Message loop
         while True:
@@ -108,7 +112,7 @@ async def websocket_endpoint(websocket: WebSocket):
 
                 # Validate message
                 if data.get("type") != "message":
-                    await manager.send_json(
+                    await manager.send(
                         session_id,
                         create_error_message("Invalid message type"),
                     )
@@ -116,7 +120,7 @@ async def websocket_endpoint(websocket: WebSocket):
 
                 content = data.get("content", "").strip()
                 if not content:
-                    await manager.send_json(
+                    await manager.send(
                         session_id,
                         create_error_message("Empty message"),
                     )
@@ -126,19 +130,19 @@ async def websocket_endpoint(websocket: WebSocket):
                 try:
                     ChatMessage(content=content)
                 except Exception as e:
-                    await manager.send_json(
+                    await manager.send(
                         session_id,
                         create_error_message(f"Invalid message: {e}"),
                     )
                     continue
 
                 # Send thinking indicator
-                await manager.send_json(session_id, create_thinking_message())
+                await manager.send(session_id, create_thinking_message())
 
                 # Get agent for this session
                 agent = manager.get_agent(session_id)
                 if not agent:
-                    await manager.send_json(
+                    await manager.send(
                         session_id,
                         create_error_message("Session not found"),
                     )
@@ -151,24 +155,24 @@ async def websocket_endpoint(websocket: WebSocket):
 
                 # Send response
                 if response.success:
-                    await manager.send_json(
+                    await manager.send(
                         session_id,
                         create_response_message(response.text),
                     )
                 else:
-                    await manager.send_json(
+                    await manager.send(
                         session_id,
                         create_error_message(response.error or "Unknown error"),
                     )
 
             except json.JSONDecodeError:
-                await manager.send_json(
+                await manager.send(
                     session_id,
                     create_error_message("Invalid JSON"),
                 )
             except Exception as e:
                 logger.error(f"Error processing message: {e}")
-                await manager.send_json(
+                await manager.send(
                     session_id,
                     create_error_message(f"Error: {str(e)}"),
                 )
@@ -20,6 +20,7 @@ from src.database.models import (
     Schedule,
     Store,
 )
+from src.database.repository import get_product_count_estimate
 
 router = APIRouter(tags=["health"])
 
@@ -46,8 +47,7 @@ async def get_stats(
     Returns comprehensive stats about the system.
     """
     # Product stats
-    total_products_query = select(func.count(Product.id)).where(Product.deleted_at.is_(None))
-    total_products = (await session.execute(total_products_query)).scalar_one()
+    total_products = await get_product_count_estimate(session)
 
     active_products_query = select(func.count(Product.id)).where(
         Product.deleted_at.is_(None),
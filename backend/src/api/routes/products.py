@@ -2,9 +2,11 @@
 Product API routes.
 """
 
+from datetime import datetime, timedelta
 from typing import Annotated
+from urllib.parse import urlparse
 
-from fastapi import APIRouter, Depends, HTTPException, Query, status
+from fastapi import APIRouter, BackgroundTasks, Depends, HTTPException, Query, status
 from sqlalchemy import func, select
 from sqlalchemy.ext.asyncio import AsyncSession
 
@@ -20,7 +22,10 @@ from src.api.schemas import (
     ProductUpdate,
     paginate,
 )
-from src.database.models import PriceHistory, Product, ProductStatus
+from src.core.cache import Freshness, classify, revalidate
+from src.database import repository
+from src.database.models import PriceHistory, Product, ProductStatus, url_hash
+from src.scheduler.jobs import product_scrape_job
 
 router = APIRouter(prefix="/products", tags=["products"])
 
@@ -140,8 +145,6 @@ async def create_product(
     Note: This creates a placeholder product. The actual scraping
     is done via the agent or a background task.
     """
-    from urllib.parse import urlparse
-
     # Extract domain from URL
     parsed = urlparse(str(data.url))
     store_domain = parsed.netloc.lower()
@@ -152,6 +155,7 @@ async def create_product(
 
     # Check if product already exists
     existing_query = select(Product).where(
+        Product.url_hash == url_hash(str(data.url)),
         Product.url == str(data.url),
         Product.deleted_at.is_(None),
     )
@@ -187,22 +191,16 @@ async def update_product(
     """
     Update a product.
     """
-    product = await session.get(Product, product_id)
+    product = await repository.update(
+        session, Product, product_id, data.model_dump(exclude_unset=True)
+    )
 
-    if not product or product.deleted_at is not None:
+    if not product:
         raise HTTPException(
             status_code=status.HTTP_404_NOT_FOUND,
             detail=f"Product {product_id} not found",
         )
 
-    # Update fields
-    update_data = data.model_dump(exclude_unset=True)
-    for key, value in update_data.items():
-        setattr(product, key, value)
-
-    await session.flush()
-    await session.refresh(product)
-
     return ProductResponse.model_validate(product)
 
 
@@ -214,8 +212,6 @@ async def delete_product(
     """
     Soft delete a product.
     """
-    from datetime import datetime
-
     product = await session.get(Product, product_id)
 
     if not product or product.deleted_at is not None:
@@ -252,8 +248,6 @@ async def get_price_history(
     query = select(PriceHistory).where(PriceHistory.product_id == product_id)
 
     if days:
-        from datetime import datetime, timedelta
-
         cutoff = datetime.utcnow() - timedelta(days=days)
         query = query.where(PriceHistory.scraped_at >= cutoff)
 
@@ -272,12 +266,14 @@ async def get_price_history(
 async def refresh_product(
     product_id: int,
     session: Annotated[AsyncSession, Depends(get_db)],
+    background_tasks: BackgroundTasks,
 ):
     """
-    Trigger a manual scrape for a product.
+    Refresh a product's scraped data.
 
-    Note: This queues a scrape task. The actual scraping
-    happens asynchronously.
+    Recently checked products are left alone. Others are re-scraped in the
+    background after the response is sent, so the request neither waits on
+    the browser nor holds its session open while the scrape commits.
     """
     product = await session.get(Product, product_id)
 
@@ -287,7 +283,8 @@ async def refresh_product(
             detail=f"Product {product_id} not found",
         )
 
-    # TODO: Queue scrape task via scheduler or agent
-    # For now, just return acknowledgement
+    if classify(product.last_checked_at) == Freshness.FRESH:
+        return MessageResponse(message=f"Product {product_id} is up to date")
 
+    background_tasks.add_task(revalidate, product.url, lambda: product_scrape_job(product_id))
     return MessageResponse(message=f"Refresh queued for product {product_id}")
@@ -2,10 +2,13 @@
 Schedule API routes.
 """
 
+from collections.abc import Sequence
+from datetime import UTC, datetime
 from typing import Annotated
 
+from croniter import croniter
 from fastapi import APIRouter, Depends, HTTPException, Query, status
-from sqlalchemy import func, select
+from sqlalchemy import func, literal, select
 from sqlalchemy.ext.asyncio import AsyncSession
 
 from src.api.dependencies import get_db
@@ -18,11 +21,46 @@ from src.api.schemas import (
     ScheduleWithDetails,
     paginate,
 )
+from src.database import repository
 from src.database.models import Product, Schedule, Store
 
 router = APIRouter(prefix="/schedules", tags=["schedules"])
 
 
+async def _names_for_schedules(
+    session: AsyncSession,
+    schedules: Sequence[Schedule],
+) -> tuple[dict[int, str], dict[str, str]]:
+    """
+    Resolve product and store names for a batch of schedules.
+
+    Issues at most one IN (...) query per table regardless of how many
+    schedules are passed, so list views don't degrade into N+1 lookups.
+
+    Returns:
+        Tuple of (product_id -> name, store_domain -> name) maps.
+    """
+    product_ids = {s.product_id for s in schedules if s.product_id}
+    store_domains = {s.store_domain for s in schedules if s.store_domain}
+
+    product_names: dict[int, str] = {}
+    store_names: dict[str, str] = {}
+
+    if product_ids:
+        result = await session.execute(
+            select(Product.id, Product.name).where(Product.id.in_(product_ids))
+        )
+        product_names = {row.id: row.name for row in result}
+
+    if store_domains:
+        result = await session.execute(
+            select(Store.domain, Store.name).where(Store.domain.in_(store_domains))
+        )
+        store_names = {row.domain: row.name for row in result}
+
+    return product_names, store_names
+
+
 @router.get("", response_model=dict)
 async def list_schedules(
     session: Annotated[AsyncSession, Depends(get_db)],
@@ -55,10 +93,9 @@ async def list_schedules(
     query = query.offset((page - 1) * per_page).limit(per_page)
     query = query.order_by(Schedule.created_at.desc())
 
-    result = await session.execute(query)
-    schedules = result.scalars().all()
-
-    items = [ScheduleListItem.model_validate(s) for s in schedules]
+    # Stream rows and validate as they arrive instead of buffering the page
+    result = await session.stream_scalars(query)
+    items = [ScheduleListItem.model_validate(s) async for s in result]
     return paginate(items, total, page, per_page)
 
 
@@ -79,23 +116,12 @@ async def get_schedule(
         )
 
     # Get product or store name
-    product_name = None
-    store_name = None
-
-    if schedule.product_id:
-        product = await session.get(Product, schedule.product_id)
-        if product:
-            product_name = product.name
-
-    if schedule.store_domain:
-        store = await session.get(Store, schedule.store_domain)
-        if store:
-            store_name = store.name
+    product_names, store_names = await _names_for_schedules(session, [schedule])
 
     return ScheduleWithDetails(
         **ScheduleResponse.model_validate(schedule).model_dump(),
-        product_name=product_name,
-        store_name=store_name,
+        product_name=product_names.get(schedule.product_id),
+        store_name=store_names.get(schedule.store_domain),
     )
 
 
@@ -125,28 +151,22 @@ async def create_schedule(
                 detail=f"Store {data.store_domain} not found",
             )
 
-    # Check for duplicate schedule
-    existing_query = select(Schedule).where(Schedule.deleted_at.is_(None))
-
-    if data.product_id:
-        existing_query = existing_query.where(Schedule.product_id == data.product_id)
-    else:
-        existing_query = existing_query.where(Schedule.store_domain == data.store_domain)
-
-    existing = (await session.execute(existing_query)).scalar_one_or_none()
+    # Check for duplicate schedule (existence only, no row hydration)
+    target = (
+        Schedule.product_id == data.product_id
+        if data.product_id
+        else Schedule.store_domain == data.store_domain
+    )
+    exists_query = select(literal(1)).where(Schedule.deleted_at.is_(None), target).limit(1)
 
-    if existing:
+    if (await session.execute(exists_query)).first() is not None:
         raise HTTPException(
             status_code=status.HTTP_409_CONFLICT,
             detail="Schedule already exists for this product/store",
         )
 
     # Calculate next run time
-    from datetime import datetime
-
-    from croniter import croniter
-
-    cron = croniter(data.cron_expression, datetime.utcnow())
+    cron = croniter(data.cron_expression, datetime.now(UTC))
     next_run_at = cron.get_next(datetime)
 
     # Create schedule
@@ -173,31 +193,20 @@ async def update_schedule(
     """
     Update a schedule.
     """
-    schedule = await session.get(Schedule, schedule_id)
-
-    if not schedule or schedule.deleted_at is not None:
-        raise HTTPException(
-            status_code=status.HTTP_404_NOT_FOUND,
-            detail=f"Schedule {schedule_id} not found",
-        )
-
-    # Update fields
     update_data = data.model_dump(exclude_unset=True)
 
     # If cron_expression changed, recalculate next_run_at
     if "cron_expression" in update_data:
-        from datetime import datetime
+        cron = croniter(update_data["cron_expression"], datetime.now(UTC))
+        update_data["next_run_at"] = cron.get_next(datetime)
 
-        from croniter import croniter
+    schedule = await repository.update(session, Schedule, schedule_id, update_data)
 
-        cron = croniter(update_data["cron_expression"], datetime.utcnow())
-        schedule.next_run_at = cron.get_next(datetime)
-
-    for key, value in update_data.items():
-        setattr(schedule, key, value)
-
-    await session.flush()
-    await session.refresh(schedule)
+    if not schedule:
+        raise HTTPException(
+            status_code=status.HTTP_404_NOT_FOUND,
+            detail=f"Schedule {schedule_id} not found",
+        )
 
     return ScheduleResponse.model_validate(schedule)
 
@@ -210,8 +219,6 @@ async def delete_schedule(
     """
     Soft delete a schedule.
     """
-    from datetime import datetime
-
     schedule = await session.get(Schedule, schedule_id)
 
     if not schedule or schedule.deleted_at is not None:
@@ -220,7 +227,7 @@ async def delete_schedule(
             detail=f"Schedule {schedule_id} not found",
         )
 
-    schedule.deleted_at = datetime.utcnow()
+    schedule.deleted_at = datetime.now(UTC)
     await session.flush()
 
     return MessageResponse(message=f"Schedule {schedule_id} deleted")
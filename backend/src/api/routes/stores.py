@@ -108,19 +108,28 @@ async def get_store(
     """
     Get a store by domain.
     """
-    store = await session.get(Store, store_domain)
-
-    if not store:
+    # Select everything except selectors: they are never exposed, so skip
+    # loading and decoding the JSON blob at all.
+    query = select(
+        Store.domain,
+        Store.name,
+        Store.is_whitelisted,
+        Store.is_active,
+        Store.rate_limit_rpm,
+        Store.success_rate,
+        Store.last_success_at,
+        Store.created_at,
+        Store.updated_at,
+    ).where(Store.domain == store_domain)
+    row = (await session.execute(query)).first()
+
+    if not row:
         raise HTTPException(
             status_code=404,
             detail=f"Store {store_domain} not found",
         )
 
-    # Don't expose selectors for security
-    response = StoreResponse.model_validate(store)
-    response.selectors = None
-
-    return response
+    return StoreResponse(**row._mapping, selectors=None)
 
 
 @router.get("/{store_domain}/health", response_model=StoreHealth)
@@ -2,14 +2,24 @@
 Chat/WebSocket API schemas.
 """
 
-from datetime import datetime
+from datetime import UTC, datetime
 from enum import Enum
 from typing import Any
 
+import orjson
 from pydantic import Field
 
 from src.api.schemas.common import BaseSchema
 
+# Pre-bound clock for per-message timestamps
+_UTC = UTC
+_NOW = datetime.now
+
+
+def _utcnow() -> datetime:
+    """Return the current timezone-aware UTC time."""
+    return _NOW(_UTC)
+
 
 class MessageType(str, Enum):
     """WebSocket message types."""
@@ -37,7 +47,7 @@ class WebSocketMessage(BaseSchema):
 
     type: MessageType
     data: dict[str, Any] = Field(default_factory=dict)
-    timestamp: datetime = Field(default_factory=datetime.utcnow)
+    timestamp: datetime = Field(default_factory=_utcnow)
 
 
 class WelcomeMessage(BaseSchema):
@@ -83,29 +93,51 @@ class ErrorMessage(BaseSchema):
     code: str | None = None
 
 
+# Static control message payloads, dumped once at import time. Only the
+# timestamp (and the welcome session_id) differ between sends.
+_WELCOME_DATA = WelcomeMessage().model_dump()
+_THINKING_DATA = ThinkingMessage().model_dump()
+
+# Naive datetimes in outgoing messages are UTC
+_ORJSON_OPTIONS = orjson.OPT_NAIVE_UTC
+
+
+def _encode(message: dict[str, Any]) -> bytes:
+    """Serialize a WebSocket message dict to JSON bytes."""
+    return orjson.dumps(message, option=_ORJSON_OPTIONS)
+
+
 # Helper functions for creating WebSocket messages
-def create_welcome_message(session_id: str | None = None) -> dict[str, Any]:
+def create_welcome_message(session_id: str | None = None) -> bytes:
     """Create a welcome message."""
-    return WebSocketMessage(
-        type=MessageType.WELCOME,
-        data=WelcomeMessage(session_id=session_id).model_dump(),
-    ).model_dump()
+    return _encode(
+        {
+            "type": MessageType.WELCOME,
+            "data": {**_WELCOME_DATA, "session_id": session_id},
+            "timestamp": _utcnow(),
+        }
+    )
 
 
-def create_thinking_message() -> dict[str, Any]:
+def create_thinking_message() -> bytes:
     """Create a thinking indicator message."""
-    return WebSocketMessage(
-        type=MessageType.THINKING,
-        data=ThinkingMessage().model_dump(),
-    ).model_dump()
+    return _encode(
+        {
+            "type": MessageType.THINKING,
+            "data": _THINKING_DATA,
+            "timestamp": _utcnow(),
+        }
+    )
 
 
-def create_tool_call_message(tool_name: str, tool_args: dict[str, Any]) -> dict[str, Any]:
+def create_tool_call_message(tool_name: str, tool_args: dict[str, Any]) -> bytes:
     """Create a tool call notification message."""
-    return WebSocketMessage(
-        type=MessageType.TOOL_CALL,
-        data=ToolCallMessage(tool_name=tool_name, tool_args=tool_args).model_dump(),
-    ).model_dump()
+    return _encode(
+        WebSocketMessage(
+            type=MessageType.TOOL_CALL,
+            data=ToolCallMessage(tool_name=tool_name, tool_args=tool_args).model_dump(),
+        ).model_dump()
+    )
 
 
 def create_tool_result_message(
@@ -113,30 +145,36 @@ def create_tool_result_message(
     success: bool,
     result: Any = None,
     error: str | None = None,
-) -> dict[str, Any]:
+) -> bytes:
     """Create a tool result message."""
-    return WebSocketMessage(
-        type=MessageType.TOOL_RESULT,
-        data=ToolResultMessage(
-            tool_name=tool_name,
-            success=success,
-            result=result,
-            error=error,
-        ).model_dump(),
-    ).model_dump()
-
-
-def create_response_message(content: str) -> dict[str, Any]:
+    return _encode(
+        WebSocketMessage(
+            type=MessageType.TOOL_RESULT,
+            data=ToolResultMessage(
+                tool_name=tool_name,
+                success=success,
+                result=result,
+                error=error,
+            ).model_dump(),
+        ).model_dump()
+    )
+
+
+def create_response_message(content: str) -> bytes:
     """Create an agent response message."""
-    return WebSocketMessage(
-        type=MessageType.RESPONSE,
-        data=ResponseMessage(content=content).model_dump(),
-    ).model_dump()
+    return _encode(
+        WebSocketMessage(
+            type=MessageType.RESPONSE,
+            data=ResponseMessage(content=content).model_dump(),
+        ).model_dump()
+    )
 
 
-def create_error_message(message: str, code: str | None = None) -> dict[str, Any]:
+def create_error_message(message: str, code: str | None = None) -> bytes:
     """Create an error message."""
-    return WebSocketMessage(
-        type=MessageType.ERROR,
-        data=ErrorMessage(message=message, code=code).model_dump(),
-    ).model_dump()
+    return _encode(
+        WebSocketMessage(
+            type=MessageType.ERROR,
+            data=ErrorMessage(message=message, code=code).model_dump(),
+        ).model_dump()
+    )
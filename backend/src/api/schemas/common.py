@@ -13,7 +13,16 @@ T = TypeVar("T")
 class BaseSchema(BaseModel):
     """Base schema with common configuration."""
 
-    model_config = ConfigDict(from_attributes=True)
+    # Explicit knobs so every response schema compiles to the same lean
+    # validator: no re-validation on assignment and extra input dropped.
+    model_config = ConfigDict(
+        from_attributes=True,
+        validate_assignment=False,
+        arbitrary_types_allowed=False,
+        extra="ignore",
+        str_strip_whitespace=False,
+        defer_build=False,
+    )
 
 
 class ErrorResponse(BaseSchema):
@@ -2,6 +2,7 @@
 Core module - exceptions, constants, and security utilities.
 """
 
+from src.core.backoff import compute_delay
 from src.core.exceptions import (
     AgentError,
     BlockedError,
@@ -70,6 +71,8 @@ __all__ = [
     "UnsupportedStoreError",
     "URLError",
     "ValidationError",
+    # Backoff
+    "compute_delay",
     # Security
     "extract_domain",
     "is_private_ip",
@@ -0,0 +1,51 @@
+"""
+Jittered exponential backoff for retry delays.
+"""
+
+import random
+
+from src.core.constants import MAX_RETRY_DELAY, RETRY_BACKOFF
+
+# Used for error types without an entry in RETRY_BACKOFF
+_DEFAULT_BACKOFF = RETRY_BACKOFF["network_error"]
+
+
+def compute_delay(
+    error_type: str,
+    attempt: int,
+    backoff: dict[str, tuple[float, float, int]] | None = None,
+) -> float:
+    """
+    Compute the delay before retrying an operation.
+
+    Random jitter keeps concurrent scrapers that failed together from
+    retrying in lockstep.
+
+    Args:
+        error_type: Error category value (e.g. "network_error")
+        attempt: Current attempt number (0-indexed)
+        backoff: Backoff table to use instead of RETRY_BACKOFF
+
+    Returns:
+        Delay in seconds
+    """
+    base, jitter, _ = (backoff or RETRY_BACKOFF).get(error_type, _DEFAULT_BACKOFF)
+    return min(base * 2**attempt + random.uniform(0, jitter), MAX_RETRY_DELAY)
+
+
+def max_attempts(
+    error_type: str,
+    backoff: dict[str, tuple[float, float, int]] | None = None,
+) -> int | None:
+    """
+    Get the retry budget for an error type.
+
+    Args:
+        error_type: Error category value
+        backoff: Backoff table to use instead of RETRY_BACKOFF
+
+    Returns:
+        Max retries, or None if the error type has no entry
+    """
+    entry = (backoff or RETRY_BACKOFF).get(error_type)
+    return entry[2] if entry else None
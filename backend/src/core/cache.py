@@ -0,0 +1,130 @@
+"""
+Stale-while-revalidate helpers for scraped data.
+
+Scraped values already live in the database with a timestamp, so the
+"cache" is just a freshness decision on that timestamp plus in-process
+tracking of background refreshes so each key is refreshed at most once
+at a time.
+"""
+
+import asyncio
+import logging
+from collections.abc import Awaitable, Callable
+from datetime import datetime
+from enum import Enum
+from typing import Any, TypeVar
+
+from src.core.constants import PRODUCT_CACHE_MAX_AGE_SECONDS, PRODUCT_CACHE_SWR_SECONDS
+
+logger = logging.getLogger(__name__)
+
+T = TypeVar("T")
+
+# Background refreshes in flight, keyed by cache key
+_refreshing: dict[str, asyncio.Task[Any]] = {}
+
+
+class Freshness(str, Enum):
+    """How usable a cached value is."""
+
+    FRESH = "fresh"  # Serve as-is
+    STALE = "stale"  # Serve, refresh in the background
+    EXPIRED = "expired"  # Refresh before serving
+
+
+def classify(
+    updated_at: datetime | None,
+    max_age: int = PRODUCT_CACHE_MAX_AGE_SECONDS,
+    stale_while_revalidate: int = PRODUCT_CACHE_SWR_SECONDS,
+    now: datetime | None = None,
+) -> Freshness:
+    """
+    Classify a cached value by its age.
+
+    Args:
+        updated_at: When the value was last refreshed (naive UTC)
+        max_age: Seconds the value is fresh
+        stale_while_revalidate: Further seconds it may be served while refreshing
+        now: Current time (naive UTC), for testing
+
+    Returns:
+        Freshness of the value
+    """
+    if updated_at is None:
+        return Freshness.EXPIRED
+
+    age = ((now or datetime.utcnow()) - updated_at).total_seconds()
+    if age < max_age:
+        return Freshness.FRESH
+    if age < max_age + stale_while_revalidate:
+        return Freshness.STALE
+    return Freshness.EXPIRED
+
+
+def _start_refresh(key: str, refresh: Callable[[], Awaitable[T]]) -> asyncio.Task[T]:
+    """Start a refresh for key, or return the one already running."""
+    task = _refreshing.get(key)
+    if task is None:
+        task = asyncio.ensure_future(refresh())
+        _refreshing[key] = task
+        task.add_done_callback(lambda _: _refreshing.pop(key, None))
+    return task
+
+
+def _log_refresh_error(task: asyncio.Task[Any]) -> None:
+    """Log failures of background refreshes nobody awaits."""
+    if not task.cancelled() and task.exception() is not None:
+        logger.warning(f"Background refresh failed: {task.exception()}")
+
+
+async def get_or_refresh(
+    key: str,
+    cached: T,
+    updated_at: datetime | None,
+    refresh: Callable[[], Awaitable[T]],
+    max_age: int = PRODUCT_CACHE_MAX_AGE_SECONDS,
+    stale_while_revalidate: int = PRODUCT_CACHE_SWR_SECONDS,
+) -> tuple[T, Freshness]:
+    """
+    Serve a cached value, refreshing it according to its age.
+
+    Fresh values are returned as-is. Stale values are returned immediately
+    while a background refresh runs. Expired values are refreshed first.
+
+    Args:
+        key: Cache key (e.g. product URL)
+        cached: Currently stored value
+        updated_at: When the stored value was last refreshed
+        refresh: Coroutine factory producing a new value
+        max_age: Seconds the value is fresh
+        stale_while_revalidate: Further seconds it may be served while refreshing
+
+    Returns:
+        Tuple of (value, freshness of the stored value)
+    """
+    freshness = classify(updated_at, max_age, stale_while_revalidate)
+
+    if freshness == Freshness.FRESH:
+        return cached, freshness
+
+    if freshness == Freshness.STALE:
+        _start_refresh(key, refresh).add_done_callback(_log_refresh_error)
+        return cached, freshness
+
+    return await _start_refresh(key, refresh), freshness
+
+
+async def revalidate(key: str, refresh: Callable[[], Awaitable[Any]]) -> None:
+    """
+    Refresh a cached value, sharing a refresh already in flight for key.
+
+    Failures are logged, not raised, so this can run as a background task.
+
+    Args:
+        key: Cache key (e.g. product URL)
+        refresh: Coroutine factory producing a new value
+    """
+    try:
+        await _start_refresh(key, refresh)
+    except Exception as e:
+        logger.warning(f"Background refresh failed: {e}")
@@ -34,14 +34,16 @@ MAX_CONCURRENT_BROWSERS = 3
 MEMORY_THRESHOLD_PERCENT = 0.70
 MAX_RETRIES = 3
 
-# Retry delays (seconds)
-RETRY_DELAYS = {
-    "network_error": [2, 4, 8],  # Exponential backoff
-    "timeout": [2, 4, 8],
-    "server_error": [2, 4, 8],
-    "rate_limited": [5, 10, 20],
-    "forbidden": [5],  # Single retry
+# Retry backoff per error type: (base seconds, max jitter seconds, max attempts)
+# Delay for attempt n is base * 2**n + uniform(0, jitter), capped at MAX_RETRY_DELAY
+RETRY_BACKOFF = {
+    "network_error": (2.0, 1.0, 3),
+    "timeout": (2.0, 1.0, 3),
+    "server_error": (2.0, 1.0, 3),
+    "rate_limited": (5.0, 2.0, 3),
+    "forbidden": (5.0, 1.0, 1),  # Single retry
 }
+MAX_RETRY_DELAY = 60.0
 
 # ===========================================
 # Self-Healing
@@ -79,6 +81,13 @@ DEFAULT_CHECK_HOUR = 6  # 6 AM
 DEFAULT_CRON_EXPRESSION = "0 6 * * *"  # Daily at 6 AM
 MIN_CHECK_INTERVAL_HOURS = 24  # Minimum 24h between checks
 
+# ===========================================
+# Product Cache (stale-while-revalidate)
+# ===========================================
+
+PRODUCT_CACHE_MAX_AGE_SECONDS = 3600  # Serve without refreshing
+PRODUCT_CACHE_SWR_SECONDS = 86400  # Serve stale while refreshing in background
+
 # ===========================================
 # User Agent Strings
 # ===========================================
@@ -131,10 +140,8 @@ STORE_CATEGORIES = {
     "home": ["homedepot.ca"],
 }
 
-# All P0 store domains
-P0_STORES = [
-    store for category in STORE_CATEGORIES.values() for store in category
-]
+# All P0 store domains (frozenset for O(1) whitelist membership checks)
+P0_STORES = frozenset(store for category in STORE_CATEGORIES.values() for store in category)
 
 # ===========================================
 # Extraction Priorities
@@ -6,6 +6,9 @@ Custom exception classes for Perpee.
 class PerpeeError(Exception):
     """Base exception for all Perpee errors."""
 
+    # Attributes live in slots, so raising doesn't allocate an instance __dict__
+    __slots__ = ("message", "details")
+
     def __init__(self, message: str, details: dict | None = None):
         self.message = message
         self.details = details or {}
@@ -20,55 +23,55 @@ class PerpeeError(Exception):
 class ScraperError(PerpeeError):
     """Base exception for scraper-related errors."""
 
-    pass
+    __slots__ = ()
 
 
 class NetworkError(ScraperError):
     """Network-related errors (connection issues, DNS failures)."""
 
-    pass
+    __slots__ = ()
 
 
 class TimeoutError(ScraperError):
     """Request or operation timeout."""
 
-    pass
+    __slots__ = ()
 
 
 class BlockedError(ScraperError):
     """Request blocked by website (CAPTCHA, login wall, rate limit)."""
 
-    pass
+    __slots__ = ()
 
 
 class ParseError(ScraperError):
     """Failed to parse product data from page."""
 
-    pass
+    __slots__ = ()
 
 
 class PriceValidationError(ScraperError):
     """Extracted price failed validation (negative, too high, etc.)."""
 
-    pass
+    __slots__ = ()
 
 
 class StructureChangeError(ScraperError):
     """Website structure changed, selectors no longer work."""
 
-    pass
+    __slots__ = ()
 
 
 class NotFoundError(ScraperError):
     """Product page returned 404."""
 
-    pass
+    __slots__ = ()
 
 
 class RobotsBlockedError(ScraperError):
     """URL blocked by robots.txt."""
 
-    pass
+    __slots__ = ()
 
 
 # ===========================================
@@ -79,25 +82,25 @@ class RobotsBlockedError(ScraperError):
 class URLError(PerpeeError):
     """Base exception for URL-related errors."""
 
-    pass
+    __slots__ = ()
 
 
 class InvalidURLError(URLError):
     """URL format is invalid."""
 
-    pass
+    __slots__ = ()
 
 
 class UnsupportedStoreError(URLError):
     """Store is not whitelisted/supported."""
 
-    pass
+    __slots__ = ()
 
 
 class PrivateIPError(URLError):
     """URL resolves to private IP (SSRF protection)."""
 
-    pass
+    __slots__ = ()
 
 
 # ===========================================
@@ -108,18 +111,20 @@ class PrivateIPError(URLError):
 class AgentError(PerpeeError):
     """Base exception for agent-related errors."""
 
-    pass
+    __slots__ = ()
 
 
 class TokenLimitError(AgentError):
     """Token limit exceeded (daily or per-request)."""
 
-    pass
+    __slots__ = ()
 
 
 class ToolExecutionError(AgentError):
     """Tool execution failed."""
 
+    __slots__ = ("tool_name",)
+
     def __init__(self, tool_name: str, message: str, details: dict | None = None):
         self.tool_name = tool_name
         super().__init__(f"Tool '{tool_name}' failed: {message}", details)
@@ -128,7 +133,7 @@ class ToolExecutionError(AgentError):
 class ModelError(AgentError):
     """LLM model returned an error."""
 
-    pass
+    __slots__ = ()
 
 
 # ===========================================
@@ -139,12 +144,14 @@ class ModelError(AgentError):
 class DatabaseError(PerpeeError):
     """Base exception for database errors."""
 
-    pass
+    __slots__ = ()
 
 
 class RecordNotFoundError(DatabaseError):
     """Requested record not found in database."""
 
+    __slots__ = ()
+
     def __init__(self, model: str, id: int | str):
         super().__init__(f"{model} with id '{id}' not found", {"model": model, "id": id})
 
@@ -152,7 +159,7 @@ class RecordNotFoundError(DatabaseError):
 class DuplicateRecordError(DatabaseError):
     """Attempt to create duplicate record."""
 
-    pass
+    __slots__ = ()
 
 
 # ===========================================
@@ -163,13 +170,13 @@ class DuplicateRecordError(DatabaseError):
 class NotificationError(PerpeeError):
     """Base exception for notification errors."""
 
-    pass
+    __slots__ = ()
 
 
 class EmailDeliveryError(NotificationError):
     """Email delivery failed."""
 
-    pass
+    __slots__ = ()
 
 
 # ===========================================
@@ -180,6 +187,8 @@ class EmailDeliveryError(NotificationError):
 class RateLimitError(PerpeeError):
     """Rate limit exceeded."""
 
+    __slots__ = ("limit_type", "retry_after")
+
     def __init__(self, limit_type: str, retry_after: int | None = None):
         self.limit_type = limit_type
         self.retry_after = retry_after
@@ -197,7 +206,7 @@ class RateLimitError(PerpeeError):
 class ValidationError(PerpeeError):
     """Input validation failed."""
 
-    pass
+    __slots__ = ()
 
 
 # ===========================================
@@ -208,25 +217,25 @@ class ValidationError(PerpeeError):
 class RAGError(PerpeeError):
     """Base exception for RAG-related errors."""
 
-    pass
+    __slots__ = ()
 
 
 class EmbeddingError(RAGError):
     """Embedding generation failed."""
 
-    pass
+    __slots__ = ()
 
 
 class SearchError(RAGError):
     """Semantic search failed."""
 
-    pass
+    __slots__ = ()
 
 
 class IndexSyncError(RAGError):
     """Index synchronization failed."""
 
-    pass
+    __slots__ = ()
 
 
 # ===========================================
@@ -237,19 +246,19 @@ class IndexSyncError(RAGError):
 class HealingError(PerpeeError):
     """Base exception for self-healing errors."""
 
-    pass
+    __slots__ = ()
 
 
 class SelectorRegenerationError(HealingError):
     """Selector regeneration failed."""
 
-    pass
+    __slots__ = ()
 
 
 class HealingLimitExceededError(HealingError):
     """Maximum healing attempts exceeded."""
 
-    pass
+    __slots__ = ()
 
 
 # ===========================================
@@ -260,16 +269,16 @@ class HealingLimitExceededError(HealingError):
 class SchedulerError(PerpeeError):
     """Base exception for scheduler errors."""
 
-    pass
+    __slots__ = ()
 
 
 class InvalidCronError(SchedulerError):
     """Invalid CRON expression."""
 
-    pass
+    __slots__ = ()
 
 
 class ScheduleConflictError(SchedulerError):
     """Schedule conflict detected."""
 
-    pass
+    __slots__ = ()
@@ -3,12 +3,18 @@ Security utilities for Perpee.
 Includes URL validation, SSRF protection, and content sanitization.
 """
 
+import asyncio
+import functools
 import ipaddress
 import re
 import socket
-from urllib.parse import urlparse
+import time
+from html import escape as html_escape
+from urllib.parse import ParseResult, urlparse
 
 import bleach
+import lxml.html
+from lxml import etree
 
 from src.core.constants import (
     ALLOWED_HTML_TAGS,
@@ -18,35 +24,42 @@ from src.core.constants import (
 )
 from src.core.exceptions import InvalidURLError, PrivateIPError, UnsupportedStoreError
 
+# Precompiled patterns for the validation/sanitization hot paths
+_DOMAIN_RE = re.compile(r"^[a-z0-9]([a-z0-9-]*[a-z0-9])?(\.[a-z0-9]([a-z0-9-]*[a-z0-9])?)*$")
+_CTRL_RE = re.compile(r"[\x00-\x08\x0b\x0c\x0e-\x1f\x7f]")
+_PUNCT_RE = re.compile(r"[!@#$%^&*()_+=\[\]{}|\\:\";<>?,./]{3,}")
+# Number with optional commas and decimals (1,234.56, 1234.56, .99); every
+# comma is a thousands separator, so "12,99" reads as 1299
+_PRICE_RE = re.compile(r"\d[\d,]*(?:\.\d+)?|\.\d+")
+
+# Default whitelist: P0 domains plus the bare form of any www.-prefixed
+# entry, so a single hashed lookup matches both spellings.
+_P0_WHITELIST = P0_STORES | frozenset(
+    store.removeprefix("www.") for store in P0_STORES if store.startswith("www.")
+)
+
+# Resolved addresses per hostname: hostname -> (expires_at, ip strings)
+_DNS_CACHE_TTL = 300
+_DNS_CACHE_MAX = 1024
+_dns_cache: dict[str, tuple[float, list[str]]] = {}
+
 # ===========================================
 # URL Validation
 # ===========================================
 
 
-def validate_url(url: str) -> str:
-    """
-    Validate URL format and return normalized URL.
+def _hostname(parsed: ParseResult) -> str:
+    """Lowercased host of a parsed URL, without port."""
+    return parsed.netloc.lower().split(":", 1)[0]
 
-    Args:
-        url: URL string to validate
 
-    Returns:
-        Normalized URL string
+def _validate_parsed(parsed: ParseResult) -> ParseResult:
+    """
+    Check scheme and domain of a parsed URL.
 
     Raises:
         InvalidURLError: If URL format is invalid
     """
-    if not url or not isinstance(url, str):
-        raise InvalidURLError("URL cannot be empty")
-
-    url = url.strip()
-
-    # Parse URL
-    try:
-        parsed = urlparse(url)
-    except Exception as e:
-        raise InvalidURLError(f"Failed to parse URL: {e}") from e
-
     # Validate scheme
     if parsed.scheme not in ("http", "https"):
         raise InvalidURLError(f"Invalid URL scheme: {parsed.scheme}. Must be http or https.")
@@ -55,45 +68,84 @@ def validate_url(url: str) -> str:
     if not parsed.netloc:
         raise InvalidURLError("URL must have a valid domain")
 
-    # Validate domain format
-    domain = parsed.netloc.lower()
-    if ":" in domain:
-        domain = domain.split(":")[0]  # Remove port
-
     # Basic domain validation
-    if not re.match(r"^[a-z0-9]([a-z0-9-]*[a-z0-9])?(\.[a-z0-9]([a-z0-9-]*[a-z0-9])?)*$", domain):
+    domain = _hostname(parsed)
+    if not _DOMAIN_RE.match(domain):
         raise InvalidURLError(f"Invalid domain format: {domain}")
 
-    # Normalize URL
+    return parsed
+
+
+@functools.lru_cache(maxsize=8192)
+def _parse_and_validate(url: str) -> ParseResult:
+    """
+    Parse and validate a URL once; callers share the parsed result.
+
+    Results are memoized; invalid URLs raise and are not cached.
+
+    Raises:
+        InvalidURLError: If URL format is invalid
+    """
+    if not url or not isinstance(url, str):
+        raise InvalidURLError("URL cannot be empty")
+
+    try:
+        parsed = urlparse(url.strip())
+    except Exception as e:
+        raise InvalidURLError(f"Failed to parse URL: {e}") from e
+
+    return _validate_parsed(parsed)
+
+
+def _rebuild(parsed: ParseResult) -> str:
+    """Normalized URL string (scheme, host, path and query only)."""
     normalized = f"{parsed.scheme}://{parsed.netloc}{parsed.path}"
     if parsed.query:
         normalized += f"?{parsed.query}"
-
     return normalized
 
 
-def extract_domain(url: str) -> str:
+def validate_url(url: str) -> str:
+    """
+    Validate URL format and return normalized URL.
+
+    Args:
+        url: URL string to validate
+
+    Returns:
+        Normalized URL string
+
+    Raises:
+        InvalidURLError: If URL format is invalid
+    """
+    return _rebuild(_parse_and_validate(url))
+
+
+@functools.lru_cache(maxsize=16384)
+def extract_domain(url: str | ParseResult) -> str:
     """
     Extract domain from URL.
 
+    Results are memoized.
+
     Args:
-        url: URL string
+        url: URL string, or an already parsed URL
 
     Returns:
         Domain string (e.g., 'amazon.ca')
     """
-    parsed = urlparse(url)
-    domain = parsed.netloc.lower()
+    parsed = url if isinstance(url, ParseResult) else urlparse(url)
+    return _hostname(parsed).removeprefix("www.")
 
-    # Remove port if present
-    if ":" in domain:
-        domain = domain.split(":")[0]
 
-    # Remove www. prefix
-    if domain.startswith("www."):
-        domain = domain[4:]
+def _is_whitelisted_domain(domain: str, whitelist: list[str] | None) -> bool:
+    """Check an extracted domain against the whitelist (P0 stores by default)."""
+    if whitelist is None:
+        # Precomputed set already folds in the www. variants
+        return domain in _P0_WHITELIST
 
-    return domain
+    # Check exact match and www. variant
+    return domain in whitelist or f"www.{domain}" in whitelist
 
 
 def is_whitelisted_store(url: str, whitelist: list[str] | None = None) -> bool:
@@ -107,13 +159,7 @@ def is_whitelisted_store(url: str, whitelist: list[str] | None = None) -> bool:
     Returns:
         True if domain is whitelisted
     """
-    if whitelist is None:
-        whitelist = P0_STORES
-
-    domain = extract_domain(url)
-
-    # Check exact match and www. variant
-    return domain in whitelist or f"www.{domain}" in whitelist
+    return _is_whitelisted_domain(extract_domain(url), whitelist)
 
 
 def validate_whitelisted_url(url: str, whitelist: list[str] | None = None) -> str:
@@ -131,15 +177,15 @@ def validate_whitelisted_url(url: str, whitelist: list[str] | None = None) -> st
         InvalidURLError: If URL format is invalid
         UnsupportedStoreError: If store is not whitelisted
     """
-    normalized_url = validate_url(url)
+    parsed = _parse_and_validate(url)
 
-    if not is_whitelisted_store(normalized_url, whitelist):
-        domain = extract_domain(normalized_url)
+    domain = extract_domain(parsed)
+    if not _is_whitelisted_domain(domain, whitelist):
         raise UnsupportedStoreError(
             f"Store '{domain}' is not supported. Use scan_website tool first."
         )
 
-    return normalized_url
+    return _rebuild(parsed)
 
 
 # ===========================================
@@ -147,10 +193,27 @@ def validate_whitelisted_url(url: str, whitelist: list[str] | None = None) -> st
 # ===========================================
 
 
+# Private networks parsed once at import, split by address family
+_PRIVATE_V4 = tuple(
+    ipaddress.ip_network(range_str, strict=False)
+    for range_str in PRIVATE_IP_RANGES
+    if ":" not in range_str
+)
+_PRIVATE_V6 = tuple(
+    ipaddress.ip_network(range_str, strict=False)
+    for range_str in PRIVATE_IP_RANGES
+    if ":" in range_str
+)
+
+
+@functools.lru_cache(maxsize=4096)
 def is_private_ip(ip: str) -> bool:
     """
     Check if IP address is private/internal.
 
+    Results are cached per IP string since scrapes resolve the same
+    store hostnames over and over.
+
     Args:
         ip: IP address string
 
@@ -159,20 +222,43 @@ def is_private_ip(ip: str) -> bool:
     """
     try:
         ip_obj = ipaddress.ip_address(ip)
-
-        # Check against private ranges
-        for range_str in PRIVATE_IP_RANGES:
-            network = ipaddress.ip_network(range_str, strict=False)
-            if ip_obj in network:
-                return True
-
-        return False
     except ValueError:
         # If we can't parse the IP, be safe and reject
         return True
 
+    networks = _PRIVATE_V4 if isinstance(ip_obj, ipaddress.IPv4Address) else _PRIVATE_V6
+    return any(ip_obj in network for network in networks)
+
+
+async def _resolve_host(hostname: str) -> list[str]:
+    """
+    Resolve hostname to IP strings without blocking the event loop.
+
+    Results are cached for _DNS_CACHE_TTL seconds.
 
-def resolve_and_validate_url(url: str) -> str:
+    Raises:
+        socket.gaierror: If DNS resolution fails
+    """
+    now = time.monotonic()
+    cached = _dns_cache.get(hostname)
+    if cached is not None and cached[0] > now:
+        return cached[1]
+
+    loop = asyncio.get_running_loop()
+    addr_infos = await loop.getaddrinfo(hostname, None)
+    ips = list(dict.fromkeys(info[4][0] for info in addr_infos))
+
+    if len(_dns_cache) >= _DNS_CACHE_MAX:
+        # Drop expired entries first, then the oldest insertion if still full
+        for key in [k for k, (expires, _) in _dns_cache.items() if expires <= now]:
+            del _dns_cache[key]
+        if len(_dns_cache) >= _DNS_CACHE_MAX:
+            del _dns_cache[next(iter(_dns_cache))]
+    _dns_cache[hostname] = (now + _DNS_CACHE_TTL, ips)
+    return ips
+
+
+async def resolve_and_validate_url(url: str) -> str:
     """
     Resolve URL's domain to IP and check for SSRF.
 
@@ -187,30 +273,24 @@ def resolve_and_validate_url(url: str) -> str:
         InvalidURLError: If DNS resolution fails
     """
     # First validate URL format
-    validated_url = validate_url(url)
-
-    # Extract hostname
-    parsed = urlparse(validated_url)
-    hostname = parsed.netloc
-    if ":" in hostname:
-        hostname = hostname.split(":")[0]
+    parsed = _parse_and_validate(url)
+    hostname = _hostname(parsed)
 
     # Resolve DNS
     try:
-        ip_addresses = socket.getaddrinfo(hostname, None)
+        ip_addresses = await _resolve_host(hostname)
     except socket.gaierror as e:
         raise InvalidURLError(f"DNS resolution failed for {hostname}: {e}") from e
 
     # Check all resolved IPs
-    for addr_info in ip_addresses:
-        ip = addr_info[4][0]
+    for ip in ip_addresses:
         if is_private_ip(ip):
             raise PrivateIPError(
                 f"URL resolves to private IP: {ip}",
                 {"url": url, "ip": ip, "hostname": hostname},
             )
 
-    return validated_url
+    return _rebuild(parsed)
 
 
 # ===========================================
@@ -231,8 +311,19 @@ def sanitize_html(html: str) -> str:
     if not html:
         return ""
 
-    # Use bleach to strip all tags
-    cleaned = bleach.clean(html, tags=ALLOWED_HTML_TAGS, strip=True)
+    if ALLOWED_HTML_TAGS:
+        # Partial allow-list needs bleach's full sanitizer
+        cleaned = bleach.clean(html, tags=ALLOWED_HTML_TAGS, strip=True)
+    else:
+        # Strip-everything case: lxml's C parser pulls the text out far faster
+        # than bleach's html5lib pipeline. Re-escape &, < and > so the output
+        # matches what bleach would have produced for text nodes.
+        try:
+            text = lxml.html.fragment_fromstring(html, create_parent="div").text_content()
+        except (etree.ParserError, ValueError):
+            cleaned = bleach.clean(html, tags=[], strip=True)
+        else:
+            cleaned = html_escape(text, quote=False)
 
     # Normalize whitespace
     cleaned = " ".join(cleaned.split())
@@ -258,7 +349,7 @@ def sanitize_text(text: str) -> str:
         return ""
 
     # Remove control characters (except newlines and tabs)
-    cleaned = re.sub(r"[\x00-\x08\x0b\x0c\x0e-\x1f\x7f]", "", text)
+    cleaned = _CTRL_RE.sub("", text)
 
     # Normalize whitespace
     cleaned = " ".join(cleaned.split())
@@ -284,7 +375,7 @@ def sanitize_product_name(name: str) -> str:
 
     # Additional product-specific cleaning
     # Remove excessive punctuation
-    sanitized = re.sub(r"[!@#$%^&*()_+=\[\]{}|\\:\";<>?,./]{3,}", "", sanitized)
+    sanitized = _PUNCT_RE.sub("", sanitized)
 
     # Limit length
     if len(sanitized) > 500:
@@ -311,28 +402,19 @@ def normalize_price(price_str: str) -> float | None:
     if not price_str:
         return None
 
-    # Remove currency symbols and text
-    cleaned = re.sub(r"[A-Za-z$€£¥]", "", price_str)
-
-    # Remove commas (thousand separators)
-    cleaned = cleaned.replace(",", "")
-
-    # Remove whitespace
-    cleaned = cleaned.strip()
+    # First numeric token; for ranges ("$10 - $20") that is the lower price
+    match = _PRICE_RE.search(price_str)
+    if match is None:
+        return None
 
-    # Handle ranges (take lower price)
-    if "-" in cleaned and cleaned.count("-") == 1:
-        parts = cleaned.split("-")
-        cleaned = parts[0].strip()
+    # A minus before the number is a negative price, not a range
+    if "-" in price_str[: match.start()]:
+        return None
 
-    try:
-        price = float(cleaned)
-        # Validate range
-        if price < 0.01 or price > 1_000_000:
-            return None
-        return round(price, 2)
-    except (ValueError, TypeError):
+    price = float(match.group().replace(",", ""))
+    if not 0.01 <= price <= 1_000_000:
         return None
+    return round(price, 2)
 
 
 def validate_price(price: float) -> bool:
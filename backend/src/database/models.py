@@ -3,10 +3,14 @@ SQLModel database models for Perpee.
 All models use soft delete (deleted_at) where appropriate.
 """
 
+import hashlib
 from datetime import datetime
 from enum import Enum
 from typing import Any
 
+from sqlalchemy import BigInteger, DateTime, Index, and_, bindparam, literal_column, text
+from sqlalchemy.ext.compiler import compiles
+from sqlalchemy.sql import expression
 from sqlmodel import JSON, Column, Field, Relationship, SQLModel
 
 # ===========================================
@@ -70,6 +74,81 @@ class ExtractionStrategy(str, Enum):
     LLM = "llm"
 
 
+# ===========================================
+# Server-Side Timestamps
+# ===========================================
+
+
+class utcnow(expression.FunctionElement):
+    """Current UTC time evaluated by the database (naive, like the rest of the schema)."""
+
+    type = DateTime()
+    inherit_cache = True
+
+
+@compiles(utcnow)
+def _utcnow_default(element, compiler, **kw) -> str:
+    return "CURRENT_TIMESTAMP"
+
+
+@compiles(utcnow, "sqlite")
+def _utcnow_sqlite(element, compiler, **kw) -> str:
+    # CURRENT_TIMESTAMP only has second precision. SQLite gives milliseconds;
+    # pad to SQLAlchemy's microsecond format so stored values compare exactly
+    return "STRFTIME('%Y-%m-%d %H:%M:%f000', 'now')"
+
+
+@compiles(utcnow, "postgresql")
+def _utcnow_postgresql(element, compiler, **kw) -> str:
+    return "TIMEZONE('utc', CURRENT_TIMESTAMP)"
+
+
+def _created_at_field(**kwargs: Any) -> Any:
+    """Timestamp column filled in by the database on INSERT."""
+    return Field(
+        default=None,
+        nullable=False,
+        sa_column_kwargs={"server_default": utcnow()},
+        **kwargs,
+    )
+
+
+def _updated_at_field() -> Any:
+    """Timestamp column filled in by the database on INSERT and UPDATE."""
+    return Field(
+        default=None,
+        nullable=False,
+        sa_column_kwargs={"server_default": utcnow(), "onupdate": utcnow()},
+    )
+
+
+def url_hash(url: str) -> int:
+    """Signed 64-bit prefix of SHA-256(url), used as the indexed product URL key."""
+    return int.from_bytes(hashlib.sha256(url.encode()).digest()[:8], "big", signed=True)
+
+
+def _url_hash_default(context: Any) -> int:
+    return url_hash(context.get_current_parameters()["url"])
+
+
+# Fetch server-generated columns via RETURNING instead of expiring them
+_MAPPER_ARGS = {"eager_defaults": True}
+
+
+# ===========================================
+# Index Predicates
+# ===========================================
+
+# Enum columns store member names, hence 'ACTIVE' rather than 'active'
+_ACTIVE_PRODUCT_WHERE = text("status = 'ACTIVE' AND deleted_at IS NULL")
+_PENDING_ALERT_WHERE = text("is_active AND NOT is_triggered AND deleted_at IS NULL")
+_NEEDS_ATTENTION_WHERE = text(
+    "status IN ('NEEDS_ATTENTION', 'PRICE_UNAVAILABLE') AND deleted_at IS NULL"
+)
+_FAILED_SCRAPE_WHERE = text("NOT success")
+_ACTIVE_STORE_WHERE = text("is_active")
+
+
 # ===========================================
 # Base Model
 # ===========================================
@@ -78,8 +157,8 @@ class ExtractionStrategy(str, Enum):
 class TimestampMixin(SQLModel):
     """Mixin for created_at and updated_at timestamps."""
 
-    created_at: datetime = Field(default_factory=datetime.utcnow)
-    updated_at: datetime = Field(default_factory=datetime.utcnow)
+    created_at: datetime | None = _created_at_field()
+    updated_at: datetime | None = _updated_at_field()
 
 
 # ===========================================
@@ -94,6 +173,15 @@ class Store(SQLModel, table=True):
     """
 
     __tablename__ = "stores"
+    __mapper_args__ = _MAPPER_ARGS
+    __table_args__ = (
+        Index(
+            "ix_stores_active",
+            "domain",
+            sqlite_where=_ACTIVE_STORE_WHERE,
+            postgresql_where=_ACTIVE_STORE_WHERE,
+        ),
+    )
 
     domain: str = Field(primary_key=True, max_length=255)
     name: str = Field(max_length=255)
@@ -111,8 +199,8 @@ class Store(SQLModel, table=True):
     last_success_at: datetime | None = Field(default=None)
 
     # Timestamps
-    created_at: datetime = Field(default_factory=datetime.utcnow)
-    updated_at: datetime = Field(default_factory=datetime.utcnow)
+    created_at: datetime | None = _created_at_field()
+    updated_at: datetime | None = _updated_at_field()
 
     # Relationships
     products: list["Product"] = Relationship(back_populates="store")
@@ -131,6 +219,7 @@ class CanonicalProduct(SQLModel, table=True):
     """
 
     __tablename__ = "canonical_products"
+    __mapper_args__ = _MAPPER_ARGS
 
     id: int | None = Field(default=None, primary_key=True)
     name: str = Field(max_length=500)
@@ -142,8 +231,8 @@ class CanonicalProduct(SQLModel, table=True):
     deleted_at: datetime | None = Field(default=None)
 
     # Timestamps
-    created_at: datetime = Field(default_factory=datetime.utcnow)
-    updated_at: datetime = Field(default_factory=datetime.utcnow)
+    created_at: datetime | None = _created_at_field()
+    updated_at: datetime | None = _updated_at_field()
 
     # Relationships
     products: list["Product"] = Relationship(back_populates="canonical_product")
@@ -160,9 +249,32 @@ class Product(SQLModel, table=True):
     """
 
     __tablename__ = "products"
+    __mapper_args__ = _MAPPER_ARGS
+    __table_args__ = (
+        Index(
+            "ix_products_active",
+            "id",
+            sqlite_where=_ACTIVE_PRODUCT_WHERE,
+            postgresql_where=_ACTIVE_PRODUCT_WHERE,
+        ),
+        Index(
+            "ix_products_attention",
+            "id",
+            sqlite_where=_NEEDS_ATTENTION_WHERE,
+            postgresql_where=_NEEDS_ATTENTION_WHERE,
+        ),
+    )
 
     id: int | None = Field(default=None, primary_key=True)
-    url: str = Field(max_length=2048, index=True)
+    url: str = Field(max_length=2048)
+    # Indexed in place of url; look up with url_hash == url_hash(url) AND url == url
+    url_hash: int | None = Field(
+        default=None,
+        sa_type=BigInteger,
+        nullable=False,
+        index=True,
+        sa_column_kwargs={"default": _url_hash_default},
+    )
     store_domain: str = Field(foreign_key="stores.domain", max_length=255, index=True)
 
     # Product info
@@ -189,17 +301,28 @@ class Product(SQLModel, table=True):
     deleted_at: datetime | None = Field(default=None)
 
     # Timestamps
-    created_at: datetime = Field(default_factory=datetime.utcnow)
-    updated_at: datetime = Field(default_factory=datetime.utcnow)
+    created_at: datetime | None = _created_at_field()
+    updated_at: datetime | None = _updated_at_field()
 
     # Relationships
     store: Store | None = Relationship(back_populates="products")
     canonical_product: CanonicalProduct | None = Relationship(back_populates="products")
-    price_history: list["PriceHistory"] = Relationship(back_populates="product")
-    alerts: list["Alert"] = Relationship(back_populates="product")
-    schedules: list["Schedule"] = Relationship(back_populates="product")
-    scrape_logs: list["ScrapeLog"] = Relationship(back_populates="product")
-    notifications: list["Notification"] = Relationship(back_populates="product")
+    # Children are removed by ON DELETE CASCADE, not loaded and deleted one by one
+    price_history: list["PriceHistory"] = Relationship(
+        back_populates="product", cascade_delete=True, passive_deletes=True
+    )
+    alerts: list["Alert"] = Relationship(
+        back_populates="product", cascade_delete=True, passive_deletes=True
+    )
+    schedules: list["Schedule"] = Relationship(
+        back_populates="product", cascade_delete=True, passive_deletes=True
+    )
+    scrape_logs: list["ScrapeLog"] = Relationship(
+        back_populates="product", cascade_delete=True, passive_deletes=True
+    )
+    notifications: list["Notification"] = Relationship(
+        back_populates="product", cascade_delete=True, passive_deletes=True
+    )
 
 
 # ===========================================
@@ -213,15 +336,17 @@ class PriceHistory(SQLModel, table=True):
     """
 
     __tablename__ = "price_history"
+    __mapper_args__ = _MAPPER_ARGS
+    __table_args__ = (Index("ix_price_history_product_scraped", "product_id", "scraped_at"),)
 
     id: int | None = Field(default=None, primary_key=True)
-    product_id: int = Field(foreign_key="products.id", index=True)
+    product_id: int = Field(foreign_key="products.id", ondelete="CASCADE", index=True)
 
     price: float
     original_price: float | None = Field(default=None)
     in_stock: bool = Field(default=True)
 
-    scraped_at: datetime = Field(default_factory=datetime.utcnow, index=True)
+    scraped_at: datetime | None = _created_at_field(index=True)
 
     # Relationships
     product: Product | None = Relationship(back_populates="price_history")
@@ -238,9 +363,18 @@ class Alert(SQLModel, table=True):
     """
 
     __tablename__ = "alerts"
+    __mapper_args__ = _MAPPER_ARGS
+    __table_args__ = (
+        Index(
+            "ix_alerts_active_untriggered",
+            "product_id",
+            sqlite_where=_PENDING_ALERT_WHERE,
+            postgresql_where=_PENDING_ALERT_WHERE,
+        ),
+    )
 
     id: int | None = Field(default=None, primary_key=True)
-    product_id: int = Field(foreign_key="products.id", index=True)
+    product_id: int = Field(foreign_key="products.id", ondelete="CASCADE", index=True)
 
     alert_type: AlertType
     target_value: float | None = Field(default=None)  # For target_price or percent_drop
@@ -254,12 +388,12 @@ class Alert(SQLModel, table=True):
     deleted_at: datetime | None = Field(default=None)
 
     # Timestamps
-    created_at: datetime = Field(default_factory=datetime.utcnow)
-    updated_at: datetime = Field(default_factory=datetime.utcnow)
+    created_at: datetime | None = _created_at_field()
+    updated_at: datetime | None = _updated_at_field()
 
     # Relationships
     product: Product | None = Relationship(back_populates="alerts")
-    notifications: list["Notification"] = Relationship(back_populates="alert")
+    notifications: list["Notification"] = Relationship(back_populates="alert", passive_deletes=True)
 
 
 # ===========================================
@@ -273,11 +407,14 @@ class Schedule(SQLModel, table=True):
     """
 
     __tablename__ = "schedules"
+    __mapper_args__ = _MAPPER_ARGS
 
     id: int | None = Field(default=None, primary_key=True)
 
     # Can be for a specific product or entire store
-    product_id: int | None = Field(default=None, foreign_key="products.id", index=True)
+    product_id: int | None = Field(
+        default=None, foreign_key="products.id", ondelete="CASCADE", index=True
+    )
     store_domain: str | None = Field(default=None, foreign_key="stores.domain", index=True)
 
     cron_expression: str = Field(max_length=100)  # e.g., "0 6 * * *"
@@ -290,8 +427,8 @@ class Schedule(SQLModel, table=True):
     deleted_at: datetime | None = Field(default=None)
 
     # Timestamps
-    created_at: datetime = Field(default_factory=datetime.utcnow)
-    updated_at: datetime = Field(default_factory=datetime.utcnow)
+    created_at: datetime | None = _created_at_field()
+    updated_at: datetime | None = _updated_at_field()
 
     # Relationships
     product: Product | None = Relationship(back_populates="schedules")
@@ -309,9 +446,21 @@ class ScrapeLog(SQLModel, table=True):
     """
 
     __tablename__ = "scrape_logs"
+    __mapper_args__ = _MAPPER_ARGS
+    __table_args__ = (
+        # success is included so health stats are answered from the index alone
+        Index("ix_scrape_logs_product_scraped_success", "product_id", "scraped_at", "success"),
+        Index(
+            "ix_scrape_logs_product_failed",
+            "product_id",
+            "scraped_at",
+            sqlite_where=_FAILED_SCRAPE_WHERE,
+            postgresql_where=_FAILED_SCRAPE_WHERE,
+        ),
+    )
 
     id: int | None = Field(default=None, primary_key=True)
-    product_id: int = Field(foreign_key="products.id", index=True)
+    product_id: int = Field(foreign_key="products.id", ondelete="CASCADE", index=True)
 
     success: bool
     strategy_used: ExtractionStrategy | None = Field(default=None)
@@ -320,7 +469,7 @@ class ScrapeLog(SQLModel, table=True):
     error_message: str | None = Field(default=None, max_length=1000)
 
     response_time_ms: int | None = Field(default=None)
-    scraped_at: datetime = Field(default_factory=datetime.utcnow, index=True)
+    scraped_at: datetime | None = _created_at_field(index=True)
 
     # Relationships
     product: Product | None = Relationship(back_populates="scrape_logs")
@@ -337,10 +486,16 @@ class Notification(SQLModel, table=True):
     """
 
     __tablename__ = "notifications"
+    __mapper_args__ = _MAPPER_ARGS
 
     id: int | None = Field(default=None, primary_key=True)
-    alert_id: int | None = Field(default=None, foreign_key="alerts.id", index=True)
-    product_id: int = Field(foreign_key="products.id", index=True)
+    alert_id: int | None = Field(
+        default=None, foreign_key="alerts.id", ondelete="SET NULL", index=True
+    )
+    # None for store-level notifications
+    product_id: int | None = Field(
+        default=None, foreign_key="products.id", ondelete="CASCADE", index=True
+    )
 
     channel: NotificationChannel = Field(default=NotificationChannel.EMAIL)
     status: NotificationStatus = Field(default=NotificationStatus.PENDING)
@@ -352,9 +507,40 @@ class Notification(SQLModel, table=True):
     error_message: str | None = Field(default=None, max_length=1000)
 
     # Timestamps
-    created_at: datetime = Field(default_factory=datetime.utcnow)
-    updated_at: datetime = Field(default_factory=datetime.utcnow)
+    created_at: datetime | None = _created_at_field()
+    updated_at: datetime | None = _updated_at_field()
 
     # Relationships
     alert: Alert | None = Relationship(back_populates="notifications")
     product: Product | None = Relationship(back_populates="notifications")
+
+
+# ===========================================
+# Query Predicates
+# ===========================================
+
+
+def _inline_status(status: ProductStatus) -> Any:
+    """A status rendered into the statement instead of bound as a parameter."""
+    return bindparam(None, status, type_=Product.status.type, literal_execute=True)
+
+
+# Table-qualified counterparts of the partial index predicates. SQLite only
+# uses a partial index when the query repeats its predicate, so the statuses
+# are rendered inline rather than bound, and boolean columns are written bare
+# since SQLAlchemy would render them as "is_active = 1".
+ACTIVE_PRODUCT_WHERE = and_(
+    Product.status == _inline_status(ProductStatus.ACTIVE),
+    Product.deleted_at.is_(None),
+)
+NEEDS_ATTENTION_WHERE = and_(
+    Product.status.in_(
+        [
+            _inline_status(ProductStatus.NEEDS_ATTENTION),
+            _inline_status(ProductStatus.PRICE_UNAVAILABLE),
+        ]
+    ),
+    Product.deleted_at.is_(None),
+)
+FAILED_SCRAPE_WHERE = ~literal_column(f"{ScrapeLog.__tablename__}.success")
+ACTIVE_STORE_WHERE = literal_column(f"{Store.__tablename__}.is_active")
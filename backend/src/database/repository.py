@@ -2,14 +2,22 @@
 Repository pattern for database CRUD operations.
 """
 
-from datetime import datetime
+import base64
+from collections.abc import AsyncIterator, Iterable, Sequence
+from datetime import datetime, timedelta
 from typing import Any, TypeVar
 
-from sqlalchemy import func, select
+import orjson
+from sqlalchemy import Row, case, func, insert, inspect, literal, select, text, tuple_
+from sqlalchemy import update as sql_update
+from sqlalchemy.dialects import postgresql, sqlite
 from sqlalchemy.ext.asyncio import AsyncSession
 from sqlmodel import SQLModel
 
 from src.database.models import (
+    ACTIVE_PRODUCT_WHERE,
+    ACTIVE_STORE_WHERE,
+    NEEDS_ATTENTION_WHERE,
     Alert,
     AlertType,
     CanonicalProduct,
@@ -21,10 +29,55 @@ from src.database.models import (
     Schedule,
     ScrapeLog,
     Store,
+    url_hash,
+    utcnow,
 )
+from src.database.retention import purge
 
 T = TypeVar("T", bound=SQLModel)
 
+# Rows fetched per round-trip by the iter_* streaming helpers
+STREAM_BATCH_SIZE = 500
+
+# Tables estimated smaller than this are counted exactly
+EXACT_COUNT_THRESHOLD = 100_000
+
+
+# ===========================================
+# Keyset Pagination
+# ===========================================
+
+
+def encode_cursor(*values: Any) -> str:
+    """Encode the ordering key of the last row on a page as an opaque cursor."""
+    return base64.urlsafe_b64encode(orjson.dumps(values)).decode()
+
+
+def decode_cursor(cursor: str) -> list[Any]:
+    """Decode a cursor produced by encode_cursor."""
+    try:
+        return orjson.loads(base64.urlsafe_b64decode(cursor))
+    except ValueError as e:
+        raise ValueError(f"Invalid pagination cursor: {cursor!r}") from e
+
+
+def _next_cursor(rows: list[Any], limit: int, *keys: str) -> str | None:
+    """Cursor for the page after rows, or None if this is the last page."""
+    if len(rows) < limit:
+        return None
+    last = rows[-1]
+    return encode_cursor(*(getattr(last, key) for key in keys))
+
+
+def _recent_page(query: Any, model: Any, cursor: str | None, limit: int) -> Any:
+    """Order newest-first by (scraped_at, id) and start after cursor."""
+    if cursor:
+        scraped_at, id = decode_cursor(cursor)
+        query = query.where(
+            tuple_(model.scraped_at, model.id) < tuple_(datetime.fromisoformat(scraped_at), id)
+        )
+    return query.order_by(model.scraped_at.desc(), model.id.desc()).limit(limit)
+
 
 # ===========================================
 # Generic CRUD Operations
@@ -40,51 +93,66 @@ async def get_all(
     session: AsyncSession,
     model: type[T],
     *,
-    skip: int = 0,
+    cursor: str | None = None,
     limit: int = 100,
     include_deleted: bool = False,
-) -> list[T]:
-    """Get all records with pagination."""
+) -> tuple[list[T], str | None]:
+    """Get a page of records in primary key order. Returns (records, next_cursor)."""
+    pk = inspect(model).primary_key[0]
     query = select(model)
 
     # Filter out soft-deleted records if model has deleted_at
     if hasattr(model, "deleted_at") and not include_deleted:
         query = query.where(model.deleted_at.is_(None))
 
-    query = query.offset(skip).limit(limit)
+    if cursor:
+        query = query.where(pk > decode_cursor(cursor)[0])
+
+    query = query.order_by(pk).limit(limit)
     result = await session.execute(query)
-    return list(result.scalars().all())
+    records = list(result.scalars().all())
+    return records, _next_cursor(records, limit, pk.key)
 
 
 async def create(session: AsyncSession, obj: T) -> T:
     """Create a new record."""
     session.add(obj)
     await session.flush()
-    await session.refresh(obj)
     return obj
 
 
-async def update(session: AsyncSession, obj: T, data: dict[str, Any]) -> T:
-    """Update a record with given data."""
-    for key, value in data.items():
-        if hasattr(obj, key):
-            setattr(obj, key, value)
+async def update(
+    session: AsyncSession,
+    model: type[T],
+    pk: Any,
+    data: dict[str, Any],
+    *,
+    include_deleted: bool = False,
+) -> T | None:
+    """
+    Update a record by primary key in one statement. Unknown keys are ignored.
+
+    Returns None if the record does not exist or has been soft-deleted.
+    """
+    mapper = inspect(model)
+    pk_column = mapper.primary_key[0]
+    values = {key: value for key, value in data.items() if key in mapper.columns}
+    if values:
+        stmt = sql_update(model).where(pk_column == pk).values(**values).returning(model)
+    else:
+        stmt = select(model).where(pk_column == pk)
 
-    if hasattr(obj, "updated_at"):
-        obj.updated_at = datetime.utcnow()
+    if hasattr(model, "deleted_at") and not include_deleted:
+        stmt = stmt.where(model.deleted_at.is_(None))
 
-    session.add(obj)
-    await session.flush()
-    await session.refresh(obj)
-    return obj
+    result = await session.execute(stmt.execution_options(populate_existing=True))
+    return result.scalar_one_or_none()
 
 
 async def soft_delete(session: AsyncSession, obj: T) -> T:
     """Soft delete a record by setting deleted_at."""
     if hasattr(obj, "deleted_at"):
         obj.deleted_at = datetime.utcnow()
-        if hasattr(obj, "updated_at"):
-            obj.updated_at = datetime.utcnow()
         session.add(obj)
         await session.flush()
     return obj
@@ -106,28 +174,43 @@ async def get_store_by_domain(session: AsyncSession, domain: str) -> Store | Non
     return await session.get(Store, domain)
 
 
+async def get_stores_by_domains(session: AsyncSession, domains: Iterable[str]) -> dict[str, Store]:
+    """Get several stores in one query, keyed by domain."""
+    domains = set(domains)
+    if not domains:
+        return {}
+    result = await session.execute(select(Store).where(Store.domain.in_(domains)))
+    return {store.domain: store for store in result.scalars()}
+
+
 async def get_whitelisted_stores(session: AsyncSession) -> list[Store]:
     """Get all whitelisted stores."""
-    query = select(Store).where(Store.is_whitelisted.is_(True), Store.is_active.is_(True))
+    query = select(Store).where(Store.is_whitelisted.is_(True), ACTIVE_STORE_WHERE)
     result = await session.execute(query)
     return list(result.scalars().all())
 
 
+def _dialect_insert(session: AsyncSession, model: type[T]) -> Any:
+    """INSERT supporting ON CONFLICT for the session's database."""
+    if session.get_bind().dialect.name == "postgresql":
+        return postgresql.insert(model)
+    return sqlite.insert(model)
+
+
 async def upsert_store(session: AsyncSession, store: Store) -> Store:
-    """Insert or update a store."""
-    existing = await get_store_by_domain(session, store.domain)
-    if existing:
-        for key, value in store.model_dump(exclude={"domain"}).items():
-            if value is not None:
-                setattr(existing, key, value)
-        existing.updated_at = datetime.utcnow()
-        await session.flush()
-        return existing
-    else:
-        session.add(store)
-        await session.flush()
-        await session.refresh(store)
-        return store
+    """Insert or update a store in one statement. Fields left as None are not overwritten."""
+    values = store.model_dump(exclude_none=True)
+    stmt = _dialect_insert(session, Store).values(**values)
+    stmt = stmt.on_conflict_do_update(
+        index_elements=[Store.domain],
+        set_={
+            **{key: stmt.excluded[key] for key in values if key != "domain"},
+            "updated_at": utcnow(),
+        },
+    )
+    stmt = stmt.returning(Store).execution_options(populate_existing=True)
+    result = await session.execute(stmt)
+    return result.scalar_one()
 
 
 # ===========================================
@@ -137,20 +220,34 @@ async def upsert_store(session: AsyncSession, store: Store) -> Store:
 
 async def get_product_by_url(session: AsyncSession, url: str) -> Product | None:
     """Get product by URL."""
-    query = select(Product).where(Product.url == url, Product.deleted_at.is_(None))
+    query = select(Product).where(
+        Product.url_hash == url_hash(url),
+        Product.url == url,
+        Product.deleted_at.is_(None),
+    )
     result = await session.execute(query)
     return result.scalar_one_or_none()
 
 
+async def get_products_by_ids(session: AsyncSession, ids: Iterable[int]) -> dict[int, Product]:
+    """Get several non-deleted products in one query, keyed by id."""
+    ids = set(ids)
+    if not ids:
+        return {}
+    query = select(Product).where(Product.id.in_(ids), Product.deleted_at.is_(None))
+    result = await session.execute(query)
+    return {product.id: product for product in result.scalars()}
+
+
 async def get_products_by_store(
     session: AsyncSession,
     store_domain: str,
     *,
     status: ProductStatus | None = None,
-    skip: int = 0,
+    cursor: str | None = None,
     limit: int = 100,
-) -> list[Product]:
-    """Get products for a specific store."""
+) -> tuple[list[Product], str | None]:
+    """Get a page of products for a specific store. Returns (products, next_cursor)."""
     query = select(Product).where(
         Product.store_domain == store_domain,
         Product.deleted_at.is_(None),
@@ -159,65 +256,105 @@ async def get_products_by_store(
     if status:
         query = query.where(Product.status == status)
 
-    query = query.offset(skip).limit(limit)
+    if cursor:
+        query = query.where(Product.id > decode_cursor(cursor)[0])
+
+    query = query.order_by(Product.id).limit(limit)
     result = await session.execute(query)
-    return list(result.scalars().all())
+    products = list(result.scalars().all())
+    return products, _next_cursor(products, limit, "id")
 
 
 async def get_active_products(
     session: AsyncSession,
     *,
-    skip: int = 0,
+    cursor: str | None = None,
     limit: int = 100,
-) -> list[Product]:
-    """Get all active products for monitoring."""
-    query = (
-        select(Product)
-        .where(
-            Product.status == ProductStatus.ACTIVE,
-            Product.deleted_at.is_(None),
-        )
-        .offset(skip)
-        .limit(limit)
-    )
+) -> tuple[list[Product], str | None]:
+    """Get a page of active products for monitoring. Returns (products, next_cursor)."""
+    query = select(Product).where(ACTIVE_PRODUCT_WHERE)
+
+    if cursor:
+        query = query.where(Product.id > decode_cursor(cursor)[0])
+
+    query = query.order_by(Product.id).limit(limit)
     result = await session.execute(query)
-    return list(result.scalars().all())
+    products = list(result.scalars().all())
+    return products, _next_cursor(products, limit, "id")
 
 
-async def get_products_needing_attention(session: AsyncSession) -> list[Product]:
-    """Get products that need user attention."""
-    query = select(Product).where(
-        Product.status.in_([ProductStatus.NEEDS_ATTENTION, ProductStatus.PRICE_UNAVAILABLE]),
-        Product.deleted_at.is_(None),
-    )
+async def _stream(session: AsyncSession, query: Any) -> AsyncIterator[Any]:
+    """Yield ORM objects from query, fetching STREAM_BATCH_SIZE rows at a time."""
+    result = await session.stream(query.execution_options(yield_per=STREAM_BATCH_SIZE))
+    async for obj in result.scalars():
+        yield obj
+
+
+def _needing_attention_query(*entities: Any) -> Any:
+    """Products flagged for the user, not yet deleted."""
+    return select(*(entities or (Product,))).where(NEEDS_ATTENTION_WHERE)
+
+
+async def get_products_needing_attention(
+    session: AsyncSession,
+    *,
+    columns: Sequence[Any] | None = None,
+    limit: int | None = None,
+) -> list[Product] | list[Row]:
+    """
+    Get products that need user attention.
+
+    Pass columns (e.g. [Product.id, Product.url]) to get lightweight rows
+    instead of full Product objects. Returns every match unless limit is set.
+    """
+    query = _needing_attention_query(*(columns or ())).limit(limit)
     result = await session.execute(query)
+    if columns:
+        return list(result.all())
     return list(result.scalars().all())
 
 
-async def increment_product_failures(session: AsyncSession, product: Product) -> Product:
-    """Increment failure count and update status if needed."""
-    product.consecutive_failures += 1
-    product.updated_at = datetime.utcnow()
+def iter_products_needing_attention(session: AsyncSession) -> AsyncIterator[Product]:
+    """Stream all products that need user attention."""
+    return _stream(session, _needing_attention_query())
 
-    # After 3 consecutive failures, mark as needs_attention
-    if product.consecutive_failures >= 3:
-        product.status = ProductStatus.NEEDS_ATTENTION
 
-    session.add(product)
-    await session.flush()
-    return product
+async def increment_product_failures(session: AsyncSession, product: Product) -> Product:
+    """Increment failure count and update status if needed."""
+    failures = Product.consecutive_failures + 1
+    stmt = (
+        sql_update(Product)
+        .where(Product.id == product.id)
+        .values(
+            consecutive_failures=failures,
+            # After 3 consecutive failures, mark as needs_attention
+            status=case(
+                (failures >= 3, literal(ProductStatus.NEEDS_ATTENTION, Product.status.type)),
+                else_=Product.status,
+            ),
+        )
+        .returning(Product)
+        .execution_options(populate_existing=True)
+    )
+    result = await session.execute(stmt)
+    return result.scalar_one()
 
 
 async def reset_product_failures(session: AsyncSession, product: Product) -> Product:
     """Reset failure count after successful scrape."""
-    product.consecutive_failures = 0
-    product.status = ProductStatus.ACTIVE
-    product.last_checked_at = datetime.utcnow()
-    product.updated_at = datetime.utcnow()
-
-    session.add(product)
-    await session.flush()
-    return product
+    stmt = (
+        sql_update(Product)
+        .where(Product.id == product.id)
+        .values(
+            consecutive_failures=0,
+            status=ProductStatus.ACTIVE,
+            last_checked_at=utcnow(),
+        )
+        .returning(Product)
+        .execution_options(populate_existing=True)
+    )
+    result = await session.execute(stmt)
+    return result.scalar_one()
 
 
 # ===========================================
@@ -241,29 +378,35 @@ async def add_price_history(
     )
     session.add(history)
     await session.flush()
-    await session.refresh(history)
     return history
 
 
+async def bulk_add_price_history(session: AsyncSession, records: list[dict[str, Any]]) -> int:
+    """Insert many price history rows in one statement. Returns count inserted."""
+    if records:
+        await session.execute(insert(PriceHistory), records)
+    return len(records)
+
+
 async def get_price_history(
     session: AsyncSession,
     product_id: int,
     *,
     days: int | None = None,
+    cursor: str | None = None,
     limit: int = 100,
-) -> list[PriceHistory]:
-    """Get price history for a product."""
+) -> tuple[list[PriceHistory], str | None]:
+    """Get a page of price history for a product, newest first. Returns (rows, next_cursor)."""
     query = select(PriceHistory).where(PriceHistory.product_id == product_id)
 
     if days:
-        from datetime import timedelta
-
         cutoff = datetime.utcnow() - timedelta(days=days)
         query = query.where(PriceHistory.scraped_at >= cutoff)
 
-    query = query.order_by(PriceHistory.scraped_at.desc()).limit(limit)
+    query = _recent_page(query, PriceHistory, cursor, limit)
     result = await session.execute(query)
-    return list(result.scalars().all())
+    history = list(result.scalars().all())
+    return history, _next_cursor(history, limit, "scraped_at", "id")
 
 
 async def get_latest_price(session: AsyncSession, product_id: int) -> PriceHistory | None:
@@ -314,7 +457,6 @@ async def trigger_alert(session: AsyncSession, alert: Alert) -> Alert:
     """Mark an alert as triggered."""
     alert.is_triggered = True
     alert.triggered_at = datetime.utcnow()
-    alert.updated_at = datetime.utcnow()
 
     session.add(alert)
     await session.flush()
@@ -351,7 +493,6 @@ async def update_schedule_run(
     """Update schedule after a run."""
     schedule.last_run_at = datetime.utcnow()
     schedule.next_run_at = next_run_at
-    schedule.updated_at = datetime.utcnow()
 
     session.add(schedule)
     await session.flush()
@@ -367,37 +508,36 @@ async def add_scrape_log(session: AsyncSession, log: ScrapeLog) -> ScrapeLog:
     """Add a scrape log entry."""
     session.add(log)
     await session.flush()
-    await session.refresh(log)
     return log
 
 
+async def bulk_add_scrape_logs(session: AsyncSession, records: list[dict[str, Any]]) -> int:
+    """Insert many scrape log rows in one statement. Returns count inserted."""
+    if records:
+        await session.execute(insert(ScrapeLog), records)
+    return len(records)
+
+
 async def get_scrape_logs_for_product(
     session: AsyncSession,
     product_id: int,
     *,
+    cursor: str | None = None,
     limit: int = 50,
-) -> list[ScrapeLog]:
-    """Get recent scrape logs for a product."""
-    query = (
-        select(ScrapeLog)
-        .where(ScrapeLog.product_id == product_id)
-        .order_by(ScrapeLog.scraped_at.desc())
-        .limit(limit)
+) -> tuple[list[ScrapeLog], str | None]:
+    """Get a page of scrape logs for a product, newest first. Returns (logs, next_cursor)."""
+    query = _recent_page(
+        select(ScrapeLog).where(ScrapeLog.product_id == product_id), ScrapeLog, cursor, limit
     )
     result = await session.execute(query)
-    return list(result.scalars().all())
+    logs = list(result.scalars().all())
+    return logs, _next_cursor(logs, limit, "scraped_at", "id")
 
 
 async def cleanup_old_scrape_logs(session: AsyncSession, days: int = 30) -> int:
-    """Delete scrape logs older than specified days. Returns count deleted."""
-    from datetime import timedelta
-
-    from sqlalchemy import delete
-
+    """Delete scrape logs older than specified days in batches. Returns count deleted."""
     cutoff = datetime.utcnow() - timedelta(days=days)
-    stmt = delete(ScrapeLog).where(ScrapeLog.scraped_at < cutoff)
-    result = await session.execute(stmt)
-    return result.rowcount
+    return await purge(session, ScrapeLog, ScrapeLog.scraped_at, cutoff)
 
 
 # ===========================================
@@ -409,22 +549,33 @@ async def add_notification(session: AsyncSession, notification: Notification) ->
     """Add a notification record."""
     session.add(notification)
     await session.flush()
-    await session.refresh(notification)
     return notification
 
 
-async def get_pending_notifications(session: AsyncSession) -> list[Notification]:
-    """Get all pending notifications."""
-    query = select(Notification).where(Notification.status == NotificationStatus.PENDING)
-    result = await session.execute(query)
+def _pending_notifications_query() -> Any:
+    """Notifications waiting to be sent."""
+    return select(Notification).where(Notification.status == NotificationStatus.PENDING)
+
+
+async def get_pending_notifications(
+    session: AsyncSession,
+    *,
+    limit: int | None = None,
+) -> list[Notification]:
+    """Get pending notifications, all of them unless limit is set."""
+    result = await session.execute(_pending_notifications_query().limit(limit))
     return list(result.scalars().all())
 
 
+def iter_pending_notifications(session: AsyncSession) -> AsyncIterator[Notification]:
+    """Stream all pending notifications."""
+    return _stream(session, _pending_notifications_query())
+
+
 async def mark_notification_sent(session: AsyncSession, notification: Notification) -> Notification:
     """Mark notification as sent."""
     notification.status = NotificationStatus.SENT
     notification.sent_at = datetime.utcnow()
-    notification.updated_at = datetime.utcnow()
 
     session.add(notification)
     await session.flush()
@@ -439,7 +590,6 @@ async def mark_notification_failed(
     """Mark notification as failed."""
     notification.status = NotificationStatus.FAILED
     notification.error_message = error_message
-    notification.updated_at = datetime.utcnow()
 
     session.add(notification)
     await session.flush()
@@ -447,15 +597,9 @@ async def mark_notification_failed(
 
 
 async def cleanup_old_notifications(session: AsyncSession, days: int = 90) -> int:
-    """Delete notifications older than specified days. Returns count deleted."""
-    from datetime import timedelta
-
-    from sqlalchemy import delete
-
+    """Delete notifications older than specified days in batches. Returns count deleted."""
     cutoff = datetime.utcnow() - timedelta(days=days)
-    stmt = delete(Notification).where(Notification.created_at < cutoff)
-    result = await session.execute(stmt)
-    return result.rowcount
+    return await purge(session, Notification, Notification.created_at, cutoff)
 
 
 # ===========================================
@@ -476,11 +620,17 @@ async def get_canonical_by_upc(session: AsyncSession, upc: str) -> CanonicalProd
 async def get_products_for_canonical(
     session: AsyncSession,
     canonical_id: int,
+    *,
+    limit: int | None = None,
 ) -> list[Product]:
-    """Get all products linked to a canonical product (for price comparison)."""
-    query = select(Product).where(
-        Product.canonical_id == canonical_id,
-        Product.deleted_at.is_(None),
+    """Get products linked to a canonical product (for price comparison)."""
+    query = (
+        select(Product)
+        .where(
+            Product.canonical_id == canonical_id,
+            Product.deleted_at.is_(None),
+        )
+        .limit(limit)
     )
     result = await session.execute(query)
     return list(result.scalars().all())
@@ -498,17 +648,49 @@ async def get_product_count(session: AsyncSession) -> int:
     return result.scalar_one()
 
 
+async def _estimate_row_count(session: AsyncSession, table: str) -> int | None:
+    """Row count from the planner statistics, or None if the table has none yet."""
+    if session.get_bind().dialect.name == "postgresql":
+        query = text("SELECT reltuples::bigint FROM pg_class WHERE oid = to_regclass(:table)")
+    else:
+        # sqlite_stat1 only exists once ANALYZE has run
+        has_stats = await session.execute(
+            text("SELECT 1 FROM sqlite_master WHERE type = 'table' AND name = 'sqlite_stat1'")
+        )
+        if has_stats.first() is None:
+            return None
+        # The leading integer of stat is the row count of each index; partial
+        # indexes cover fewer rows, so the largest is the table's
+        query = text("SELECT MAX(CAST(stat AS INTEGER)) FROM sqlite_stat1 WHERE tbl = :table")
+
+    estimate = (await session.execute(query, {"table": table})).scalar()
+    # Postgres reports -1 for tables never analyzed
+    if estimate is None or estimate < 0:
+        return None
+    return estimate
+
+
+async def get_product_count_estimate(session: AsyncSession) -> int:
+    """
+    Get an approximate count of products for dashboards.
+
+    Reads the row estimate from the database statistics instead of scanning
+    the table. The estimate includes soft-deleted products, so small tables
+    and tables without statistics are counted exactly via get_product_count.
+    """
+    estimate = await _estimate_row_count(session, Product.__tablename__)
+    if estimate is None or estimate < EXACT_COUNT_THRESHOLD:
+        return await get_product_count(session)
+    return estimate
+
+
 async def get_store_stats(session: AsyncSession, store_domain: str) -> dict[str, Any]:
-    """Get statistics for a store."""
-    # Product count
-    product_count_query = select(func.count(Product.id)).where(
+    """Get statistics for a store in a single query."""
+    product_count = select(func.count(Product.id)).where(
         Product.store_domain == store_domain,
         Product.deleted_at.is_(None),
     )
-    product_count = (await session.execute(product_count_query)).scalar_one()
-
-    # Active alerts count
-    alert_count_query = (
+    alert_count = (
         select(func.count(Alert.id))
         .join(Product)
         .where(
@@ -517,9 +699,14 @@ async def get_store_stats(session: AsyncSession, store_domain: str) -> dict[str,
             Alert.deleted_at.is_(None),
         )
     )
-    alert_count = (await session.execute(alert_count_query)).scalar_one()
+
+    query = select(
+        product_count.scalar_subquery().label("product_count"),
+        alert_count.scalar_subquery().label("alert_count"),
+    )
+    row = (await session.execute(query)).one()
 
     return {
-        "product_count": product_count,
-        "alert_count": alert_count,
+        "product_count": row.product_count,
+        "alert_count": row.alert_count,
     }
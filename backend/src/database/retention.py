@@ -0,0 +1,67 @@
+"""
+Batched retention cleanup.
+
+Old rows are deleted a batch at a time, committing between batches, so
+no single statement holds the write lock for long.
+"""
+
+import asyncio
+from datetime import datetime
+from typing import Any
+
+from sqlalchemy import delete, select
+from sqlalchemy.ext.asyncio import AsyncSession
+from sqlmodel import SQLModel
+
+# Rows deleted per transaction
+RETENTION_BATCH_SIZE = 1000
+
+# Pause between batches so other writers can get the lock
+RETENTION_BATCH_PAUSE_SECONDS = 0.05
+
+# Purges that deleted rows; caches over purged tables compare it to notice deletes
+_purge_generation = 0
+
+
+def purge_generation() -> int:
+    """Number of purges so far that deleted at least one row."""
+    return _purge_generation
+
+
+async def purge(
+    session: AsyncSession,
+    model: type[SQLModel],
+    cutoff_col: Any,
+    cutoff_dt: datetime,
+    batch_size: int = RETENTION_BATCH_SIZE,
+) -> int:
+    """
+    Delete rows older than a cutoff in batches.
+
+    Commits after every batch.
+
+    Args:
+        session: Database session
+        model: Model whose table is purged (must have an id column)
+        cutoff_col: Timestamp column to compare against
+        cutoff_dt: Rows with cutoff_col before this are deleted
+        batch_size: Rows deleted per transaction
+
+    Returns:
+        Total number of rows deleted
+    """
+    global _purge_generation
+    total = 0
+    while True:
+        batch = select(model.id).where(cutoff_col < cutoff_dt).limit(batch_size)
+        result = await session.execute(delete(model).where(model.id.in_(batch)))
+        await session.commit()
+
+        deleted = result.rowcount or 0
+        total += deleted
+        if deleted:
+            _purge_generation += 1
+        if deleted < batch_size:
+            return total
+
+        await asyncio.sleep(RETENTION_BATCH_PAUSE_SECONDS)
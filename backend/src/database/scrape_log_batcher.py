@@ -0,0 +1,135 @@
+"""
+Batched ScrapeLog writes.
+
+Scrape logs are queued in memory and written by a background task in a
+single multi-row INSERT per batch, instead of one INSERT per scrape.
+"""
+
+import asyncio
+import logging
+from collections.abc import Callable
+from contextlib import AbstractAsyncContextManager
+from datetime import datetime
+from typing import Any
+
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from src.database.models import ScrapeLog
+from src.database.repository import bulk_add_scrape_logs
+from src.database.session import get_session
+
+logger = logging.getLogger(__name__)
+
+# Flush when this many rows are queued...
+SCRAPE_LOG_BATCH_SIZE = 500
+# ...or when the oldest queued row has waited this long (seconds)
+SCRAPE_LOG_FLUSH_INTERVAL = 2.0
+
+
+class ScrapeLogBatcher:
+    """
+    Queues ScrapeLog rows and writes them in batches.
+
+    The writer task starts on the first emit(). Call stop() on shutdown
+    to write whatever is still queued.
+    """
+
+    def __init__(
+        self,
+        batch_size: int = SCRAPE_LOG_BATCH_SIZE,
+        flush_interval: float = SCRAPE_LOG_FLUSH_INTERVAL,
+        session_factory: Callable[[], AbstractAsyncContextManager[AsyncSession]] = get_session,
+    ):
+        """
+        Initialize batcher.
+
+        Args:
+            batch_size: Max rows per INSERT
+            flush_interval: Max seconds a row waits before being written
+            session_factory: Context manager yielding a session that commits on exit
+        """
+        self.batch_size = batch_size
+        self.flush_interval = flush_interval
+        self._session_factory = session_factory
+        self._queue: asyncio.Queue[dict[str, Any] | None] | None = None
+        self._task: asyncio.Task[None] | None = None
+
+    @property
+    def is_running(self) -> bool:
+        """Whether the writer task is active."""
+        return self._task is not None and not self._task.done()
+
+    async def emit(self, log: ScrapeLog) -> None:
+        """
+        Queue a scrape log for writing.
+
+        Args:
+            log: Scrape log to persist
+        """
+        if not self.is_running:
+            self._queue = asyncio.Queue()
+            self._task = asyncio.create_task(self._run())
+
+        row = log.model_dump(exclude={"id"})
+        # Stamp now rather than at flush time, which may be seconds later
+        if row.get("scraped_at") is None:
+            row["scraped_at"] = datetime.utcnow()
+        await self._queue.put(row)
+
+    async def stop(self) -> None:
+        """Write all queued rows and stop the writer task."""
+        if not self.is_running:
+            return
+        await self._queue.put(None)
+        await self._task
+        self._task = None
+
+    async def _run(self) -> None:
+        """Collect rows into batches and write them until stopped."""
+        loop = asyncio.get_running_loop()
+        stopping = False
+
+        while not stopping:
+            row = await self._queue.get()
+            if row is None:
+                return
+
+            batch = [row]
+            deadline = loop.time() + self.flush_interval
+            while len(batch) < self.batch_size:
+                timeout = deadline - loop.time()
+                if timeout <= 0:
+                    break
+                try:
+                    row = await asyncio.wait_for(self._queue.get(), timeout)
+                except TimeoutError:
+                    break
+                if row is None:
+                    stopping = True
+                    break
+                batch.append(row)
+
+            await self._write(batch)
+
+    async def _write(self, rows: list[dict[str, Any]]) -> None:
+        """Insert a batch of rows; failures are logged, not raised."""
+        try:
+            async with self._session_factory() as session:
+                await bulk_add_scrape_logs(session, rows)
+        except Exception as e:
+            logger.error(f"Failed to write {len(rows)} scrape logs: {e}")
+
+
+# ===========================================
+# Global Instance
+# ===========================================
+
+_scrape_log_batcher: ScrapeLogBatcher | None = None
+
+
+def get_scrape_log_batcher() -> ScrapeLogBatcher:
+    """Get the global scrape log batcher instance."""
+    global _scrape_log_batcher
+    if _scrape_log_batcher is None:
+        _scrape_log_batcher = ScrapeLogBatcher()
+    return _scrape_log_batcher
@@ -4,19 +4,64 @@ Async database session management.
 
 from collections.abc import AsyncGenerator
 from contextlib import asynccontextmanager
+from typing import Any
 
+import orjson
+from sqlalchemy import event, make_url
 from sqlalchemy.ext.asyncio import AsyncSession, async_sessionmaker, create_async_engine
 from sqlmodel import SQLModel
 
 from config.settings import settings
 
+
+def json_serializer(value: Any) -> str:
+    """Serialize JSON columns (Store.selectors, Notification.payload) with orjson."""
+    return orjson.dumps(value).decode()
+
+
+# Prepared statements kept per connection
+STATEMENT_CACHE_SIZE = 1024
+
+
+def engine_options(database_url: str) -> dict[str, Any]:
+    """Pool and driver options for the database backend in use."""
+    if make_url(database_url).get_backend_name() == "postgresql":
+        return {
+            "pool_size": 20,
+            "max_overflow": 40,
+            "pool_pre_ping": True,
+            "pool_recycle": 1800,
+            "connect_args": {
+                "statement_cache_size": STATEMENT_CACHE_SIZE,
+                "prepared_statement_cache_size": STATEMENT_CACHE_SIZE,
+                "server_settings": {"jit": "off", "application_name": "perpee"},
+            },
+        }
+    # sqlite3 caches 128 prepared statements per connection by default
+    return {"connect_args": {"cached_statements": STATEMENT_CACHE_SIZE}}
+
+
 # Create async engine
 engine = create_async_engine(
     settings.database_url,
-    echo=settings.debug,
+    echo=settings.database_echo,
     future=True,
+    json_serializer=json_serializer,
+    json_deserializer=orjson.loads,
+    **engine_options(settings.database_url),
 )
 
+
+def enable_sqlite_foreign_keys(dbapi_connection, connection_record) -> None:
+    """Turn on FK enforcement so ON DELETE CASCADE applies (off by default in SQLite)."""
+    cursor = dbapi_connection.cursor()
+    cursor.execute("PRAGMA foreign_keys=ON")
+    cursor.close()
+
+
+if engine.dialect.name == "sqlite":
+    event.listen(engine.sync_engine, "connect", enable_sqlite_foreign_keys)
+
 # Create async session factory
 async_session_factory = async_sessionmaker(
     engine,
@@ -4,13 +4,24 @@ Failure detection and classification for self-healing.
 Classifies scrape failures and determines when self-healing should be triggered.
 """
 
+import asyncio
+import contextlib
 from dataclasses import dataclass
 from datetime import datetime, timedelta
 from enum import Enum
 
-from sqlmodel import Session, select
+from sqlalchemy import case, event, literal, update
+from sqlalchemy.ext.asyncio import AsyncSession
+from sqlalchemy.orm import Session
+from sqlmodel import select
 
-from src.database.models import Product, ProductStatus, ScrapeErrorType, ScrapeLog
+from src.database.models import (
+    FAILED_SCRAPE_WHERE,
+    Product,
+    ProductStatus,
+    ScrapeErrorType,
+    ScrapeLog,
+)
 
 
 class FailureCategory(str, Enum):
@@ -64,10 +75,36 @@ HEALABLE_CATEGORIES = {
     FailureCategory.PRICE_VALIDATION,
 }
 
+# Error types whose category is healable, for filtering in SQL
+HEALABLE_ERROR_TYPES = [
+    error_type
+    for error_type, category in ERROR_TYPE_TO_CATEGORY.items()
+    if category in HEALABLE_CATEGORIES
+]
+
 # Default thresholds
 DEFAULT_FAILURE_THRESHOLD = 3  # Consecutive failures before healing
 DEFAULT_ATTENTION_THRESHOLD = 3  # Days of 404s before needs_attention
 MAX_HEALING_ATTEMPTS = 3  # Max healing attempts per product
+HEALING_QUEUE_SIZE = 100  # Products waiting for the event worker; the rest await the sweep
+
+# Session.info key for healing events waiting on the transaction to commit
+_PENDING_EVENTS_KEY = "pending_healing_events"
+
+
+@event.listens_for(Session, "after_commit")
+def _publish_healing_events(session: Session) -> None:
+    """Hand products that crossed the failure threshold to their queues."""
+    for queue, product_id in session.info.pop(_PENDING_EVENTS_KEY, ()):
+        # Left to the periodic healing sweep when the worker is behind
+        with contextlib.suppress(asyncio.QueueFull):
+            queue.put_nowait(product_id)
+
+
+@event.listens_for(Session, "after_rollback")
+def _discard_healing_events(session: Session) -> None:
+    """Drop events for failures that were never committed."""
+    session.info.pop(_PENDING_EVENTS_KEY, None)
 
 
 class FailureDetector:
@@ -79,6 +116,11 @@ class FailureDetector:
     - Track consecutive failures per product
     - Determine when self-healing should be triggered
     - Flag products needing manual attention
+
+    While publish_events is set (by a running healing event worker), a
+    recorded failure that crosses the threshold puts the product id on
+    healing_queue once the transaction commits, so it can be healed right
+    away instead of waiting for the next healing sweep.
     """
 
     def __init__(
@@ -98,6 +140,8 @@ class FailureDetector:
         self.failure_threshold = failure_threshold
         self.attention_days = attention_days
         self.max_healing_attempts = max_healing_attempts
+        self.healing_queue: asyncio.Queue[int] = asyncio.Queue(maxsize=HEALING_QUEUE_SIZE)
+        self.publish_events = False
 
     def classify_error(self, error_type: ScrapeErrorType | None) -> FailureCategory:
         """
@@ -125,9 +169,9 @@ class FailureDetector:
         """
         return category in HEALABLE_CATEGORIES
 
-    def analyze_product(
+    async def analyze_product(
         self,
-        session: Session,
+        session: AsyncSession,
         product_id: int,
     ) -> FailureAnalysis | None:
         """
@@ -141,7 +185,7 @@ class FailureDetector:
             FailureAnalysis or None if product not found
         """
         # Get product
-        product = session.get(Product, product_id)
+        product = await session.get(Product, product_id)
         if not product or product.deleted_at is not None:
             return None
 
@@ -149,11 +193,11 @@ class FailureDetector:
         stmt = (
             select(ScrapeLog)
             .where(ScrapeLog.product_id == product_id)
-            .where(ScrapeLog.success.is_(False))
+            .where(FAILED_SCRAPE_WHERE)
             .order_by(ScrapeLog.scraped_at.desc())
             .limit(1)
         )
-        last_failure = session.exec(stmt).first()
+        last_failure = (await session.execute(stmt)).scalar_one_or_none()
 
         # Determine failure category
         category = FailureCategory.UNKNOWN
@@ -173,9 +217,7 @@ class FailureDetector:
         )
 
         # Check if product needs manual attention (e.g., 404 for multiple days)
-        needs_attention = self._check_needs_attention(
-            session, product, category
-        )
+        needs_attention = await self._check_needs_attention(session, product, category)
 
         return FailureAnalysis(
             product_id=product_id,
@@ -187,9 +229,9 @@ class FailureDetector:
             last_failure_at=last_failure_at,
         )
 
-    def _check_needs_attention(
+    async def _check_needs_attention(
         self,
-        session: Session,
+        session: AsyncSession,
         product: Product,
         category: FailureCategory,
     ) -> bool:
@@ -223,7 +265,7 @@ class FailureDetector:
                 .order_by(ScrapeLog.scraped_at.asc())
                 .limit(1)
             )
-            first_404 = session.exec(stmt).first()
+            first_404 = (await session.execute(stmt)).scalar_one_or_none()
             if first_404:
                 # Has been 404 for at least attention_days
                 return True
@@ -238,15 +280,51 @@ class FailureDetector:
 
         return False
 
-    def get_products_needing_healing(
+    async def has_any_needing_healing(
+        self,
+        session: AsyncSession,
+        store_domain: str | None = None,
+    ) -> bool:
+        """
+        Check whether any product has reached the failure threshold.
+
+        A cheap probe run before get_products_needing_healing, which joins
+        each candidate to its scrape logs.
+
+        Args:
+            session: Database session
+            store_domain: Optional filter by store
+
+        Returns:
+            True if at least one product may need healing
+        """
+        stmt = (
+            select(Product.id)
+            .where(Product.deleted_at.is_(None))
+            .where(Product.consecutive_failures >= self.failure_threshold)
+            .where(Product.status != ProductStatus.NEEDS_ATTENTION)
+            .where(Product.status != ProductStatus.ARCHIVED)
+        )
+
+        if store_domain:
+            stmt = stmt.where(Product.store_domain == store_domain)
+
+        result = await session.execute(stmt.limit(1))
+        return result.first() is not None
+
+    async def get_products_needing_healing(
         self,
-        session: Session,
+        session: AsyncSession,
         store_domain: str | None = None,
         limit: int = 50,
     ) -> list[FailureAnalysis]:
         """
         Get products that need self-healing.
 
+        Each product is joined to its most recent failed scrape log in a
+        single query, and only products whose last failure is healable are
+        returned.
+
         Args:
             session: Database session
             store_domain: Optional filter by store
@@ -255,40 +333,59 @@ class FailureDetector:
         Returns:
             List of FailureAnalysis for products needing healing
         """
-        # Query products with consecutive failures at threshold
+        last_failure_id = (
+            select(ScrapeLog.id)
+            .where(ScrapeLog.product_id == Product.id)
+            .where(FAILED_SCRAPE_WHERE)
+            .order_by(ScrapeLog.scraped_at.desc(), ScrapeLog.id.desc())
+            .limit(1)
+            .correlate(Product)
+            .scalar_subquery()
+        )
+
         stmt = (
-            select(Product)
+            select(Product, ScrapeLog)
+            .join(ScrapeLog, ScrapeLog.id == last_failure_id)
             .where(Product.deleted_at.is_(None))
             .where(Product.consecutive_failures >= self.failure_threshold)
             .where(Product.status != ProductStatus.NEEDS_ATTENTION)
             .where(Product.status != ProductStatus.ARCHIVED)
+            .where(ScrapeLog.error_type.in_(HEALABLE_ERROR_TYPES))
         )
 
         if store_domain:
             stmt = stmt.where(Product.store_domain == store_domain)
 
-        stmt = stmt.limit(limit)
-        products = session.exec(stmt).all()
-
-        # Analyze each product
-        results = []
-        for product in products:
-            analysis = self.analyze_product(session, product.id)
-            if analysis and analysis.needs_healing:
-                results.append(analysis)
-
-        return results
+        result = await session.execute(stmt.limit(limit))
+
+        # Healable failures below NEEDS_ATTENTION never need attention
+        return [
+            FailureAnalysis(
+                product_id=product.id,
+                category=self.classify_error(last_failure.error_type),
+                consecutive_failures=product.consecutive_failures,
+                needs_healing=True,
+                needs_attention=False,
+                last_error=last_failure.error_message,
+                last_failure_at=last_failure.scraped_at,
+            )
+            for product, last_failure in result.all()
+        ]
 
-    def record_failure(
+    async def record_failure(
         self,
-        session: Session,
+        session: AsyncSession,
         product_id: int,
-        error_type: ScrapeErrorType,
+        error_type: ScrapeErrorType | None,
         error_message: str | None = None,
     ) -> int:
         """
         Record a scrape failure and update consecutive failure count.
 
+        If this failure brings a healable product to the failure threshold
+        and publish_events is set, its id is queued on healing_queue when
+        the session commits.
+
         Args:
             session: Database session
             product_id: Product ID
@@ -298,30 +395,37 @@ class FailureDetector:
         Returns:
             Updated consecutive failure count
         """
-        product = session.get(Product, product_id)
+        product = await session.get(Product, product_id)
         if not product:
             return 0
 
         # Increment consecutive failures
         product.consecutive_failures += 1
-        product.updated_at = datetime.utcnow()
 
         # Update status if needed
         category = self.classify_error(error_type)
-        if self._check_needs_attention(session, product, category):
+        if await self._check_needs_attention(session, product, category):
             product.status = ProductStatus.NEEDS_ATTENTION
         elif product.consecutive_failures >= self.failure_threshold:
             product.status = ProductStatus.ERROR
 
+        if (
+            self.publish_events
+            and product.consecutive_failures == self.failure_threshold
+            and self.is_healable(category)
+        ):
+            session.info.setdefault(_PENDING_EVENTS_KEY, []).append(
+                (self.healing_queue, product_id)
+            )
+
         session.add(product)
-        session.commit()
-        session.refresh(product)
+        await session.flush()
 
         return product.consecutive_failures
 
-    def record_success(
+    async def record_success(
         self,
-        session: Session,
+        session: AsyncSession,
         product_id: int,
     ) -> None:
         """
@@ -331,21 +435,43 @@ class FailureDetector:
             session: Database session
             product_id: Product ID
         """
-        product = session.get(Product, product_id)
-        if not product:
-            return
+        await self.record_success_bulk(session, [product_id])
 
-        # Reset consecutive failures
-        product.consecutive_failures = 0
-        product.last_checked_at = datetime.utcnow()
-        product.updated_at = datetime.utcnow()
+    async def record_success_bulk(
+        self,
+        session: AsyncSession,
+        product_ids: list[int],
+    ) -> None:
+        """
+        Record successful scrapes and reset failure counts in one UPDATE.
 
-        # Reset status if it was in error state
-        if product.status in (ProductStatus.ERROR, ProductStatus.NEEDS_ATTENTION):
-            product.status = ProductStatus.ACTIVE
+        Products in an error state are set back to active.
 
-        session.add(product)
-        session.commit()
+        Args:
+            session: Database session
+            product_ids: Product IDs
+        """
+        if not product_ids:
+            return
+
+        stmt = (
+            update(Product)
+            .where(Product.id.in_(product_ids))
+            .values(
+                consecutive_failures=0,
+                last_checked_at=datetime.utcnow(),
+                status=case(
+                    (
+                        Product.status.in_(
+                            (ProductStatus.ERROR, ProductStatus.NEEDS_ATTENTION)
+                        ),
+                        literal(ProductStatus.ACTIVE, Product.__table__.c.status.type),
+                    ),
+                    else_=Product.status,
+                ),
+            )
+        )
+        await session.execute(stmt)
 
 
 # ===========================================
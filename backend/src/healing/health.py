@@ -5,12 +5,17 @@ Tracks success rates and identifies stores needing attention.
 """
 
 import logging
-from dataclasses import dataclass
+from dataclasses import dataclass, replace
 from datetime import datetime, timedelta
+from typing import ClassVar
 
-from sqlmodel import Session, func, select
+from sqlalchemy import Row, case, update
+from sqlalchemy.ext.asyncio import AsyncSession
+from sqlalchemy.orm import Session
+from sqlmodel import func, select
 
-from src.database.models import Product, ProductStatus, ScrapeLog, Store
+from src.database.models import ACTIVE_STORE_WHERE, Product, ProductStatus, ScrapeLog, Store
+from src.database.retention import purge_generation
 
 logger = logging.getLogger(__name__)
 
@@ -18,6 +23,7 @@ logger = logging.getLogger(__name__)
 DEFAULT_HEALTH_WINDOW_DAYS = 7  # Calculate health over 7 days
 DEFAULT_FAILURE_THRESHOLD = 0.5  # 50% failure rate flags store
 DEFAULT_MIN_SCRAPES = 5  # Minimum scrapes to calculate health
+DEFAULT_CACHE_TTL = 300  # Seconds a report is reused, so the window keeps moving
 
 
 @dataclass
@@ -60,11 +66,18 @@ class StoreHealthCalculator:
     - Last successful scrape time
     """
 
+    # Product statuses counted as failing
+    _FAILING_STATUSES: ClassVar[tuple[ProductStatus, ...]] = (
+        ProductStatus.ERROR,
+        ProductStatus.NEEDS_ATTENTION,
+    )
+
     def __init__(
         self,
         window_days: int = DEFAULT_HEALTH_WINDOW_DAYS,
         failure_threshold: float = DEFAULT_FAILURE_THRESHOLD,
         min_scrapes: int = DEFAULT_MIN_SCRAPES,
+        cache_ttl: int = DEFAULT_CACHE_TTL,
     ):
         """
         Initialize health calculator.
@@ -73,10 +86,15 @@ class StoreHealthCalculator:
             window_days: Days to look back for health calculation
             failure_threshold: Failure rate that flags store as unhealthy
             min_scrapes: Minimum scrapes needed to calculate health
+            cache_ttl: Seconds an unchanged report from calculate_all_health is reused
         """
         self.window_days = window_days
         self.failure_threshold = failure_threshold
         self.min_scrapes = min_scrapes
+        self.cache_ttl = cache_ttl
+
+        # Last report from calculate_all_health, with the data fingerprint it was built from
+        self._cached_report: tuple[tuple, HealthReport] | None = None
 
     def calculate_store_health(
         self,
@@ -101,37 +119,19 @@ class StoreHealthCalculator:
         cutoff = datetime.utcnow() - timedelta(days=self.window_days)
 
         # Count products
-        total_products = self._count_products(session, domain)
-        active_products = self._count_products(
-            session, domain, status=ProductStatus.ACTIVE
-        )
-        failing_products = self._count_failing_products(session, domain)
+        product_counts = self._count_products_bundle(session, domain)
+
+        # No products means no scrapes to count
+        if product_counts[0] == 0:
+            return self._build_store_health(store, product_counts, (0, 0))
 
         # Calculate scrape success rate
         scrape_stats = self._calculate_scrape_stats(session, domain, cutoff)
 
-        # Determine health status
-        success_rate = scrape_stats["success_rate"]
-        is_healthy = success_rate >= (1 - self.failure_threshold)
-
-        # Check if needs attention
-        needs_attention = (
-            not is_healthy
-            or failing_products > total_products * self.failure_threshold
-        )
-
-        return StoreHealth(
-            domain=domain,
-            name=store.name,
-            total_products=total_products,
-            active_products=active_products,
-            failing_products=failing_products,
-            success_rate=success_rate,
-            total_scrapes=scrape_stats["total"],
-            successful_scrapes=scrape_stats["successful"],
-            is_healthy=is_healthy,
-            last_success_at=store.last_success_at,
-            needs_attention=needs_attention,
+        return self._build_store_health(
+            store,
+            product_counts,
+            (scrape_stats["total"], scrape_stats["successful"]),
         )
 
     def calculate_all_health(
@@ -149,23 +149,48 @@ class StoreHealthCalculator:
         Returns:
             HealthReport with all store metrics
         """
-        # Get all stores
-        stmt = select(Store)
+        # Reuse a recent report if no store, product, or scrape has changed since
+        key = (active_only, purge_generation(), *self._data_fingerprint(session))
+        if self._cached_report is not None:
+            cached_key, cached = self._cached_report
+            age = datetime.utcnow() - cached.calculated_at
+            if cached_key == key and age < timedelta(seconds=self.cache_ttl):
+                return self._copy_report(cached)
+
+        # Get all stores, reading only the columns the report uses
+        stmt = select(Store.domain, Store.name, Store.last_success_at)
         if active_only:
-            stmt = stmt.where(Store.is_active.is_(True))
-
-        stores = session.exec(stmt).all()
+            stmt = stmt.where(ACTIVE_STORE_WHERE)
 
-        store_health: list[StoreHealth] = []
-        total_success = 0
-        total_scrapes = 0
+        stores = session.execute(stmt).all()
 
-        for store in stores:
-            health = self.calculate_store_health(session, store.domain)
-            if health:
-                store_health.append(health)
-                total_success += health.successful_scrapes
-                total_scrapes += health.total_scrapes
+        # Aggregate every store's products and scrapes in two grouped queries
+        now = datetime.utcnow()
+        cutoff = now - timedelta(days=self.window_days)
+        products_by_domain = (
+            select(Product.store_domain, *self._product_count_columns())
+            .where(Product.deleted_at.is_(None))
+            .group_by(Product.store_domain)
+        )
+        scrapes_by_domain = (
+            select(Product.store_domain, *self._scrape_count_columns())
+            .join(ScrapeLog, ScrapeLog.product_id == Product.id)
+            .where(Product.deleted_at.is_(None), ScrapeLog.scraped_at >= cutoff)
+            .group_by(Product.store_domain)
+        )
+        product_counts = {row[0]: tuple(row[1:]) for row in session.execute(products_by_domain)}
+        scrape_counts = {row[0]: tuple(row[1:]) for row in session.execute(scrapes_by_domain)}
+
+        store_health = [
+            self._build_store_health(
+                store,
+                product_counts.get(store.domain, (0, 0, 0)),
+                scrape_counts.get(store.domain, (0, 0)),
+            )
+            for store in stores
+        ]
+        total_success = sum(h.successful_scrapes for h in store_health)
+        total_scrapes = sum(h.total_scrapes for h in store_health)
 
         # Calculate overall metrics
         healthy_stores = sum(1 for h in store_health if h.is_healthy)
@@ -173,8 +198,8 @@ class StoreHealthCalculator:
         needs_attention = sum(1 for h in store_health if h.needs_attention)
         overall_rate = total_success / total_scrapes if total_scrapes > 0 else 1.0
 
-        return HealthReport(
-            calculated_at=datetime.utcnow(),
+        report = HealthReport(
+            calculated_at=now,
             total_stores=len(store_health),
             healthy_stores=healthy_stores,
             unhealthy_stores=unhealthy_stores,
@@ -182,6 +207,44 @@ class StoreHealthCalculator:
             overall_success_rate=overall_rate,
             store_health=store_health,
         )
+        # Callers may modify the report, so the cache keeps its own copy
+        self._cached_report = (key, self._copy_report(report))
+
+        return report
+
+    async def calculate_store_health_async(
+        self,
+        session: AsyncSession,
+        domain: str,
+    ) -> StoreHealth | None:
+        """
+        Calculate health metrics for a single store on an async session.
+
+        Args:
+            session: Async database session
+            domain: Store domain
+
+        Returns:
+            StoreHealth or None if store not found
+        """
+        return await session.run_sync(self.calculate_store_health, domain)
+
+    async def calculate_all_health_async(
+        self,
+        session: AsyncSession,
+        active_only: bool = True,
+    ) -> HealthReport:
+        """
+        Calculate health for all stores on an async session.
+
+        Args:
+            session: Async database session
+            active_only: Only include active stores
+
+        Returns:
+            HealthReport with all store metrics
+        """
+        return await session.run_sync(self.calculate_all_health, active_only)
 
     def update_store_health(
         self,
@@ -208,10 +271,9 @@ class StoreHealthCalculator:
 
         # Update store success rate
         store.success_rate = health.success_rate
-        store.updated_at = datetime.utcnow()
 
         session.add(store)
-        session.commit()
+        session.flush()
 
         logger.info(
             f"Updated health for {domain}: "
@@ -235,18 +297,27 @@ class StoreHealthCalculator:
         Returns:
             Number of stores updated
         """
-        stmt = select(Store)
-        if active_only:
-            stmt = stmt.where(Store.is_active.is_(True))
+        report = self.calculate_all_health(session, active_only=active_only)
+        if not report.store_health:
+            return 0
 
-        stores = session.exec(stmt).all()
-        updated = 0
+        # One UPDATE for every store's success rate
+        rates = {h.domain: h.success_rate for h in report.store_health}
+        stmt = (
+            update(Store)
+            .where(Store.domain.in_(rates))
+            .values(
+                success_rate=case(
+                    *[(Store.domain == domain, rate) for domain, rate in rates.items()]
+                )
+            )
+        )
+        session.execute(stmt)
+        session.flush()
 
-        for store in stores:
-            if self.update_store_health(session, store.domain):
-                updated += 1
+        logger.info(f"Updated health for {len(rates)} stores")
 
-        return updated
+        return len(rates)
 
     def get_unhealthy_stores(
         self,
@@ -280,45 +351,113 @@ class StoreHealthCalculator:
         report = self.calculate_all_health(session)
         return [h for h in report.store_health if h.needs_attention]
 
-    def _count_products(
-        self,
-        session: Session,
-        domain: str,
-        status: ProductStatus | None = None,
-    ) -> int:
-        """Count products for a store."""
-        stmt = (
-            select(func.count(Product.id))
-            .where(Product.store_domain == domain)
-            .where(Product.deleted_at.is_(None))
+    @staticmethod
+    def _data_fingerprint(session: Session) -> tuple:
+        """
+        Cheap markers that change when stores, products, or scrapes do.
+
+        Timestamps change on inserts and updates, and the product count on
+        hard deletes (which cascade to their scrapes). Scrape logs are append
+        only, so the newest id is enough; it is read from the rowid without
+        scanning the table. Purged scrape logs are caught by purge_generation().
+        """
+        stmt = select(
+            *(
+                select(column).scalar_subquery()
+                for column in (
+                    func.max(Store.updated_at),
+                    func.count(Store.domain),
+                    func.max(Product.updated_at),
+                    func.count(Product.id),
+                    func.max(ScrapeLog.id),
+                )
+            )
+        )
+        return tuple(session.execute(stmt).one())
+
+    @staticmethod
+    def _copy_report(report: HealthReport) -> HealthReport:
+        """Copy a report and its store entries."""
+        return replace(report, store_health=[replace(h) for h in report.store_health])
+
+    @classmethod
+    def _product_count_columns(cls) -> tuple:
+        """Total, active, and failing product counts as aggregate columns."""
+        failing = Product.status.in_(cls._FAILING_STATUSES)
+        return (
+            func.count(Product.id).label("total"),
+            # SUM over no rows is NULL
+            func.coalesce(
+                func.sum(case((Product.status == ProductStatus.ACTIVE, 1), else_=0)), 0
+            ).label("active"),
+            func.coalesce(func.sum(case((failing, 1), else_=0)), 0).label("failing"),
+        )
+
+    @staticmethod
+    def _scrape_count_columns() -> tuple:
+        """Total and successful scrape counts as aggregate columns."""
+        return (
+            func.count(ScrapeLog.id).label("total"),
+            func.coalesce(func.sum(case((ScrapeLog.success.is_(True), 1), else_=0)), 0).label(
+                "successful"
+            ),
         )
 
-        if status is not None:
-            stmt = stmt.where(Product.status == status)
+    def _build_store_health(
+        self,
+        store: Store | Row,
+        product_counts: tuple[int, int, int],
+        scrape_counts: tuple[int, int],
+    ) -> StoreHealth:
+        """
+        Derive a store's health from its product and scrape counts.
+
+        store may be a Store or a row with its domain, name, and last_success_at.
+        """
+        total_products, active_products, failing_products = product_counts
+        total_scrapes, successful_scrapes = scrape_counts
+
+        # Calculate rate
+        if total_scrapes == 0 or total_scrapes < self.min_scrapes:
+            # Not enough data, assume healthy
+            success_rate = 1.0
+        else:
+            success_rate = successful_scrapes / total_scrapes if total_scrapes > 0 else 1.0
+
+        # Determine health status
+        is_healthy = success_rate >= (1 - self.failure_threshold)
+
+        # Check if needs attention
+        needs_attention = (
+            not is_healthy
+            or failing_products > total_products * self.failure_threshold
+        )
 
-        result = session.exec(stmt).one()
-        return result or 0
+        return StoreHealth(
+            domain=store.domain,
+            name=store.name,
+            total_products=total_products,
+            active_products=active_products,
+            failing_products=failing_products,
+            success_rate=success_rate,
+            total_scrapes=total_scrapes,
+            successful_scrapes=successful_scrapes,
+            is_healthy=is_healthy,
+            last_success_at=store.last_success_at,
+            needs_attention=needs_attention,
+        )
 
-    def _count_failing_products(
+    def _count_products_bundle(
         self,
         session: Session,
         domain: str,
-    ) -> int:
-        """Count products with errors or needing attention."""
-        stmt = (
-            select(func.count(Product.id))
-            .where(Product.store_domain == domain)
-            .where(Product.deleted_at.is_(None))
-            .where(
-                Product.status.in_([
-                    ProductStatus.ERROR,
-                    ProductStatus.NEEDS_ATTENTION,
-                ])
-            )
+    ) -> tuple[int, int, int]:
+        """Count total, active, and failing products for a store in one query."""
+        stmt = select(*self._product_count_columns()).where(
+            Product.store_domain == domain, Product.deleted_at.is_(None)
         )
-
-        result = session.exec(stmt).one()
-        return result or 0
+        row = session.execute(stmt).one()
+        return row.total, row.active, row.failing
 
     def _calculate_scrape_stats(
         self,
@@ -327,46 +466,18 @@ class StoreHealthCalculator:
         cutoff: datetime,
     ) -> dict:
         """Calculate scrape statistics for a store."""
-        # Get product IDs for this store
-        product_stmt = (
-            select(Product.id)
-            .where(Product.store_domain == domain)
-            .where(Product.deleted_at.is_(None))
-        )
-        product_ids = list(session.exec(product_stmt).all())
-
-        if not product_ids:
-            return {"total": 0, "successful": 0, "success_rate": 1.0}
-
-        # Count total scrapes
-        total_stmt = (
-            select(func.count(ScrapeLog.id))
-            .where(ScrapeLog.product_id.in_(product_ids))
-            .where(ScrapeLog.scraped_at >= cutoff)
-        )
-        total = session.exec(total_stmt).one() or 0
-
-        # Count successful scrapes
-        success_stmt = (
-            select(func.count(ScrapeLog.id))
-            .where(ScrapeLog.product_id.in_(product_ids))
-            .where(ScrapeLog.scraped_at >= cutoff)
-            .where(ScrapeLog.success.is_(True))
+        stmt = (
+            select(*self._scrape_count_columns())
+            .join(Product, ScrapeLog.product_id == Product.id)
+            .where(
+                Product.store_domain == domain,
+                Product.deleted_at.is_(None),
+                ScrapeLog.scraped_at >= cutoff,
+            )
         )
-        successful = session.exec(success_stmt).one() or 0
-
-        # Calculate rate
-        if total < self.min_scrapes:
-            # Not enough data, assume healthy
-            success_rate = 1.0
-        else:
-            success_rate = successful / total if total > 0 else 1.0
+        row = session.execute(stmt).one()
 
-        return {
-            "total": total,
-            "successful": successful,
-            "success_rate": success_rate,
-        }
+        return {"total": row.total, "successful": row.successful}
 
     def record_scrape_success(
         self,
@@ -382,12 +493,28 @@ class StoreHealthCalculator:
             session: Database session
             domain: Store domain
         """
-        store = session.get(Store, domain)
-        if store:
-            store.last_success_at = datetime.utcnow()
-            store.updated_at = datetime.utcnow()
-            session.add(store)
-            session.commit()
+        self.record_scrape_success_bulk(session, [domain])
+
+    def record_scrape_success_bulk(
+        self,
+        session: Session,
+        domains: list[str],
+    ) -> None:
+        """
+        Record successful scrapes for several stores in one UPDATE.
+
+        Args:
+            session: Database session
+            domains: Store domains
+        """
+        if not domains:
+            return
+
+        stmt = (
+            update(Store).where(Store.domain.in_(domains)).values(last_success_at=datetime.utcnow())
+        )
+        session.execute(stmt)
+        session.flush()
 
 
 # ===========================================
@@ -4,15 +4,18 @@ LLM-based selector regeneration for self-healing.
 Uses LLM to analyze HTML and generate new CSS selectors when existing ones break.
 """
 
+import functools
+import io
 import json
 import logging
+import re
 from dataclasses import dataclass
-from datetime import datetime
 from pathlib import Path
 
+import orjson
 from pydantic_ai import Agent
 from pydantic_ai.models.openai import OpenAIModel
-from sqlmodel import Session
+from sqlalchemy.ext.asyncio import AsyncSession
 
 from config.settings import settings
 from src.database.models import Store
@@ -23,18 +26,81 @@ logger = logging.getLogger(__name__)
 PROMPTS_DIR = Path(__file__).parent.parent.parent / "config" / "prompts"
 
 
+# Default prompt if file not found
+_DEFAULT_REGENERATION_PROMPT = """You are a web scraping expert. Analyze the HTML content and generate CSS selectors
+to extract product information (price, name, availability, image, original price).
+
+For each field, provide an array of CSS selectors in order of preference.
+Return a JSON object with the selector configuration."""
+
+_SYSTEM_PROMPT = """You are a web scraping expert specializing in e-commerce product pages.
+
+Your task is to analyze HTML content and generate reliable CSS selectors for extracting product data.
+
+## Guidelines
+
+1. **Prioritize Stable Selectors**
+   - Prefer semantic HTML attributes (data-*, itemprop, aria-*)
+   - Use ID selectors when unique and descriptive
+   - Avoid positional selectors (:nth-child) when possible
+   - Look for consistent patterns across similar elements
+
+2. **Multiple Fallbacks**
+   - Provide 2-4 selectors per field in order of preference
+   - First selector should be most specific/reliable
+   - Later selectors should be progressively more general
+
+3. **Price Selectors**
+   - Target the final/sale price, not original/MSRP
+   - Handle currency symbols and formatting
+   - Check for "sale", "now", "current" price containers
+
+4. **Availability Selectors**
+   - Look for "Add to Cart" buttons
+   - Check for out-of-stock indicators
+   - Note common patterns: inventory status, shipping info
+
+5. **Response Format**
+   Return valid JSON only:
+   ```json
+   {
+     "selectors": {
+       "price": {"css": ["selector1", "selector2"]},
+       "name": {"css": ["selector1", "selector2"]},
+       "availability": {"css": ["selector1"], "in_stock_patterns": ["in stock"]},
+       "image": {"css": ["selector1"]},
+       "original_price": {"css": ["selector1"]},
+       "wait_for": "main-selector-to-wait-for"
+     },
+     "confidence": 0.85,
+     "notes": "Brief explanation of selector choices"
+   }
+   ```"""
+
+
+_JSON_DECODER = json.JSONDecoder()
+
+# HTML sent to the LLM per page; a batch splits this between its pages
+MAX_HTML_CHARS = 50000
+MIN_BATCH_HTML_CHARS = 10000
+# Most pages a batch holds before its prompt outgrows a single-page prompt
+MAX_BATCH_SIZE = MAX_HTML_CHARS // MIN_BATCH_HTML_CHARS
+
+# Common product container patterns, located with one case-insensitive scan
+_PRODUCT_MARKER_RE = re.compile(
+    r'<main|class="product|id="product|itemtype="http://schema\.org/Product|data-product',
+    re.IGNORECASE,
+)
+
+
+@functools.lru_cache(maxsize=1)
 def load_regeneration_prompt() -> str:
     """Load selector regeneration prompt from file or use default."""
     prompt_file = PROMPTS_DIR / "regenerate_selectors.txt"
     if prompt_file.exists():
         return prompt_file.read_text()
 
-    # Default prompt if file not found
-    return """You are a web scraping expert. Analyze the HTML content and generate CSS selectors
-to extract product information (price, name, availability, image, original price).
-
-For each field, provide an array of CSS selectors in order of preference.
-Return a JSON object with the selector configuration."""
+    return _DEFAULT_REGENERATION_PROMPT
 
 
 @dataclass
@@ -100,49 +166,7 @@ class SelectorRegenerator:
 
     def _build_system_prompt(self) -> str:
         """Build the system prompt for selector regeneration."""
-        return """You are a web scraping expert specializing in e-commerce product pages.
-
-Your task is to analyze HTML content and generate reliable CSS selectors for extracting product data.
-
-## Guidelines
-
-1. **Prioritize Stable Selectors**
-   - Prefer semantic HTML attributes (data-*, itemprop, aria-*)
-   - Use ID selectors when unique and descriptive
-   - Avoid positional selectors (:nth-child) when possible
-   - Look for consistent patterns across similar elements
-
-2. **Multiple Fallbacks**
-   - Provide 2-4 selectors per field in order of preference
-   - First selector should be most specific/reliable
-   - Later selectors should be progressively more general
-
-3. **Price Selectors**
-   - Target the final/sale price, not original/MSRP
-   - Handle currency symbols and formatting
-   - Check for "sale", "now", "current" price containers
-
-4. **Availability Selectors**
-   - Look for "Add to Cart" buttons
-   - Check for out-of-stock indicators
-   - Note common patterns: inventory status, shipping info
-
-5. **Response Format**
-   Return valid JSON only:
-   ```json
-   {
-     "selectors": {
-       "price": {"css": ["selector1", "selector2"]},
-       "name": {"css": ["selector1", "selector2"]},
-       "availability": {"css": ["selector1"], "in_stock_patterns": ["in stock"]},
-       "image": {"css": ["selector1"]},
-       "original_price": {"css": ["selector1"]},
-       "wait_for": "main-selector-to-wait-for"
-     },
-     "confidence": 0.85,
-     "notes": "Brief explanation of selector choices"
-   }
-   ```"""
+        return _SYSTEM_PROMPT
 
     async def regenerate(
         self,
@@ -175,30 +199,7 @@ Your task is to analyze HTML content and generate reliable CSS selectors for ext
 
             # Parse response
             parsed = self._parse_response(result.data)
-
-            if parsed and parsed.get("selectors"):
-                confidence = parsed.get("confidence", 0.5)
-
-                if confidence >= self.min_confidence:
-                    return RegenerationResult(
-                        success=True,
-                        domain=domain,
-                        selectors=parsed["selectors"],
-                        confidence=confidence,
-                    )
-                else:
-                    return RegenerationResult(
-                        success=False,
-                        domain=domain,
-                        error=f"Low confidence: {confidence:.2f}",
-                        confidence=confidence,
-                    )
-
-            return RegenerationResult(
-                success=False,
-                domain=domain,
-                error="Failed to parse selector response",
-            )
+            return self._to_result(domain, parsed)
 
         except Exception as e:
             logger.error(f"Selector regeneration failed for {domain}: {e}")
@@ -208,7 +209,73 @@ Your task is to analyze HTML content and generate reliable CSS selectors for ext
                 error=str(e),
             )
 
-    def _truncate_html(self, html: str, max_chars: int = 50000) -> str:
+    async def regenerate_many(
+        self,
+        items: list[tuple[str, str, dict | None]],
+    ) -> list[RegenerationResult]:
+        """
+        Regenerate CSS selectors for several domains in one LLM call.
+
+        Args:
+            items: (domain, html, current_selectors) for each broken store
+
+        Returns:
+            RegenerationResult per item, in the same order
+        """
+        if len(items) <= 1:
+            return [
+                await self.regenerate(html, domain, selectors) for domain, html, selectors in items
+            ]
+
+        # Keep the combined prompt near the size of a single-page prompt
+        max_chars = max(MAX_HTML_CHARS // len(items), MIN_BATCH_HTML_CHARS)
+        prompt = self._build_batch_regeneration_prompt(
+            [
+                (domain, self._truncate_html(html, max_chars), selectors)
+                for domain, html, selectors in items
+            ]
+        )
+
+        try:
+            result = await self._agent.run(prompt)
+            parsed = self._parse_response(result.data)
+        except Exception as e:
+            logger.error(f"Batch selector regeneration failed: {e}")
+            return [
+                RegenerationResult(success=False, domain=domain, error=str(e))
+                for domain, _, _ in items
+            ]
+
+        by_domain = (parsed or {}).get("results") or {}
+        return [self._to_result(domain, by_domain.get(domain)) for domain, _, _ in items]
+
+    def _to_result(self, domain: str, parsed: dict | None) -> RegenerationResult:
+        """Turn a parsed LLM response into a result, applying the confidence gate."""
+        if parsed and parsed.get("selectors"):
+            confidence = parsed.get("confidence", 0.5)
+
+            if confidence >= self.min_confidence:
+                return RegenerationResult(
+                    success=True,
+                    domain=domain,
+                    selectors=parsed["selectors"],
+                    confidence=confidence,
+                )
+            else:
+                return RegenerationResult(
+                    success=False,
+                    domain=domain,
+                    error=f"Low confidence: {confidence:.2f}",
+                    confidence=confidence,
+                )
+
+        return RegenerationResult(
+            success=False,
+            domain=domain,
+            error="Failed to parse selector response",
+        )
+
+    def _truncate_html(self, html: str, max_chars: int = MAX_HTML_CHARS) -> str:
         """
         Truncate HTML to reasonable size for LLM processing.
 
@@ -218,22 +285,13 @@ Your task is to analyze HTML content and generate reliable CSS selectors for ext
             return html
 
         # Try to find and extract product-relevant sections
-        # Look for common product container patterns
-        product_markers = [
-            '<main',
-            'class="product',
-            'id="product',
-            'itemtype="http://schema.org/Product',
-            'data-product',
-        ]
-
-        for marker in product_markers:
-            idx = html.lower().find(marker.lower())
-            if idx != -1:
-                # Extract section around the marker
-                start = max(0, idx - 1000)
-                end = min(len(html), idx + max_chars - 1000)
-                return html[start:end]
+        match = _PRODUCT_MARKER_RE.search(html)
+        if match:
+            # Extract section around the marker
+            idx = match.start()
+            start = max(0, idx - 1000)
+            end = min(len(html), idx + max_chars - 1000)
+            return html[start:end]
 
         # Fallback: just truncate from the start
         return html[:max_chars]
@@ -245,49 +303,68 @@ Your task is to analyze HTML content and generate reliable CSS selectors for ext
         current_selectors: dict | None,
     ) -> str:
         """Build the regeneration prompt with context."""
-        prompt_parts = [
-            f"Analyze this HTML from {domain} and generate CSS selectors for product data extraction.",
-            "",
-        ]
+        buf = io.StringIO()
+        buf.write(
+            f"Analyze this HTML from {domain} and generate CSS selectors "
+            "for product data extraction.\n\n"
+        )
 
         if current_selectors:
-            prompt_parts.extend([
-                "## Current (Broken) Selectors",
-                "These selectors are no longer working:",
-                f"```json\n{json.dumps(current_selectors, indent=2)}\n```",
-                "",
-            ])
-
-        prompt_parts.extend([
-            "## HTML Content",
-            "```html",
-            html,
-            "```",
-            "",
-            "Generate new CSS selectors that will reliably extract product data from this page.",
-        ])
-
-        return "\n".join(prompt_parts)
+            buf.write(
+                "## Current (Broken) Selectors\nThese selectors are no longer working:\n```json\n"
+            )
+            buf.write(orjson.dumps(current_selectors, option=orjson.OPT_INDENT_2).decode())
+            buf.write("\n```\n\n")
+
+        buf.write("## HTML Content\n```html\n")
+        buf.write(html)
+        buf.write(
+            "\n```\n\n"
+            "Generate new CSS selectors that will reliably extract product data from this page."
+        )
+
+        return buf.getvalue()
+
+    def _build_batch_regeneration_prompt(
+        self,
+        items: list[tuple[str, str, dict | None]],
+    ) -> str:
+        """Build one prompt covering several domains."""
+        buf = io.StringIO()
+        buf.write(
+            "Analyze the HTML from each of the following stores and generate CSS selectors "
+            "for product data extraction.\n"
+            "Each store's page starts with a <!-- DOMAIN: ... --> line.\n\n"
+        )
+
+        for domain, html, current_selectors in items:
+            buf.write(f"<!-- DOMAIN: {domain} -->\n\n")
+            if current_selectors:
+                buf.write("## Current (Broken) Selectors\n```json\n")
+                buf.write(orjson.dumps(current_selectors, option=orjson.OPT_INDENT_2).decode())
+                buf.write("\n```\n\n")
+            buf.write("## HTML Content\n```html\n")
+            buf.write(html)
+            buf.write("\n```\n\n")
+
+        buf.write(
+            "Respond with a single JSON object mapping each domain to the usual response:\n"
+            '{"results": {"<domain>": {"selectors": {...}, "confidence": 0.85}, ...}}'
+        )
+
+        return buf.getvalue()
 
     def _parse_response(self, response: str) -> dict | None:
         """Parse LLM response to extract selector configuration."""
+        # Decode the first JSON object, ignoring any surrounding text or code fences
+        start = response.find("{")
+        if start < 0:
+            logger.warning("No JSON object in selector response")
+            return None
+
         try:
-            # Try to find JSON in response
-            response = response.strip()
-
-            # Handle markdown code blocks
-            if "```json" in response:
-                start = response.find("```json") + 7
-                end = response.find("```", start)
-                if end > start:
-                    response = response[start:end]
-            elif "```" in response:
-                start = response.find("```") + 3
-                end = response.find("```", start)
-                if end > start:
-                    response = response[start:end]
-
-            return json.loads(response.strip())
+            result, _ = _JSON_DECODER.raw_decode(response, start)
+            return result
 
         except json.JSONDecodeError as e:
             logger.warning(f"Failed to parse selector response: {e}")
@@ -334,7 +411,7 @@ Your task is to analyze HTML content and generate reliable CSS selectors for ext
 
     async def update_store_selectors(
         self,
-        session: Session,
+        session: AsyncSession,
         domain: str,
         new_selectors: dict,
     ) -> bool:
@@ -350,7 +427,7 @@ Your task is to analyze HTML content and generate reliable CSS selectors for ext
             True if update successful
         """
         try:
-            store = session.get(Store, domain)
+            store = await session.get(Store, domain)
             if not store:
                 logger.warning(f"Store not found: {domain}")
                 return False
@@ -360,17 +437,16 @@ Your task is to analyze HTML content and generate reliable CSS selectors for ext
             merged = {**existing, **new_selectors}
 
             store.selectors = merged
-            store.updated_at = datetime.utcnow()
 
             session.add(store)
-            session.commit()
+            await session.flush()
 
             logger.info(f"Updated selectors for store: {domain}")
             return True
 
         except Exception as e:
             logger.error(f"Failed to update store selectors: {e}")
-            session.rollback()
+            await session.rollback()
             return False
 
 
@@ -4,13 +4,21 @@ Self-healing service orchestration.
 Coordinates failure detection, selector regeneration, and store health updates.
 """
 
+import asyncio
 import logging
-from dataclasses import dataclass
+import time
+from collections import defaultdict
+from collections.abc import Callable, Iterable, Iterator
+from contextlib import AbstractAsyncContextManager, contextmanager
+from dataclasses import asdict, dataclass, field
 from datetime import datetime
 
-from sqlmodel import Session
+from sqlalchemy import case, func, select, update
+from sqlalchemy.ext.asyncio import AsyncSession
 
+from src.database import repository
 from src.database.models import Product, ProductStatus, Store
+from src.database.session import get_session
 from src.scraper import ScraperEngine, get_scraper_engine
 
 from .detector import (
@@ -19,6 +27,7 @@ from .detector import (
     get_failure_detector,
 )
 from .regenerator import (
+    MAX_BATCH_SIZE,
     RegenerationResult,
     SelectorRegenerator,
     get_selector_regenerator,
@@ -26,8 +35,13 @@ from .regenerator import (
 
 logger = logging.getLogger(__name__)
 
+# Pages fetched for healing are reused for this long (seconds)
+HTML_CACHE_TTL = 300
+# Max pages kept; the oldest is dropped first
+HTML_CACHE_MAX_SIZE = 128
 
-@dataclass
+
+@dataclass(slots=True)
 class HealingAttempt:
     """Record of a healing attempt for a product."""
 
@@ -37,14 +51,10 @@ class HealingAttempt:
     attempt_number: int
     error: str | None = None
     new_selectors: dict | None = None
-    timestamp: datetime | None = None
-
-    def __post_init__(self):
-        if self.timestamp is None:
-            self.timestamp = datetime.utcnow()
+    timestamp: datetime = field(default_factory=datetime.utcnow)
 
 
-@dataclass
+@dataclass(slots=True)
 class HealingReport:
     """Summary report of healing operations."""
 
@@ -53,11 +63,21 @@ class HealingReport:
     products_failed: int = 0
     products_flagged_attention: int = 0
     stores_updated: int = 0
-    attempts: list[HealingAttempt] | None = None
+    stores_flagged_attention: list[str] = field(default_factory=list)
+    attempts: list[HealingAttempt] = field(default_factory=list)
+
 
-    def __post_init__(self):
-        if self.attempts is None:
-            self.attempts = []
+@dataclass
+class _StoreHealing:
+    """A store's healing run, prepared from the database before regeneration."""
+
+    domain: str
+    selectors: dict | None
+    product: Product
+    analyses: list[FailureAnalysis]
+    attempt_number: int
+    # Set when the healing scrape extracted fine, so no regeneration was needed
+    scrape_succeeded: bool = False
 
 
 class SelfHealingService:
@@ -80,6 +100,8 @@ class SelfHealingService:
         scraper: ScraperEngine | None = None,
         max_products_per_run: int = 10,
         store_failure_threshold: float = 0.5,  # 50% products failing
+        store_concurrency: int = 8,
+        html_cache_ttl: int = HTML_CACHE_TTL,
     ):
         """
         Initialize self-healing service.
@@ -90,19 +112,86 @@ class SelfHealingService:
             scraper: Scraper engine for testing selectors
             max_products_per_run: Max products to heal per run
             store_failure_threshold: Fraction of failures to flag store
+            store_concurrency: Max stores fetching and regenerating at once
+            html_cache_ttl: Seconds a fetched page is reused across attempts
         """
         self.detector = detector or get_failure_detector()
         self.regenerator = regenerator or get_selector_regenerator()
         self.scraper = scraper or get_scraper_engine()
         self.max_products_per_run = max_products_per_run
         self.store_failure_threshold = store_failure_threshold
+        self.store_concurrency = store_concurrency
+        self.html_cache_ttl = html_cache_ttl
 
         # Track healing attempts per product (in-memory, reset on restart)
         self._healing_attempts: dict[int, int] = {}
 
+        # Recently fetched pages: url -> (fetched_at, html)
+        self._html_cache: dict[str, tuple[float, str]] = {}
+
+        # Heals products as the detector reports them
+        self._event_task: asyncio.Task[None] | None = None
+
+        # Products being healed by the event worker or a healing cycle
+        self._healing_in_progress: set[int] = set()
+
+    @property
+    def is_listening(self) -> bool:
+        """Whether the healing event worker is active."""
+        return self._event_task is not None and not self._event_task.done()
+
+    def start_event_worker(
+        self,
+        session_factory: Callable[[], AbstractAsyncContextManager[AsyncSession]] = get_session,
+    ) -> None:
+        """
+        Start healing products as soon as they cross the failure threshold.
+
+        run_healing_cycle() remains the periodic sweep for anything missed,
+        e.g. failures recorded before a restart.
+
+        Args:
+            session_factory: Context manager yielding a session that commits on exit
+        """
+        if not self.is_listening:
+            self._event_task = asyncio.create_task(self._consume_events(session_factory))
+            self.detector.publish_events = True
+
+    async def stop_event_worker(self) -> None:
+        """Stop the healing event worker."""
+        if not self.is_listening:
+            return
+        self.detector.publish_events = False
+        self._event_task.cancel()
+        try:
+            await self._event_task
+        except asyncio.CancelledError:
+            pass
+        self._event_task = None
+
+    async def _consume_events(
+        self,
+        session_factory: Callable[[], AbstractAsyncContextManager[AsyncSession]],
+    ) -> None:
+        """Heal each product put on the detector's queue; errors are logged."""
+        while True:
+            product_id = await self.detector.healing_queue.get()
+            if product_id in self._healing_in_progress:
+                continue
+            try:
+                with self._claim([product_id]):
+                    async with session_factory() as session:
+                        attempt = await self.heal_single_product(session, product_id)
+                logger.info(
+                    f"Event-driven healing for product {product_id}: "
+                    f"{'healed' if attempt.success else attempt.error}"
+                )
+            except Exception as e:
+                logger.error(f"Event-driven healing failed for product {product_id}: {e}")
+
     async def run_healing_cycle(
         self,
-        session: Session,
+        session: AsyncSession,
         store_domain: str | None = None,
     ) -> HealingReport:
         """
@@ -117,52 +206,105 @@ class SelfHealingService:
         """
         report = HealingReport()
 
+        if not await self.detector.has_any_needing_healing(session, store_domain):
+            logger.info("No products need healing")
+            return report
+
         # Get products needing healing
-        products_to_heal = self.detector.get_products_needing_healing(
+        products_to_heal = await self.detector.get_products_needing_healing(
             session,
             store_domain=store_domain,
             limit=self.max_products_per_run,
         )
+        # Skip products the event worker is already healing
+        products_to_heal = [
+            a for a in products_to_heal if a.product_id not in self._healing_in_progress
+        ]
         report.total_products_checked = len(products_to_heal)
 
         if not products_to_heal:
             logger.info("No products need healing")
             return report
 
-        logger.info(f"Found {len(products_to_heal)} products needing healing")
-
-        # Group by store for efficiency
-        by_store: dict[str, list[FailureAnalysis]] = {}
-        for analysis in products_to_heal:
-            product = session.get(Product, analysis.product_id)
-            if product:
-                domain = product.store_domain
-                if domain not in by_store:
-                    by_store[domain] = []
-                by_store[domain].append(analysis)
-
-        # Process each store
-        for domain, analyses in by_store.items():
-            store_healed = await self._heal_store_products(
-                session, domain, analyses, report
-            )
-            if store_healed:
-                report.stores_updated += 1
+        with self._claim(a.product_id for a in products_to_heal):
+            await self._heal_analyses(session, products_to_heal, report)
 
         # Check for stores needing attention
         await self._check_store_health(session, report)
 
+        # One record per cycle; per-store details are in the report
         logger.info(
-            f"Healing cycle complete: {report.products_healed} healed, "
+            f"Healing cycle complete: {report.total_products_checked} checked, "
+            f"{report.products_healed} healed, "
             f"{report.products_failed} failed, "
-            f"{report.products_flagged_attention} flagged"
+            f"{report.products_flagged_attention} flagged, "
+            f"{report.stores_updated} stores updated, "
+            f"stores needing attention: {report.stores_flagged_attention or 'none'}",
+            extra={"report": asdict(report)},
         )
 
         return report
 
+    @contextmanager
+    def _claim(self, product_ids: Iterable[int]) -> Iterator[None]:
+        """Mark products as being healed for the duration of the block."""
+        claimed = set(product_ids)
+        self._healing_in_progress |= claimed
+        try:
+            yield
+        finally:
+            self._healing_in_progress -= claimed
+
+    async def _heal_analyses(
+        self,
+        session: AsyncSession,
+        products_to_heal: list[FailureAnalysis],
+        report: HealingReport,
+    ) -> None:
+        """Regenerate selectors per store for the given products."""
+        # Group by store for efficiency
+        products = await repository.get_products_by_ids(
+            session, (a.product_id for a in products_to_heal)
+        )
+        by_store: dict[str, list[FailureAnalysis]] = defaultdict(list)
+        for analysis in products_to_heal:
+            product = products.get(analysis.product_id)
+            if product:
+                by_store[product.store_domain].append(analysis)
+
+        # Load the stores up front; per-store lookups then hit the identity map
+        await repository.get_stores_by_domains(session, by_store)
+
+        # Check attempt limits and pick the product to regenerate from, per store
+        runs: list[_StoreHealing] = []
+        for domain, analyses in by_store.items():
+            run = await self._prepare_store_healing(session, domain, analyses, report)
+            if run:
+                runs.append(run)
+
+        # Fetch pages for all stores concurrently, starting the browser first
+        # so the fetches share it
+        if runs:
+            await self.scraper.ensure_crawler()
+        semaphore = asyncio.Semaphore(self.store_concurrency)
+
+        async def fetch(run: _StoreHealing) -> str | None:
+            async with semaphore:
+                return await self._fetch_store_html(run)
+
+        pages = await asyncio.gather(*(fetch(run) for run in runs))
+        results = await self._regenerate_stores(
+            [(run, html) for run, html in zip(runs, pages, strict=True) if html is not None]
+        )
+
+        # Apply results one store at a time, as the session cannot be shared
+        for run in runs:
+            if await self._apply_store_healing(session, run, results.get(run.domain), report):
+                report.stores_updated += 1
+
     async def _heal_store_products(
         self,
-        session: Session,
+        session: AsyncSession,
         domain: str,
         analyses: list[FailureAnalysis],
         report: HealingReport,
@@ -182,158 +324,269 @@ class SelfHealingService:
         Returns:
             True if store selectors were updated
         """
-        store = session.get(Store, domain)
-        if not store:
+        run = await self._prepare_store_healing(session, domain, analyses, report)
+        if not run:
             return False
 
+        regen_result = await self._regenerate_store(run)
+        return await self._apply_store_healing(session, run, regen_result, report)
+
+    async def _prepare_store_healing(
+        self,
+        session: AsyncSession,
+        domain: str,
+        analyses: list[FailureAnalysis],
+        report: HealingReport,
+    ) -> _StoreHealing | None:
+        """
+        Load what a store's healing run needs from the database.
+
+        Returns:
+            _StoreHealing, or None if the store is skipped
+        """
+        store = await session.get(Store, domain)
+        if not store:
+            return None
+
         # Pick first product to use for selector regeneration
         first_analysis = analyses[0]
-        first_product = session.get(Product, first_analysis.product_id)
+        first_product = await session.get(Product, first_analysis.product_id)
         if not first_product:
-            return False
+            return None
 
         # Check healing attempt limit
         attempt_num = self._healing_attempts.get(first_product.id, 0) + 1
         if attempt_num > self.regenerator.max_attempts:
-            logger.warning(
-                f"Product {first_product.id} exceeded max healing attempts"
+            report.products_flagged_attention += await self._flag_for_attention(
+                session, [first_product.id]
             )
-            await self._flag_for_attention(session, first_product)
-            report.products_flagged_attention += 1
-            return False
+            return None
 
-        # Fetch fresh HTML
+        return _StoreHealing(
+            domain=domain,
+            selectors=store.selectors,
+            product=first_product,
+            analyses=analyses,
+            attempt_number=attempt_num,
+        )
+
+    async def _regenerate_store(self, run: _StoreHealing) -> RegenerationResult | None:
+        """
+        Fetch a store's page and regenerate its selectors.
+
+        Returns:
+            RegenerationResult, or None if the page could not be fetched or
+            the scrape succeeded (run.scrape_succeeded is then set)
+        """
+        html = await self._fetch_store_html(run)
+        if html is None:
+            return None
+
+        # Attempt regeneration
+        return await self._try_regenerate(run.domain, run.selectors, html, run.attempt_number)
+
+    async def _regenerate_stores(
+        self,
+        fetched: list[tuple[_StoreHealing, str]],
+    ) -> dict[str, RegenerationResult]:
+        """
+        Regenerate selectors for several stores, MAX_BATCH_SIZE per LLM call.
+
+        Args:
+            fetched: Each store's healing run and fetched page
+
+        Returns:
+            RegenerationResult per store domain
+        """
+        batches = [fetched[i : i + MAX_BATCH_SIZE] for i in range(0, len(fetched), MAX_BATCH_SIZE)]
+        results = await asyncio.gather(
+            *(
+                self.regenerator.regenerate_many(
+                    [(run.domain, html, run.selectors) for run, html in batch]
+                )
+                for batch in batches
+            )
+        )
+        return {result.domain: result for batch in results for result in batch}
+
+    async def _fetch_store_html(self, run: _StoreHealing) -> str | None:
+        """
+        Get the page to regenerate a store's selectors from.
+
+        Makes no database calls, so several stores can fetch at once.
+
+        Returns:
+            Page HTML, or None if it could not be fetched or the scrape
+            succeeded (run.scrape_succeeded is then set)
+        """
+        html = self._get_cached_html(run.product.url)
+        if html is not None:
+            return html
+
+        # Fetch fresh HTML; the page is returned even when extraction fails
         try:
             scrape_result = await self.scraper.scrape(
-                first_product.url,
+                run.product.url,
                 validate_ssrf=False,  # Already validated
+                return_raw=True,
             )
-
-            if not scrape_result.success:
-                logger.warning(f"Failed to fetch HTML for healing: {domain}")
-                report.products_failed += len(analyses)
-                return False
-
         except Exception as e:
             logger.error(f"Scrape failed during healing: {e}")
-            report.products_failed += len(analyses)
-            return False
+            return None
+
+        if scrape_result.success:
+            # Current selectors work again, e.g. after a transient failure
+            run.scrape_succeeded = True
+            return None
+
+        html = scrape_result.raw_html
+        if not html:
+            logger.warning(f"Failed to fetch HTML for healing: {run.domain}")
+            return None
+        self._cache_html(run.product.url, html)
+        return html
+
+    def _get_cached_html(self, url: str) -> str | None:
+        """Get a page fetched within html_cache_ttl, if any."""
+        cached = self._html_cache.get(url)
+        if cached is None:
+            return None
+        fetched_at, html = cached
+        if time.time() - fetched_at >= self.html_cache_ttl:
+            del self._html_cache[url]
+            return None
+        return html
+
+    def _cache_html(self, url: str, html: str) -> None:
+        """Remember a fetched page, dropping the oldest if the cache is full."""
+        self._html_cache.pop(url, None)
+        if len(self._html_cache) >= HTML_CACHE_MAX_SIZE:
+            del self._html_cache[next(iter(self._html_cache))]
+        self._html_cache[url] = (time.time(), html)
+
+    async def _apply_store_healing(
+        self,
+        session: AsyncSession,
+        run: _StoreHealing,
+        regen_result: RegenerationResult | None,
+        report: HealingReport,
+    ) -> bool:
+        """
+        Record a store's regeneration result and update the database.
 
-        # Get HTML content - need to re-fetch with raw HTML
-        # For now, mark as failed - full implementation would need raw HTML access
-        # This is a simplified version that demonstrates the architecture
+        Returns:
+            True if store selectors were updated
+        """
+        analyses = run.analyses
+        if run.scrape_succeeded:
+            await self.detector.record_success_bulk(session, [run.product.id])
+            self._healing_attempts.pop(run.product.id, None)
+            return False
 
-        # Attempt regeneration
-        regen_result = await self._try_regenerate(
-            session, domain, store.selectors, first_product, attempt_num
-        )
+        if regen_result is None:
+            report.products_failed += len(analyses)
+            return False
 
         attempt = HealingAttempt(
-            product_id=first_product.id,
-            domain=domain,
+            product_id=run.product.id,
+            domain=run.domain,
             success=regen_result.success,
-            attempt_number=attempt_num,
+            attempt_number=run.attempt_number,
             error=regen_result.error,
             new_selectors=regen_result.selectors,
         )
         report.attempts.append(attempt)
-        self._healing_attempts[first_product.id] = attempt_num
+        self._healing_attempts[run.product.id] = run.attempt_number
 
         if regen_result.success and regen_result.selectors:
             # Update store selectors
             updated = await self.regenerator.update_store_selectors(
-                session, domain, regen_result.selectors
+                session, run.domain, regen_result.selectors
             )
 
             if updated:
                 # Reset failure counts for all affected products
-                for analysis in analyses:
-                    self.detector.record_success(session, analysis.product_id)
-                    report.products_healed += 1
-
-                logger.info(f"Successfully healed {len(analyses)} products for {domain}")
+                await self.detector.record_success_bulk(session, [a.product_id for a in analyses])
+                report.products_healed += len(analyses)
                 return True
 
         # Regeneration failed
         report.products_failed += len(analyses)
 
         # Check if we should flag for attention
-        if attempt_num >= self.regenerator.max_attempts:
-            for analysis in analyses:
-                product = session.get(Product, analysis.product_id)
-                if product:
-                    await self._flag_for_attention(session, product)
-                    report.products_flagged_attention += 1
+        if run.attempt_number >= self.regenerator.max_attempts:
+            report.products_flagged_attention += await self._flag_for_attention(
+                session, [a.product_id for a in analyses]
+            )
 
         return False
 
     async def _try_regenerate(
         self,
-        session: Session,
         domain: str,
         current_selectors: dict | None,
-        product: Product,
+        html: str,
         attempt_num: int,
     ) -> RegenerationResult:
         """
-        Attempt to regenerate selectors for a product.
+        Attempt to regenerate selectors from an already fetched page.
 
-        In a full implementation, this would:
-        1. Fetch raw HTML from the product URL
-        2. Pass to regenerator for LLM analysis
-        3. Test new selectors against the page
-        4. Return result
+        Args:
+            domain: Store domain
+            current_selectors: Current (broken) selectors for context
+            html: Page HTML from the healing scrape
+            attempt_num: Healing attempt number
 
-        For now, returns a placeholder indicating the architecture.
+        Returns:
+            RegenerationResult with new selectors or error
         """
-        # Placeholder - would fetch HTML and call regenerator.regenerate()
-        # This demonstrates the service architecture
-
-        logger.info(
-            f"Attempting selector regeneration for {domain} "
-            f"(attempt {attempt_num}/{self.regenerator.max_attempts})"
-        )
-
-        # In production, this would be:
-        # html = await fetch_raw_html(product.url)
-        # return await self.regenerator.regenerate(html, domain, current_selectors)
-
-        return RegenerationResult(
-            success=False,
-            domain=domain,
-            error="Full regeneration requires raw HTML access - placeholder",
-        )
+        return await self.regenerator.regenerate(html, domain, current_selectors)
 
     async def _flag_for_attention(
         self,
-        session: Session,
-        product: Product,
-    ) -> None:
-        """Flag a product as needing manual attention."""
-        product.status = ProductStatus.NEEDS_ATTENTION
-        product.updated_at = datetime.utcnow()
-        session.add(product)
-        session.commit()
+        session: AsyncSession,
+        product_ids: list[int],
+    ) -> int:
+        """
+        Flag products as needing manual attention in one UPDATE.
 
-        logger.info(f"Flagged product {product.id} for manual attention")
+        Returns:
+            Number of products flagged
+        """
+        stmt = (
+            update(Product)
+            .where(Product.id.in_(product_ids))
+            .values(status=ProductStatus.NEEDS_ATTENTION)
+        )
+        result = await session.execute(stmt)
+        return result.rowcount
 
     async def _check_store_health(
         self,
-        session: Session,
+        session: AsyncSession,
         report: HealingReport,
     ) -> None:
         """
         Check store health and flag stores with high failure rates.
 
-        A store is flagged if >50% of its products are failing.
+        A store is flagged if more than store_failure_threshold of its
+        products are failing. All stores are checked in one grouped query.
         """
-        # This would query store health metrics
-        # Implementation in health.py
-        pass
+        is_failing = Product.status.in_((ProductStatus.ERROR, ProductStatus.NEEDS_ATTENTION))
+        total = func.count(Product.id)
+        failing = func.sum(case((is_failing, 1), else_=0))
+        stmt = (
+            select(Product.store_domain)
+            .where(Product.deleted_at.is_(None))
+            .group_by(Product.store_domain)
+            .having(failing > total * self.store_failure_threshold)
+        )
+        result = await session.execute(stmt)
+        report.stores_flagged_attention = list(result.scalars())
 
     async def heal_single_product(
         self,
-        session: Session,
+        session: AsyncSession,
         product_id: int,
     ) -> HealingAttempt:
         """
@@ -346,34 +599,16 @@ class SelfHealingService:
         Returns:
             HealingAttempt with result
         """
-        analysis = self.detector.analyze_product(session, product_id)
+        analysis = await self.detector.analyze_product(session, product_id)
         if not analysis:
-            return HealingAttempt(
-                product_id=product_id,
-                domain="unknown",
-                success=False,
-                attempt_number=0,
-                error="Product not found",
-            )
+            return self._error_attempt(product_id, "unknown", "Product not found")
 
         if not analysis.needs_healing:
-            return HealingAttempt(
-                product_id=product_id,
-                domain="unknown",
-                success=False,
-                attempt_number=0,
-                error="Product does not need healing",
-            )
+            return self._error_attempt(product_id, "unknown", "Product does not need healing")
 
-        product = session.get(Product, product_id)
+        product = await session.get(Product, product_id)
         if not product:
-            return HealingAttempt(
-                product_id=product_id,
-                domain="unknown",
-                success=False,
-                attempt_number=0,
-                error="Product not found",
-            )
+            return self._error_attempt(product_id, "unknown", "Product not found")
 
         report = HealingReport()
         await self._heal_store_products(
@@ -386,12 +621,17 @@ class SelfHealingService:
         if report.attempts:
             return report.attempts[0]
 
+        return self._error_attempt(product_id, product.store_domain, "Healing failed")
+
+    @staticmethod
+    def _error_attempt(product_id: int, domain: str, error: str) -> HealingAttempt:
+        """Build the HealingAttempt returned when a product could not be healed."""
         return HealingAttempt(
             product_id=product_id,
-            domain=product.store_domain,
+            domain=domain,
             success=False,
             attempt_number=0,
-            error="Healing failed",
+            error=error,
         )
 
     def reset_healing_attempts(self, product_id: int | None = None) -> None:
@@ -1,6 +1,7 @@
 """Notification system for Perpee."""
 
 from src.notifications.channels.email import EmailChannel, EmailResult
+from src.notifications.sender import NotificationSender, SendJob
 from src.notifications.service import (
     AlertEvaluationResult,
     NotificationResult,
@@ -22,6 +23,9 @@ __all__ = [
     "NotificationService",
     "NotificationResult",
     "AlertEvaluationResult",
+    # Background sending
+    "NotificationSender",
+    "SendJob",
     # Templates
     "TemplateRenderer",
     "render_price_alert",
@@ -3,18 +3,75 @@ Email notification channel using Resend SDK.
 Handles email delivery with retry logic and error handling.
 """
 
+import asyncio
 import logging
+from collections.abc import Callable
+from concurrent.futures import ThreadPoolExecutor
 from dataclasses import dataclass
 from typing import Any
 
-import resend
-from tenacity import retry, stop_after_attempt, wait_exponential
-
 from config.settings import settings
 from src.core.exceptions import NotificationError
 
 logger = logging.getLogger(__name__)
 
+# Maximum messages per Resend batch request
+MAX_BATCH_SIZE = 100
+# Maximum concurrent single-email requests. This caps requests in flight,
+# not requests per second; Resend's rate limit answers with 429, which is retried
+SEND_CONCURRENCY = 10
+# Attempts per Resend request, with exponential backoff between them (seconds)
+SEND_ATTEMPTS = 3
+RETRY_MIN_WAIT = 2
+RETRY_MAX_WAIT = 30
+
+# Threads for the synchronous Resend SDK, kept apart from the default
+# executor and sized to SEND_CONCURRENCY
+_resend_executor: ThreadPoolExecutor | None = None
+
+
+def _get_resend_executor() -> ThreadPoolExecutor:
+    """Get the executor Resend calls run on, creating it on first use."""
+    global _resend_executor
+    if _resend_executor is None:
+        _resend_executor = ThreadPoolExecutor(
+            max_workers=SEND_CONCURRENCY, thread_name_prefix="resend"
+        )
+    return _resend_executor
+
+
+def shutdown_resend_executor() -> None:
+    """Shut down the Resend executor; it is recreated if needed again."""
+    global _resend_executor
+    if _resend_executor is not None:
+        _resend_executor.shutdown(wait=False)
+        _resend_executor = None
+
+
+def _client_error_code(error: BaseException | None) -> int | None:
+    """The 4xx status of a Resend error, or None for any other failure."""
+    from resend.exceptions import ResendError
+
+    if not isinstance(error, ResendError):
+        return None
+    try:
+        code = int(error.code)
+    except (TypeError, ValueError):
+        return None
+    return code if 400 <= code < 500 else None
+
+
+def _is_retryable(error: Exception) -> bool:
+    """Whether a failed Resend request is worth retrying."""
+    code = _client_error_code(error)
+    # Client errors won't succeed on retry, except rate limiting
+    return code is None or code == 429
+
+
+def _is_rate_limited(error: Exception) -> bool:
+    """Whether a Resend request was refused by rate limiting, so nothing was sent."""
+    return _client_error_code(error) == 429
+
 
 @dataclass
 class EmailResult:
@@ -30,7 +87,8 @@ class EmailChannel:
     Email notification channel using Resend.
 
     Features:
-    - Retry logic with exponential backoff (3 attempts)
+    - Retry logic with exponential backoff (3 attempts, client errors not retried)
+    - Batch requests retried only when rate limited
     - Configurable from/to addresses
     - HTML and plain text support
     """
@@ -47,22 +105,21 @@ class EmailChannel:
             api_key: Resend API key. Defaults to settings.resend_api_key.
             from_email: From email address. Defaults to settings.from_email.
         """
+        # Imported here so processes that never send email skip the SDK import
+        import resend
+
+        self._resend = resend
         self._api_key = api_key if api_key is not None else settings.resend_api_key
         self._from_email = from_email if from_email is not None else settings.from_email
 
         if self._api_key:
-            resend.api_key = self._api_key
+            self._resend.api_key = self._api_key
 
     @property
     def is_configured(self) -> bool:
         """Check if email channel is properly configured."""
         return bool(self._api_key and self._from_email)
 
-    @retry(
-        stop=stop_after_attempt(3),
-        wait=wait_exponential(multiplier=1, min=2, max=30),
-        reraise=True,
-    )
     async def send(
         self,
         to: str,
@@ -96,31 +153,10 @@ class EmailChannel:
                 error_message="Email channel not configured",
             )
 
-        params: dict[str, Any] = {
-            "from": self._from_email,
-            "to": [to],
-            "subject": subject,
-            "html": html_content,
-        }
-
-        if text_content:
-            params["text"] = text_content
-
-        if reply_to:
-            params["reply_to"] = reply_to
-
-        if tags:
-            params["tags"] = tags
+        params = self._build_params(to, subject, html_content, text_content, reply_to, tags)
 
         try:
-            # Resend SDK is synchronous, run in thread pool
-            import asyncio
-
-            loop = asyncio.get_event_loop()
-            response = await loop.run_in_executor(
-                None,
-                lambda: resend.Emails.send(params),
-            )
+            response = await self._call_resend(self._resend.Emails.send, params)
 
             message_id = response.get("id") if isinstance(response, dict) else None
 
@@ -150,6 +186,100 @@ class EmailChannel:
             )
             raise NotificationError(f"Failed to send email: {error_msg}") from e
 
+    async def _call_resend(
+        self,
+        send: Callable[[Any], Any],
+        params: Any,
+        retryable: Callable[[Exception], bool] = _is_retryable,
+    ) -> Any:
+        """
+        Call a Resend send function, retrying transient failures.
+
+        Args:
+            send: The Resend SDK function to call.
+            params: Parameters passed to it.
+            retryable: Decides whether a failure is retried.
+
+        Raises:
+            Exception: The last error, or the first non-retryable one.
+        """
+        for attempt in range(SEND_ATTEMPTS):
+            try:
+                # Resend SDK is synchronous, run in its own thread pool
+                loop = asyncio.get_running_loop()
+                return await loop.run_in_executor(_get_resend_executor(), send, params)
+            except Exception as e:
+                if attempt == SEND_ATTEMPTS - 1 or not retryable(e):
+                    raise
+                await asyncio.sleep(min(RETRY_MAX_WAIT, RETRY_MIN_WAIT * 2**attempt))
+
+    def _build_params(
+        self,
+        to: str,
+        subject: str,
+        html_content: str,
+        text_content: str | None = None,
+        reply_to: str | None = None,
+        tags: list[dict[str, str]] | None = None,
+    ) -> dict[str, Any]:
+        """Build Resend send parameters for one email."""
+        params: dict[str, Any] = {
+            "from": self._from_email,
+            "to": [to],
+            "subject": subject,
+            "html": html_content,
+        }
+
+        if text_content:
+            params["text"] = text_content
+
+        if reply_to:
+            params["reply_to"] = reply_to
+
+        if tags:
+            params["tags"] = tags
+
+        return params
+
+    async def _send_chunk(self, params_list: list[dict[str, Any]]) -> list[EmailResult]:
+        """
+        Send up to MAX_BATCH_SIZE emails in one Resend batch request.
+
+        Returns:
+            List of EmailResult for each email, in request order.
+
+        Only rate limiting is retried: after a timeout or server error the
+        batch may have been delivered, and resending it would duplicate it.
+
+        Raises:
+            NotificationError: If sending fails.
+        """
+        try:
+            response = await self._call_resend(
+                self._resend.Batch.send, params_list, retryable=_is_rate_limited
+            )
+        except Exception as e:
+            error_msg = str(e)
+            logger.error(
+                "Failed to send email batch",
+                extra={"count": len(params_list), "error": error_msg},
+            )
+            raise NotificationError(f"Failed to send email batch: {error_msg}") from e
+
+        # Response data lists one entry per message, in request order
+        data = response.get("data") if isinstance(response, dict) else None
+        data = data or []
+
+        logger.info("Email batch sent successfully", extra={"count": len(params_list)})
+
+        return [
+            EmailResult(
+                success=True,
+                message_id=data[i].get("id") if i < len(data) else None,
+            )
+            for i in range(len(params_list))
+        ]
+
     async def send_batch(
         self,
         emails: list[dict[str, Any]],
@@ -157,16 +287,60 @@ class EmailChannel:
         """
         Send multiple emails.
 
+        Two or more emails go through Resend's batch endpoint, up to
+        MAX_BATCH_SIZE per request. If the batch endpoint rejects a request
+        with a client error, its emails are sent individually and
+        concurrently instead; other failures leave them failed, as the
+        batch may have been delivered.
+
         Args:
             emails: List of email dicts with keys: to, subject, html_content, etc.
 
         Returns:
-            List of EmailResult for each email.
+            List of EmailResult for each email, in input order.
         """
-        results = []
-        for email in emails:
-            try:
-                result = await self.send(
+        if len(emails) >= 2:
+            return await self._send_batched(emails)
+
+        return await self._send_individually(emails)
+
+    async def _send_individually(self, emails: list[dict[str, Any]]) -> list[EmailResult]:
+        """Send emails one request each, up to SEND_CONCURRENCY at a time."""
+        semaphore = asyncio.Semaphore(SEND_CONCURRENCY)
+
+        async def send_one(email: dict[str, Any]) -> EmailResult:
+            async with semaphore:
+                try:
+                    return await self.send(
+                        to=email["to"],
+                        subject=email["subject"],
+                        html_content=email["html_content"],
+                        text_content=email.get("text_content"),
+                        reply_to=email.get("reply_to"),
+                        tags=email.get("tags"),
+                    )
+                except NotificationError as e:
+                    return EmailResult(
+                        success=False,
+                        error_message=str(e),
+                    )
+
+        return list(await asyncio.gather(*(send_one(email) for email in emails)))
+
+    async def _send_batched(self, emails: list[dict[str, Any]]) -> list[EmailResult]:
+        """Send emails in chunks through the batch endpoint."""
+        if not self.is_configured:
+            logger.warning("Email channel not configured - skipping send")
+            return [
+                EmailResult(success=False, error_message="Email channel not configured")
+                for _ in emails
+            ]
+
+        results: list[EmailResult] = []
+        for start in range(0, len(emails), MAX_BATCH_SIZE):
+            chunk = emails[start : start + MAX_BATCH_SIZE]
+            params_list = [
+                self._build_params(
                     to=email["to"],
                     subject=email["subject"],
                     html_content=email["html_content"],
@@ -174,13 +348,17 @@ class EmailChannel:
                     reply_to=email.get("reply_to"),
                     tags=email.get("tags"),
                 )
-                results.append(result)
+                for email in chunk
+            ]
+            try:
+                results.extend(await self._send_chunk(params_list))
             except NotificationError as e:
-                results.append(
-                    EmailResult(
-                        success=False,
-                        error_message=str(e),
-                    )
-                )
+                if _client_error_code(e.__cause__) is None:
+                    # The batch may have been delivered (e.g. a lost response),
+                    # so resending could duplicate every email in it
+                    results.extend(EmailResult(success=False, error_message=str(e)) for _ in chunk)
+                else:
+                    # Rejected by the batch endpoint, so nothing was sent
+                    results.extend(await self._send_individually(chunk))
 
         return results
@@ -0,0 +1,177 @@
+"""
+Background notification sending.
+
+The caller records a PENDING notification and registers the rendered
+email with send_on_commit(). Once the caller's transaction commits, the
+email is queued and worker tasks send it, recording the outcome in their
+own short-lived session, so the caller does not wait on the email
+provider. Emails for rolled-back transactions are never sent.
+"""
+
+import asyncio
+import logging
+from collections.abc import Callable
+from contextlib import AbstractAsyncContextManager
+from dataclasses import dataclass
+from datetime import datetime
+
+from sqlalchemy import event, update
+from sqlalchemy.ext.asyncio import AsyncSession
+from sqlalchemy.orm import Session
+
+from src.database.models import Notification, NotificationStatus
+from src.database.session import get_session
+from src.notifications.channels.email import SEND_CONCURRENCY, EmailChannel, EmailResult
+from src.notifications.templates.renderer import RenderedEmail
+
+logger = logging.getLogger(__name__)
+
+# Attempts to record a send outcome before giving up
+RECORD_ATTEMPTS = 3
+RECORD_RETRY_WAIT = 1.0  # Seconds, doubled per attempt
+
+# Session.info key for emails waiting on the transaction to commit
+_PENDING_SENDS_KEY = "pending_notification_sends"
+
+
+@event.listens_for(Session, "after_commit")
+def _queue_committed_sends(session: Session) -> None:
+    """Hand emails for committed notifications to their senders."""
+    for sender, job in session.info.pop(_PENDING_SENDS_KEY, ()):
+        sender.enqueue(job)
+
+
+@event.listens_for(Session, "after_rollback")
+def _discard_pending_sends(session: Session) -> None:
+    """Drop emails for notifications that were never committed."""
+    session.info.pop(_PENDING_SENDS_KEY, None)
+
+
+@dataclass
+class SendJob:
+    """A rendered email whose PENDING notification awaits the send result."""
+
+    notification_id: int
+    to: str
+    rendered: RenderedEmail
+    tags: list[dict[str, str]]
+    description: str | None = None  # For logging, e.g. "Price alert"
+
+
+class NotificationSender:
+    """
+    Sends queued notification emails from background workers.
+
+    Workers start on the first queued email. The owner calls drain() on
+    shutdown to send whatever is still queued.
+    """
+
+    def __init__(
+        self,
+        email_channel: EmailChannel | None = None,
+        workers: int = SEND_CONCURRENCY,
+        session_factory: Callable[[], AbstractAsyncContextManager[AsyncSession]] = get_session,
+    ):
+        """
+        Initialize sender.
+
+        Args:
+            email_channel: Email channel for sending. Defaults to new EmailChannel.
+            workers: Number of concurrent sends
+            session_factory: Context manager yielding a session that commits on exit
+        """
+        self._email = email_channel or EmailChannel()
+        self.workers = workers
+        self._session_factory = session_factory
+        self._queue: asyncio.Queue[SendJob] | None = None
+        self._tasks: list[asyncio.Task[None]] = []
+
+    @property
+    def is_running(self) -> bool:
+        """Whether the worker tasks are active."""
+        return any(not task.done() for task in self._tasks)
+
+    def send_on_commit(self, session: AsyncSession, job: SendJob) -> None:
+        """
+        Queue an email once the session's transaction commits.
+
+        Args:
+            session: Session holding the job's PENDING notification
+            job: Email to send
+        """
+        session.info.setdefault(_PENDING_SENDS_KEY, []).append((self, job))
+
+    def enqueue(self, job: SendJob) -> None:
+        """
+        Queue an email for sending now.
+
+        The job's notification must already be committed, so the workers'
+        sessions can see it; use send_on_commit() from inside a transaction.
+
+        Args:
+            job: Email to send
+        """
+        if not self.is_running:
+            self._queue = asyncio.Queue()
+            self._tasks = [asyncio.create_task(self._run()) for _ in range(self.workers)]
+        self._queue.put_nowait(job)
+
+    async def drain(self) -> None:
+        """Send all queued emails and stop the workers."""
+        if not self.is_running:
+            return
+        await self._queue.join()
+        for task in self._tasks:
+            task.cancel()
+        await asyncio.gather(*self._tasks, return_exceptions=True)
+        self._tasks = []
+
+    async def _run(self) -> None:
+        """Send queued emails until cancelled."""
+        while True:
+            job = await self._queue.get()
+            try:
+                await self._process(job)
+            finally:
+                self._queue.task_done()
+
+    async def _process(self, job: SendJob) -> None:
+        """Send one email and record the outcome; failures are logged, not raised."""
+        try:
+            result = await self._email.send(
+                to=job.to,
+                subject=job.rendered.subject,
+                html_content=job.rendered.html,
+                text_content=job.rendered.text,
+                tags=job.tags,
+            )
+        except Exception as e:
+            result = EmailResult(success=False, error_message=str(e))
+
+        if result.success:
+            values = {"status": NotificationStatus.SENT, "sent_at": datetime.utcnow()}
+            if job.description:
+                logger.info(f"{job.description} sent (notification {job.notification_id})")
+        else:
+            values = {"status": NotificationStatus.FAILED, "error_message": result.error_message}
+
+        await self._record(job.notification_id, values)
+
+    async def _record(self, notification_id: int, values: dict) -> None:
+        """Write a send outcome, retrying while the database is busy."""
+        for attempt in range(1, RECORD_ATTEMPTS + 1):
+            try:
+                async with self._session_factory() as session:
+                    result = await session.execute(
+                        update(Notification)
+                        .where(Notification.id == notification_id)
+                        .values(**values)
+                    )
+                if result.rowcount == 0:
+                    logger.warning(f"Notification {notification_id} no longer exists")
+                return
+            except Exception as e:
+                if attempt == RECORD_ATTEMPTS:
+                    logger.error(f"Failed to record notification {notification_id}: {e}")
+                    return
+                await asyncio.sleep(RECORD_RETRY_WAIT * 2 ** (attempt - 1))
@@ -3,11 +3,12 @@ NotificationService for orchestrating email notifications.
 Handles alert evaluation, duplicate prevention, and notification logging.
 """
 
+import asyncio
 import logging
 from dataclasses import dataclass
 from datetime import datetime, timedelta
 
-from sqlalchemy import select
+from sqlalchemy import Subquery, and_, func, select
 from sqlalchemy.ext.asyncio import AsyncSession
 
 from config.settings import settings
@@ -20,13 +21,15 @@ from src.database.models import (
     Product,
     Store,
 )
-from src.notifications.channels.email import EmailChannel
+from src.notifications.channels.email import EmailChannel, EmailResult
+from src.notifications.sender import NotificationSender, SendJob
 from src.notifications.templates import (
     render_back_in_stock,
     render_price_alert,
     render_product_error,
     render_store_flagged,
 )
+from src.notifications.templates.renderer import RenderedEmail
 
 logger = logging.getLogger(__name__)
 
@@ -48,6 +51,18 @@ class NotificationResult:
     success: bool
     notification_id: int | None = None
     error_message: str | None = None
+    # Handed to a background sender; the outcome is recorded on the notification
+    queued: bool = False
+
+
+@dataclass
+class _PendingEmail:
+    """A rendered alert email whose notification record awaits the send result."""
+
+    notification: Notification
+    rendered: RenderedEmail
+    tags: list[dict[str, str]]
+    description: str | None = None  # For logging, e.g. "Price alert"
 
 
 class NotificationService:
@@ -69,6 +84,7 @@ class NotificationService:
         session: AsyncSession,
         email_channel: EmailChannel | None = None,
         user_email: str | None = None,
+        sender: NotificationSender | None = None,
     ) -> None:
         """
         Initialize the notification service.
@@ -77,10 +93,15 @@ class NotificationService:
             session: Database session.
             email_channel: Email channel for sending. Defaults to new EmailChannel.
             user_email: User email address. Defaults to settings.user_email.
+            sender: Background sender. If set, emails are queued when the
+                session commits rather than sent inline, results are marked
+                queued instead of successful, and the sender's own email
+                channel is used.
         """
         self._session = session
         self._email = email_channel or EmailChannel()
         self._user_email = user_email or settings.user_email
+        self._sender = sender
 
     async def evaluate_alert(
         self,
@@ -224,7 +245,7 @@ class NotificationService:
         current_price: float,
     ) -> bool:
         """
-        Check if a notification was recently sent for this alert and price.
+        Check if a notification was recently sent or queued for this alert and price.
 
         Args:
             product_id: Product ID.
@@ -234,29 +255,95 @@ class NotificationService:
         Returns:
             True if this would be a duplicate, False if okay to send.
         """
+        last_prices = await self._last_notified_prices(product_id, [alert_id])
+        return self._is_duplicate(product_id, alert_id, current_price, last_prices)
+
+    async def _last_notified_prices(
+        self,
+        product_id: int,
+        alert_ids: list[int],
+    ) -> dict[int, float | None]:
+        """
+        Get the price in each alert's latest notification, in one query.
+
+        Only notifications within the cooldown period are considered.
+
+        Args:
+            product_id: Product ID.
+            alert_ids: Alert IDs.
+
+        Returns:
+            Mapping of alert ID to last notified price, for alerts notified
+            within the cooldown period.
+        """
+        ranked = self._ranked_recent_notifications(product_id, alert_ids)
+        query = select(ranked.c.alert_id, ranked.c.payload).where(ranked.c.rank == 1)
+
+        result = await self._session.execute(query)
+        return {
+            alert_id: (payload or {}).get("current_price") for alert_id, payload in result.all()
+        }
+
+    def _ranked_recent_notifications(
+        self,
+        product_id: int,
+        alert_ids: list[int] | None = None,
+    ) -> Subquery:
+        """
+        Subquery of a product's notifications within the cooldown period.
+
+        Sent and still pending notifications count, so an email queued for
+        background sending is not repeated. Each row is ranked per alert,
+        newest first, so rank 1 is an alert's latest notification.
+
+        Args:
+            product_id: Product ID.
+            alert_ids: Optional alert IDs to restrict to.
+
+        Returns:
+            Subquery with alert_id, payload, and rank columns.
+        """
         cutoff = datetime.utcnow() - timedelta(hours=self.NOTIFICATION_COOLDOWN_HOURS)
 
-        query = (
-            select(Notification)
-            .where(
-                Notification.product_id == product_id,
-                Notification.alert_id == alert_id,
-                Notification.status == NotificationStatus.SENT,
-                Notification.created_at >= cutoff,
+        query = select(
+            Notification.alert_id,
+            Notification.payload,
+            func.row_number()
+            .over(
+                partition_by=Notification.alert_id,
+                order_by=Notification.created_at.desc(),
             )
-            .order_by(Notification.created_at.desc())
-            .limit(1)
+            .label("rank"),
+        ).where(
+            Notification.product_id == product_id,
+            Notification.status.in_([NotificationStatus.SENT, NotificationStatus.PENDING]),
+            Notification.created_at >= cutoff,
         )
+        if alert_ids is not None:
+            query = query.where(Notification.alert_id.in_(alert_ids))
 
-        result = await self._session.execute(query)
-        last_notification = result.scalar_one_or_none()
+        return query.subquery()
 
-        if not last_notification:
-            return False
+    @staticmethod
+    def _is_duplicate(
+        product_id: int,
+        alert_id: int,
+        current_price: float,
+        last_prices: dict[int, float | None],
+    ) -> bool:
+        """
+        Check a price against an alert's last notified price.
+
+        Args:
+            product_id: Product ID.
+            alert_id: Alert ID.
+            current_price: Current price to compare.
+            last_prices: Result of _last_notified_prices.
 
-        # Check if the price in the last notification is the same
-        payload = last_notification.payload or {}
-        last_price = payload.get("current_price")
+        Returns:
+            True if this would be a duplicate, False if okay to send.
+        """
+        last_price = last_prices.get(alert_id)
 
         if last_price is not None and abs(float(last_price) - current_price) < 0.01:
             logger.info(
@@ -276,6 +363,7 @@ class NotificationService:
         product: Product,
         alert: Alert,
         previous_price: float | None = None,
+        last_prices: dict[int, float | None] | None = None,
     ) -> NotificationResult:
         """
         Send a price alert notification.
@@ -284,10 +372,50 @@ class NotificationService:
             product: The product.
             alert: The triggered alert.
             previous_price: Previous price (for drop calculations).
+            last_prices: Last notified prices already loaded for the
+                product's alerts; queried for this alert if omitted.
+
+        Returns:
+            NotificationResult with success status.
+        """
+        prepared = await self._prepare_price_alert(product, alert, previous_price, last_prices)
+        if isinstance(prepared, NotificationResult):
+            return prepared
+        return await self._send_pending(prepared)
+
+    async def send_back_in_stock(
+        self,
+        product: Product,
+        alert: Alert,
+    ) -> NotificationResult:
+        """
+        Send a back in stock notification.
+
+        Args:
+            product: The product.
+            alert: The triggered alert.
 
         Returns:
             NotificationResult with success status.
         """
+        prepared = await self._prepare_back_in_stock(product, alert)
+        if isinstance(prepared, NotificationResult):
+            return prepared
+        return await self._send_pending(prepared)
+
+    async def _prepare_price_alert(
+        self,
+        product: Product,
+        alert: Alert,
+        previous_price: float | None = None,
+        last_prices: dict[int, float | None] | None = None,
+    ) -> _PendingEmail | NotificationResult:
+        """
+        Render a price alert and record it as pending.
+
+        Returns:
+            _PendingEmail to send, or NotificationResult if nothing is sent.
+        """
         if not self._user_email:
             return NotificationResult(
                 success=False,
@@ -295,7 +423,9 @@ class NotificationService:
             )
 
         # Check for duplicates
-        if await self.check_duplicate(product.id, alert.id, product.current_price):
+        if last_prices is None:
+            last_prices = await self._last_notified_prices(product.id, [alert.id])
+        if self._is_duplicate(product.id, alert.id, product.current_price, last_prices):
             return NotificationResult(
                 success=False,
                 error_message="Duplicate notification prevented",
@@ -323,77 +453,30 @@ class NotificationService:
             alert_type=alert_type_map.get(alert.alert_type, "price_drop"),
         )
 
-        # Create notification record
-        notification = Notification(
-            alert_id=alert.id,
-            product_id=product.id,
-            channel=NotificationChannel.EMAIL,
-            status=NotificationStatus.PENDING,
+        return await self._add_pending(
+            product,
+            alert,
+            rendered,
             payload={
                 "product_name": product.name,
                 "current_price": product.current_price,
                 "previous_price": previous_price,
                 "alert_type": alert.alert_type.value,
             },
+            email_type="price_alert",
+            description="Price alert",
         )
-        self._session.add(notification)
-        await self._session.flush()
-        await self._session.refresh(notification)
 
-        # Send email
-        try:
-            result = await self._email.send(
-                to=self._user_email,
-                subject=rendered.subject,
-                html_content=rendered.html,
-                text_content=rendered.text,
-                tags=[
-                    {"name": "type", "value": "price_alert"},
-                    {"name": "product_id", "value": str(product.id)},
-                ],
-            )
-
-            if result.success:
-                notification.status = NotificationStatus.SENT
-                notification.sent_at = datetime.utcnow()
-                logger.info(f"Price alert sent for product {product.id}")
-            else:
-                notification.status = NotificationStatus.FAILED
-                notification.error_message = result.error_message
-
-            await self._session.flush()
-
-            return NotificationResult(
-                success=result.success,
-                notification_id=notification.id,
-                error_message=result.error_message,
-            )
-
-        except Exception as e:
-            notification.status = NotificationStatus.FAILED
-            notification.error_message = str(e)
-            await self._session.flush()
-
-            return NotificationResult(
-                success=False,
-                notification_id=notification.id,
-                error_message=str(e),
-            )
-
-    async def send_back_in_stock(
+    async def _prepare_back_in_stock(
         self,
         product: Product,
         alert: Alert,
-    ) -> NotificationResult:
+    ) -> _PendingEmail | NotificationResult:
         """
-        Send a back in stock notification.
-
-        Args:
-            product: The product.
-            alert: The triggered alert.
+        Render a back in stock alert and record it as pending.
 
         Returns:
-            NotificationResult with success status.
+            _PendingEmail to send, or NotificationResult if nothing is sent.
         """
         if not self._user_email:
             return NotificationResult(
@@ -414,62 +497,127 @@ class NotificationService:
             image_url=product.image_url,
         )
 
-        # Create notification record
-        notification = Notification(
-            alert_id=alert.id,
-            product_id=product.id,
-            channel=NotificationChannel.EMAIL,
-            status=NotificationStatus.PENDING,
+        return await self._add_pending(
+            product,
+            alert,
+            rendered,
             payload={
                 "product_name": product.name,
                 "current_price": product.current_price,
                 "alert_type": "back_in_stock",
             },
+            email_type="back_in_stock",
+            description="Back in stock alert",
         )
-        self._session.add(notification)
-        await self._session.flush()
-        await self._session.refresh(notification)
 
-        # Send email
-        try:
-            result = await self._email.send(
-                to=self._user_email,
-                subject=rendered.subject,
-                html_content=rendered.html,
-                text_content=rendered.text,
-                tags=[
-                    {"name": "type", "value": "back_in_stock"},
-                    {"name": "product_id", "value": str(product.id)},
-                ],
-            )
+    async def _add_pending(
+        self,
+        product: Product,
+        alert: Alert,
+        rendered: RenderedEmail,
+        payload: dict,
+        email_type: str,
+        description: str,
+    ) -> _PendingEmail:
+        """
+        Add the pending notification record for a rendered alert email.
 
-            if result.success:
-                notification.status = NotificationStatus.SENT
-                notification.sent_at = datetime.utcnow()
-                logger.info(f"Back in stock alert sent for product {product.id}")
-            else:
-                notification.status = NotificationStatus.FAILED
-                notification.error_message = result.error_message
+        The caller flushes, so several records can be inserted together.
+        """
+        notification = Notification(
+            alert_id=alert.id,
+            product_id=product.id,
+            channel=NotificationChannel.EMAIL,
+            status=NotificationStatus.PENDING,
+            payload=payload,
+        )
+        self._session.add(notification)
 
-            await self._session.flush()
+        return _PendingEmail(
+            notification=notification,
+            rendered=rendered,
+            tags=[
+                {"name": "type", "value": email_type},
+                {"name": "product_id", "value": str(product.id)},
+            ],
+            description=description,
+        )
 
-            return NotificationResult(
-                success=result.success,
-                notification_id=notification.id,
-                error_message=result.error_message,
-            )
+    async def _deliver(self, pending: _PendingEmail) -> EmailResult:
+        """Send a pending email. Makes no database calls."""
+        return await self._email.send(
+            to=self._user_email,
+            subject=pending.rendered.subject,
+            html_content=pending.rendered.html,
+            text_content=pending.rendered.text,
+            tags=pending.tags,
+        )
 
-        except Exception as e:
+    def _record_delivery(
+        self,
+        pending: _PendingEmail,
+        outcome: EmailResult | BaseException,
+    ) -> NotificationResult:
+        """Update a pending notification with the result of sending it; the caller flushes."""
+        notification = pending.notification
+
+        if isinstance(outcome, BaseException):
             notification.status = NotificationStatus.FAILED
-            notification.error_message = str(e)
-            await self._session.flush()
+            notification.error_message = str(outcome)
 
             return NotificationResult(
                 success=False,
                 notification_id=notification.id,
-                error_message=str(e),
+                error_message=str(outcome),
             )
 
+        if outcome.success:
+            notification.status = NotificationStatus.SENT
+            notification.sent_at = datetime.utcnow()
+            if pending.description:
+                logger.info(f"{pending.description} sent for product {notification.product_id}")
+        else:
+            notification.status = NotificationStatus.FAILED
+            notification.error_message = outcome.error_message
+
+        return NotificationResult(
+            success=outcome.success,
+            notification_id=notification.id,
+            error_message=outcome.error_message,
+        )
+
+    async def _send_pending(self, pending: _PendingEmail) -> NotificationResult:
+        """Insert a pending email's record, send it and record the result."""
+        await self._session.flush()
+        if self._sender:
+            return self._send_on_commit(pending)
+
+        try:
+            outcome: EmailResult | BaseException = await self._deliver(pending)
+        except Exception as e:
+            outcome = e
+        result = self._record_delivery(pending, outcome)
+        await self._session.flush()
+        return result
+
+    def _send_on_commit(self, pending: _PendingEmail) -> NotificationResult:
+        """Hand a flushed pending email to the background sender on commit."""
+        self._sender.send_on_commit(
+            self._session,
+            SendJob(
+                notification_id=pending.notification.id,
+                to=self._user_email,
+                rendered=pending.rendered,
+                tags=pending.tags,
+                description=pending.description,
+            ),
+        )
+        return NotificationResult(
+            success=False,
+            notification_id=pending.notification.id,
+            queued=True,
+        )
+
     async def send_product_error(
         self,
         product: Product,
@@ -518,47 +666,17 @@ class NotificationService:
             },
         )
         self._session.add(notification)
-        await self._session.flush()
-        await self._session.refresh(notification)
 
-        # Send email
-        try:
-            result = await self._email.send(
-                to=self._user_email,
-                subject=rendered.subject,
-                html_content=rendered.html,
-                text_content=rendered.text,
+        return await self._send_pending(
+            _PendingEmail(
+                notification=notification,
+                rendered=rendered,
                 tags=[
                     {"name": "type", "value": "product_error"},
                     {"name": "product_id", "value": str(product.id)},
                 ],
             )
-
-            if result.success:
-                notification.status = NotificationStatus.SENT
-                notification.sent_at = datetime.utcnow()
-            else:
-                notification.status = NotificationStatus.FAILED
-                notification.error_message = result.error_message
-
-            await self._session.flush()
-
-            return NotificationResult(
-                success=result.success,
-                notification_id=notification.id,
-                error_message=result.error_message,
-            )
-
-        except Exception as e:
-            notification.status = NotificationStatus.FAILED
-            notification.error_message = str(e)
-            await self._session.flush()
-
-            return NotificationResult(
-                success=False,
-                notification_id=notification.id,
-                error_message=str(e),
-            )
+        )
 
     async def send_store_flagged(
         self,
@@ -597,7 +715,7 @@ class NotificationService:
 
         # Create notification record (no product/alert association)
         notification = Notification(
-            product_id=0,  # No specific product
+            product_id=None,  # No specific product
             channel=NotificationChannel.EMAIL,
             status=NotificationStatus.PENDING,
             payload={
@@ -608,47 +726,17 @@ class NotificationService:
             },
         )
         self._session.add(notification)
-        await self._session.flush()
-        await self._session.refresh(notification)
 
-        # Send email
-        try:
-            result = await self._email.send(
-                to=self._user_email,
-                subject=rendered.subject,
-                html_content=rendered.html,
-                text_content=rendered.text,
+        return await self._send_pending(
+            _PendingEmail(
+                notification=notification,
+                rendered=rendered,
                 tags=[
                     {"name": "type", "value": "store_flagged"},
                     {"name": "store", "value": store.domain},
                 ],
             )
-
-            if result.success:
-                notification.status = NotificationStatus.SENT
-                notification.sent_at = datetime.utcnow()
-            else:
-                notification.status = NotificationStatus.FAILED
-                notification.error_message = result.error_message
-
-            await self._session.flush()
-
-            return NotificationResult(
-                success=result.success,
-                notification_id=notification.id,
-                error_message=result.error_message,
-            )
-
-        except Exception as e:
-            notification.status = NotificationStatus.FAILED
-            notification.error_message = str(e)
-            await self._session.flush()
-
-            return NotificationResult(
-                success=False,
-                notification_id=notification.id,
-                error_message=str(e),
-            )
+        )
 
     async def process_price_change(
         self,
@@ -673,15 +761,23 @@ class NotificationService:
         """
         results = []
 
-        # Get active alerts for this product
-        query = select(Alert).where(
-            Alert.product_id == product.id,
-            Alert.is_active.is_(True),
-            Alert.deleted_at.is_(None),
+        # Get active alerts for this product, each with its last notification
+        # in the cooldown period for duplicate checks
+        latest = self._ranked_recent_notifications(product.id)
+        query = (
+            select(Alert, latest.c.payload)
+            .outerjoin(latest, and_(latest.c.alert_id == Alert.id, latest.c.rank == 1))
+            .where(
+                Alert.product_id == product.id,
+                Alert.is_active.is_(True),
+                Alert.deleted_at.is_(None),
+            )
         )
-        alert_result = await self._session.execute(query)
-        alerts = list(alert_result.scalars().all())
+        rows = (await self._session.execute(query)).all()
+        alerts = [alert for alert, _ in rows]
+        last_prices = {alert.id: payload.get("current_price") for alert, payload in rows if payload}
 
+        triggered: list[Alert] = []
         for alert in alerts:
             evaluation = await self.evaluate_alert(
                 alert=alert,
@@ -704,14 +800,44 @@ class NotificationService:
                 # Mark alert as triggered
                 alert.is_triggered = True
                 alert.triggered_at = datetime.utcnow()
-                await self._session.flush()
+                triggered.append(alert)
+
+        if not triggered:
+            return results
+
+        # Render emails and add their records one at a time, as the session
+        # cannot be shared
+        prepared: list[_PendingEmail | NotificationResult] = []
+        for alert in triggered:
+            if alert.alert_type == AlertType.BACK_IN_STOCK:
+                prepared.append(await self._prepare_back_in_stock(product, alert))
+            else:
+                prepared.append(
+                    await self._prepare_price_alert(product, alert, old_price, last_prices)
+                )
 
-                # Send appropriate notification
-                if alert.alert_type == AlertType.BACK_IN_STOCK:
-                    result = await self.send_back_in_stock(product, alert)
+        # One flush writes the triggered alerts and inserts all records
+        await self._session.flush()
+
+        if self._sender:
+            for item in prepared:
+                if isinstance(item, _PendingEmail):
+                    results.append(self._send_on_commit(item))
                 else:
-                    result = await self.send_price_alert(product, alert, old_price)
+                    results.append(item)
+            return results
+
+        # Send the emails concurrently
+        pending = [p for p in prepared if isinstance(p, _PendingEmail)]
+        outcomes = iter(
+            await asyncio.gather(*(self._deliver(p) for p in pending), return_exceptions=True)
+        )
 
-                results.append(result)
+        for item in prepared:
+            if isinstance(item, NotificationResult):
+                results.append(item)
+            else:
+                results.append(self._record_delivery(item, next(outcomes)))
+        await self._session.flush()
 
         return results
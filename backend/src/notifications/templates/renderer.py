@@ -3,6 +3,8 @@ Template rendering utilities for email notifications.
 Uses Jinja2 for HTML template rendering.
 """
 
+import functools
+import re
 from dataclasses import dataclass
 from pathlib import Path
 from typing import Any
@@ -12,10 +14,13 @@ from jinja2 import Environment, FileSystemLoader, select_autoescape
 # Template directory path
 TEMPLATE_DIR = Path(__file__).parent
 
+# Rendered emails kept per render_* function
+RENDER_CACHE_SIZE = 1024
 
-@dataclass
+
+@dataclass(frozen=True)
 class RenderedEmail:
-    """Rendered email content."""
+    """Rendered email content. Immutable, as render_* results are shared."""
 
     subject: str
     html: str
@@ -69,8 +74,6 @@ class TemplateRenderer:
         Returns:
             Plain text version.
         """
-        import re
-
         # Remove style and script tags with content
         text = re.sub(r"<style[^>]*>.*?</style>", "", html, flags=re.DOTALL)
         text = re.sub(r"<script[^>]*>.*?</script>", "", text, flags=re.DOTALL)
@@ -105,7 +108,12 @@ class TemplateRenderer:
 # Singleton instance
 _renderer = TemplateRenderer()
 
+# The render_* functions depend only on their arguments and the static
+# templates, so repeated emails (e.g. several alerts on one price change)
+# reuse the first rendering.
+
 
+@functools.lru_cache(maxsize=RENDER_CACHE_SIZE)
 def render_price_alert(
     product_name: str,
     store_name: str,
@@ -176,6 +184,7 @@ def render_price_alert(
     return RenderedEmail(subject=subject, html=html, text=text)
 
 
+@functools.lru_cache(maxsize=RENDER_CACHE_SIZE)
 def render_back_in_stock(
     product_name: str,
     store_name: str,
@@ -215,6 +224,7 @@ def render_back_in_stock(
     return RenderedEmail(subject=subject, html=html, text=text)
 
 
+@functools.lru_cache(maxsize=RENDER_CACHE_SIZE)
 def render_product_error(
     product_name: str,
     store_name: str,
@@ -257,6 +267,7 @@ def render_product_error(
     return RenderedEmail(subject=subject, html=html, text=text)
 
 
+@functools.lru_cache(maxsize=RENDER_CACHE_SIZE)
 def render_store_flagged(
     store_name: str,
     store_domain: str,
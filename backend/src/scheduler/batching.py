@@ -245,7 +245,6 @@ class BatchProcessor:
             product.in_stock = result.product.in_stock
             product.last_checked_at = now
             product.consecutive_failures = 0
-            product.updated_at = now
 
             # Update name/brand if we got better data
             if result.product.name and not product.name:
@@ -273,7 +272,6 @@ class BatchProcessor:
             # Record failure
             product.consecutive_failures += 1
             product.last_checked_at = now
-            product.updated_at = now
 
             # Update status based on failures
             if product.consecutive_failures >= 3:
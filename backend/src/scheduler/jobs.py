@@ -9,14 +9,27 @@ from datetime import datetime, timedelta
 
 from sqlmodel import select
 
+from src.core.constants import (
+    NOTIFICATION_RETENTION_DAYS,
+    PRICE_HISTORY_RETENTION_DAYS,
+    SCRAPE_LOG_RETENTION_DAYS,
+)
 from src.database.models import (
+    ACTIVE_PRODUCT_WHERE,
     Notification,
+    PriceHistory,
     Product,
     ProductStatus,
     ScrapeLog,
 )
+from src.database.retention import purge
+from src.database.scrape_log_batcher import get_scrape_log_batcher
 from src.database.session import get_session
-from src.healing import get_self_healing_service, get_store_health_calculator
+from src.healing import (
+    get_failure_detector,
+    get_self_healing_service,
+    get_store_health_calculator,
+)
 from src.scraper import get_scraper_engine
 
 from .batching import get_batch_processor
@@ -60,11 +73,7 @@ async def daily_scrape_job() -> dict:
 
     async with get_session() as session:
         # Get all active products
-        stmt = (
-            select(Product)
-            .where(Product.deleted_at.is_(None))
-            .where(Product.status == ProductStatus.ACTIVE)
-        )
+        stmt = select(Product).where(ACTIVE_PRODUCT_WHERE)
         products = list(session.exec(stmt).all())
 
         if not products:
@@ -109,7 +118,7 @@ async def product_scrape_job(product_id: int) -> dict:
     scraper = get_scraper_engine()
 
     async with get_session() as session:
-        product = session.get(Product, product_id)
+        product = await session.get(Product, product_id)
 
         if not product or product.deleted_at is not None:
             logger.warning(f"Product {product_id} not found or deleted")
@@ -122,8 +131,7 @@ async def product_scrape_job(product_id: int) -> dict:
         # Scrape the product
         result = await scraper.scrape(product.url)
 
-        # Log the result
-        scrape_log = ScrapeLog(
+        log = ScrapeLog(
             product_id=product_id,
             success=result.success,
             strategy_used=result.strategy_used,
@@ -131,9 +139,11 @@ async def product_scrape_job(product_id: int) -> dict:
             error_message=result.error_message,
             response_time_ms=result.response_time_ms,
         )
-        session.add(scrape_log)
 
         if result.success and result.product:
+            # Log the result (written in the background with other logs)
+            await get_scrape_log_batcher().emit(log)
+
             # Update product data
             product.current_price = result.product.price
             product.original_price = result.product.original_price
@@ -142,12 +152,15 @@ async def product_scrape_job(product_id: int) -> dict:
             product.consecutive_failures = 0
             session.add(product)
         else:
-            # Record failure
-            product.consecutive_failures += 1
+            # Write the failure with the count, so healing triggered by
+            # this commit already sees it
+            session.add(log)
             product.last_checked_at = datetime.utcnow()
-            session.add(product)
+            await get_failure_detector().record_failure(
+                session, product_id, result.error_type, result.error_message
+            )
 
-        session.commit()
+        await session.commit()
 
         return {
             "status": "completed" if result.success else "failed",
@@ -222,10 +235,11 @@ async def health_calculation_job() -> dict:
     health_calculator = get_store_health_calculator()
 
     async with get_session() as session:
-        updated = health_calculator.update_all_health(session)
+        updated = await session.run_sync(health_calculator.update_all_health)
 
         # Get stores needing attention
-        unhealthy = health_calculator.get_stores_needing_attention(session)
+        report = await health_calculator.calculate_all_health_async(session)
+        unhealthy = [h for h in report.store_health if h.needs_attention]
 
         logger.info(
             f"Health calculation complete: {updated} stores updated, "
@@ -250,6 +264,8 @@ async def healing_job() -> dict:
     Run self-healing cycle for failing products.
 
     Attempts to regenerate selectors for products with consecutive failures.
+    Products are normally healed as soon as they cross the failure threshold;
+    this sweep picks up any the event worker missed.
 
     Returns:
         Healing summary
@@ -281,15 +297,19 @@ async def healing_job() -> dict:
 
 
 async def cleanup_job(
-    scrape_log_days: int = 30,
-    notification_days: int = 90,
+    scrape_log_days: int = SCRAPE_LOG_RETENTION_DAYS,
+    notification_days: int = NOTIFICATION_RETENTION_DAYS,
+    price_history_days: int = PRICE_HISTORY_RETENTION_DAYS,
 ) -> dict:
     """
     Clean up old data per retention policy.
 
+    Rows are deleted in batches (see src.database.retention.purge).
+
     Args:
         scrape_log_days: Days to keep scrape logs (default 30)
         notification_days: Days to keep notifications (default 90)
+        price_history_days: Days to keep price history (default 365)
 
     Returns:
         Cleanup summary
@@ -299,35 +319,33 @@ async def cleanup_job(
     async with get_session() as session:
         now = datetime.utcnow()
 
-        # Delete old scrape logs
-        scrape_cutoff = now - timedelta(days=scrape_log_days)
-        scrape_stmt = select(ScrapeLog).where(ScrapeLog.scraped_at < scrape_cutoff)
-        old_logs = list(session.exec(scrape_stmt).all())
-        for log in old_logs:
-            session.delete(log)
-        scrape_deleted = len(old_logs)
-
-        # Delete old notifications
-        notification_cutoff = now - timedelta(days=notification_days)
-        notification_stmt = select(Notification).where(
-            Notification.created_at < notification_cutoff
+        scrape_deleted = await purge(
+            session, ScrapeLog, ScrapeLog.scraped_at, now - timedelta(days=scrape_log_days)
+        )
+        notification_deleted = await purge(
+            session,
+            Notification,
+            Notification.created_at,
+            now - timedelta(days=notification_days),
+        )
+        price_history_deleted = await purge(
+            session,
+            PriceHistory,
+            PriceHistory.scraped_at,
+            now - timedelta(days=price_history_days),
         )
-        old_notifications = list(session.exec(notification_stmt).all())
-        for notification in old_notifications:
-            session.delete(notification)
-        notification_deleted = len(old_notifications)
-
-        session.commit()
 
         logger.info(
             f"Cleanup complete: {scrape_deleted} scrape logs, "
-            f"{notification_deleted} notifications deleted"
+            f"{notification_deleted} notifications, "
+            f"{price_history_deleted} price history records deleted"
         )
 
         return {
             "status": "completed",
             "scrape_logs_deleted": scrape_deleted,
             "notifications_deleted": notification_deleted,
+            "price_history_deleted": price_history_deleted,
         }
 
 
@@ -365,11 +383,11 @@ def register_default_jobs(scheduler) -> None:
         cron_expression="0 8 * * *",
     )
 
-    # Cleanup weekly on Sunday at midnight
+    # Retention cleanup nightly at midnight
     scheduler.add_job(
         cleanup_job,
         job_id=JOB_CLEANUP,
-        cron_expression="0 0 * * 0",
+        cron_expression="0 0 * * *",
     )
 
     logger.info("Registered default scheduled jobs")
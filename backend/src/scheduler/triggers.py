@@ -314,7 +314,6 @@ def update_schedule_next_run(
 
     schedule.last_run_at = datetime.utcnow()
     schedule.next_run_at = get_next_run_time(schedule.cron_expression)
-    schedule.updated_at = datetime.utcnow()
 
     session.add(schedule)
     session.commit()
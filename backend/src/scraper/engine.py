@@ -4,6 +4,7 @@ Implements waterfall extraction with Crawl4AI.
 """
 
 import asyncio
+import contextlib
 import time
 from dataclasses import dataclass
 from typing import Any
@@ -24,6 +25,7 @@ from src.core.exceptions import (
     NetworkError,
     NotFoundError,
     ParseError,
+    PerpeeError,
     RobotsBlockedError,
     TimeoutError,
 )
@@ -43,6 +45,21 @@ from .strategies import (
 )
 from .user_agent import UserAgentManager, get_user_agent_manager
 
+# Crawl errors meaning the shared browser itself has crashed or disconnected
+_BROWSER_ERROR_MARKERS = (
+    "browser has been closed",
+    "browser closed",
+    "target closed",
+    "connection closed",
+    "has been disconnected",
+)
+
+
+def _is_browser_error(message: str | None) -> bool:
+    """Whether a crawl error message points at a dead browser."""
+    message = (message or "").lower()
+    return any(marker in message for marker in _BROWSER_ERROR_MARKERS)
+
 
 @dataclass
 class ScrapeResult:
@@ -58,6 +75,7 @@ class ScrapeResult:
     error_message: str | None = None
     attempts: int = 1
     status_code: int | None = None
+    raw_html: str | None = None  # Only set when requested with return_raw
 
 
 @dataclass
@@ -120,7 +138,7 @@ class ScraperEngine:
 
         # Retry handler
         self._retry_handler = RetryHandler(
-            RetryConfig(max_retries=3, jitter=0.2)
+            RetryConfig(max_retries=3)
         )
 
         # Configure MemoryAdaptiveDispatcher for batch operations
@@ -133,11 +151,108 @@ class ScraperEngine:
         # Browser semaphore for single-URL operations
         self._browser_semaphore = asyncio.Semaphore(self.config.max_concurrent)
 
+        # Shared browser, started on first use and reused across scrapes
+        self._crawler: AsyncWebCrawler | None = None
+        self._crawler_lock = asyncio.Lock()
+
+    def _browser_config(self) -> BrowserConfig:
+        """Build the headless browser configuration."""
+        return BrowserConfig(
+            headless=True,
+            verbose=False,
+            extra_args=[
+                "--disable-gpu",
+                "--no-sandbox",
+                "--disable-dev-shm-usage",
+            ],
+        )
+
+    async def ensure_crawler(self) -> AsyncWebCrawler:
+        """
+        Get the shared crawler, starting its browser if needed.
+
+        Call before scraping several URLs concurrently so they share one
+        browser launch instead of racing to start their own.
+
+        Returns:
+            Started AsyncWebCrawler
+        """
+        async with self._crawler_lock:
+            if self._crawler is None:
+                crawler = AsyncWebCrawler(config=self._browser_config())
+                await crawler.start()
+                self._crawler = crawler
+            return self._crawler
+
+    async def _reset_crawler(self, crawler: AsyncWebCrawler) -> None:
+        """Discard a dead shared crawler so the next scrape starts a new browser."""
+        async with self._crawler_lock:
+            if self._crawler is not crawler:
+                return  # Already replaced by a concurrent scrape
+            self._crawler = None
+        # The browser is already gone, so closing may fail
+        with contextlib.suppress(Exception):
+            await crawler.close()
+
+    async def _arun(self, url: str, config: CrawlerRunConfig) -> Any:
+        """Crawl one URL, restarting the shared browser once if it has died."""
+        crawler = await self.ensure_crawler()
+        try:
+            result = await crawler.arun(url, config=config)
+        except Exception as e:
+            if not _is_browser_error(str(e)):
+                raise
+        else:
+            if result.success or not _is_browser_error(result.error_message):
+                return result
+
+        await self._reset_crawler(crawler)
+        crawler = await self.ensure_crawler()
+        return await crawler.arun(url, config=config)
+
+    async def _arun_many(self, urls: list[str], config: CrawlerRunConfig) -> list[Any]:
+        """Crawl URLs in a batch, retrying once on a new browser if it died."""
+        crawler = await self.ensure_crawler()
+        try:
+            results = list(
+                await crawler.arun_many(urls, config=config, dispatcher=self._dispatcher)
+            )
+        except Exception as e:
+            if not _is_browser_error(str(e)):
+                raise
+            await self._reset_crawler(crawler)
+            crawler = await self.ensure_crawler()
+            return list(await crawler.arun_many(urls, config=config, dispatcher=self._dispatcher))
+
+        # Re-crawl only the URLs lost to the browser dying mid-batch
+        lost = [
+            i
+            for i, result in enumerate(results)
+            if result and not result.success and _is_browser_error(result.error_message)
+        ]
+        if lost:
+            await self._reset_crawler(crawler)
+            crawler = await self.ensure_crawler()
+            retried = await crawler.arun_many(
+                [urls[i] for i in lost], config=config, dispatcher=self._dispatcher
+            )
+            for i, result in zip(lost, retried, strict=True):
+                results[i] = result
+        return results
+
+    async def close(self) -> None:
+        """Close the shared crawler's browser."""
+        async with self._crawler_lock:
+            if self._crawler is not None:
+                await self._crawler.close()
+                self._crawler = None
+
     async def scrape(
         self,
         url: str,
         validate_ssrf: bool = True,
         use_cache: bool = False,
+        return_raw: bool = False,
     ) -> ScrapeResult:
         """
         Scrape product data from URL.
@@ -146,6 +261,8 @@ class ScraperEngine:
             url: Product page URL
             validate_ssrf: Whether to validate against SSRF
             use_cache: Whether to use cached pages
+            return_raw: Whether to include the page HTML in the result, also
+                when extraction fails
 
         Returns:
             ScrapeResult with extracted data or error
@@ -156,7 +273,7 @@ class ScraperEngine:
         try:
             # Validate URL
             if validate_ssrf:
-                url = resolve_and_validate_url(url)
+                url = await resolve_and_validate_url(url)
             else:
                 url = validate_url(url)
 
@@ -187,9 +304,9 @@ class ScraperEngine:
 
             # Execute scrape with retries
             if self.config.enable_retries:
-                result = await self._scrape_with_retry(url, domain, use_cache)
+                result = await self._scrape_with_retry(url, domain, use_cache, return_raw)
             else:
-                result = await self._do_scrape(url, domain, use_cache)
+                result = await self._do_scrape(url, domain, use_cache, return_raw)
 
             result.response_time_ms = self._elapsed_ms(start_time)
             return result
@@ -203,6 +320,7 @@ class ScraperEngine:
                 error_type=error_type,
                 error_message=str(e),
                 response_time_ms=self._elapsed_ms(start_time),
+                raw_html=self._error_html(e) if return_raw else None,
             )
 
     async def _scrape_with_retry(
@@ -210,11 +328,12 @@ class ScraperEngine:
         url: str,
         domain: str,
         use_cache: bool,
+        return_raw: bool = False,
     ) -> ScrapeResult:
         """Execute scrape with retry logic."""
 
         async def do_scrape():
-            return await self._do_scrape(url, domain, use_cache)
+            return await self._do_scrape(url, domain, use_cache, return_raw)
 
         result = await self._retry_handler.execute(do_scrape, is_async=True)
 
@@ -233,6 +352,7 @@ class ScraperEngine:
             error_type=self._categorize_error(result.error),
             error_message=result.message,
             attempts=result.attempts,
+            raw_html=self._error_html(result.error) if return_raw else None,
         )
 
     async def _do_scrape(
@@ -240,23 +360,13 @@ class ScraperEngine:
         url: str,
         domain: str,
         use_cache: bool,
+        return_raw: bool = False,
     ) -> ScrapeResult:
         """Execute single scrape attempt."""
         async with self._browser_semaphore:
             # Get headers
             headers = self.ua_manager.get_headers(domain)
 
-            # Configure browser
-            browser_config = BrowserConfig(
-                headless=True,
-                verbose=False,
-                extra_args=[
-                    "--disable-gpu",
-                    "--no-sandbox",
-                    "--disable-dev-shm-usage",
-                ],
-            )
-
             # Get store-specific wait selector
             store_config = get_store_config(domain)
             wait_for = None
@@ -274,40 +384,44 @@ class ScraperEngine:
 
             # Execute crawl
             try:
-                async with AsyncWebCrawler(config=browser_config) as crawler:
-                    result = await asyncio.wait_for(
-                        crawler.arun(url, config=crawl_config),
-                        timeout=self.config.operation_timeout,
-                    )
+                result = await asyncio.wait_for(
+                    self._arun(url, crawl_config),
+                    timeout=self.config.operation_timeout,
+                )
 
-                    if not result.success:
-                        raise NetworkError(f"Crawl failed: {result.error_message}")
+                if not result.success:
+                    raise NetworkError(f"Crawl failed: {result.error_message}")
 
-                    # Check for blocks
-                    block_result = detect_block(
-                        result.html,
-                        status_code=result.status_code or 200,
-                    )
+                # Check for blocks
+                block_result = detect_block(
+                    result.html,
+                    status_code=result.status_code or 200,
+                )
 
-                    if block_result.is_blocked:
-                        raise self._block_to_exception(block_result)
+                if block_result.is_blocked:
+                    raise self._block_to_exception(block_result)
 
-                    # Extract product data
-                    product_data = await self._extract(
-                        result.html, domain, url
-                    )
+                # Extract product data
+                product_data = await self._extract(
+                    result.html, domain, url
+                )
 
-                    if product_data and product_data.name and product_data.price:
-                        return ScrapeResult(
-                            success=True,
-                            product=product_data,
-                            url=url,
-                            domain=domain,
-                            strategy_used=product_data.strategy_used,
-                            status_code=result.status_code,
-                        )
+                if product_data and product_data.name and product_data.price:
+                    return ScrapeResult(
+                        success=True,
+                        product=product_data,
+                        url=url,
+                        domain=domain,
+                        strategy_used=product_data.strategy_used,
+                        status_code=result.status_code,
+                        raw_html=result.html if return_raw else None,
+                    )
 
-                    raise ParseError("Failed to extract product data from page")
+                # Keep the page so callers such as self-healing can use it
+                raise ParseError(
+                    "Failed to extract product data from page",
+                    details={"html": result.html},
+                )
 
             except TimeoutError as e:
                 raise TimeoutError(f"Operation timed out after {self.config.operation_timeout}s") from e
@@ -367,6 +481,12 @@ class ScraperEngine:
             BlockedError(f"Blocked: {block_result.details}"),
         )
 
+    def _error_html(self, error: Exception | None) -> str | None:
+        """Get the page HTML attached to a scrape error, if any."""
+        if isinstance(error, PerpeeError):
+            return error.details.get("html")
+        return None
+
     def _categorize_error(self, error: Exception) -> ScrapeErrorType:
         """Map exception to ScrapeErrorType."""
         if isinstance(error, TimeoutError):
@@ -413,17 +533,6 @@ class ScraperEngine:
         if len(urls) <= 2:
             return [await self.scrape(url, validate_ssrf, use_cache) for url in urls]
 
-        # Configure browser for batch operation
-        browser_config = BrowserConfig(
-            headless=True,
-            verbose=False,
-            extra_args=[
-                "--disable-gpu",
-                "--no-sandbox",
-                "--disable-dev-shm-usage",
-            ],
-        )
-
         # Configure crawl for batch
         crawl_config = CrawlerRunConfig(
             cache_mode=CacheMode.ENABLED if use_cache else CacheMode.BYPASS,
@@ -434,77 +543,72 @@ class ScraperEngine:
         results: list[ScrapeResult] = []
 
         # Use dispatcher for batch crawling
-        async with AsyncWebCrawler(config=browser_config) as crawler:
-            crawler_results = await crawler.arun_many(
-                urls,
-                config=crawl_config,
-                dispatcher=self._dispatcher,
-            )
+        crawler_results = await self._arun_many(urls, crawl_config)
+
+        for url, result in zip(urls, crawler_results, strict=True):
+            start_time = time.time()
+            domain = extract_domain(url) if result else ""
+
+            if not result or not result.success:
+                results.append(ScrapeResult(
+                    success=False,
+                    url=url,
+                    domain=domain,
+                    error_type=ScrapeErrorType.NETWORK_ERROR,
+                    error_message=result.error_message if result else "Crawl failed",
+                    response_time_ms=self._elapsed_ms(start_time),
+                ))
+                continue
 
-            for url, result in zip(urls, crawler_results, strict=True):
-                start_time = time.time()
-                domain = extract_domain(url) if result else ""
+            # Check for blocks
+            block_result = detect_block(
+                result.html,
+                status_code=result.status_code or 200,
+            )
 
-                if not result or not result.success:
-                    results.append(ScrapeResult(
-                        success=False,
-                        url=url,
-                        domain=domain,
-                        error_type=ScrapeErrorType.NETWORK_ERROR,
-                        error_message=result.error_message if result else "Crawl failed",
-                        response_time_ms=self._elapsed_ms(start_time),
-                    ))
-                    continue
+            if block_result.is_blocked:
+                results.append(ScrapeResult(
+                    success=False,
+                    url=url,
+                    domain=domain,
+                    error_type=ScrapeErrorType.BLOCKED,
+                    error_message=f"Blocked: {block_result.details}",
+                    response_time_ms=self._elapsed_ms(start_time),
+                ))
+                continue
 
-                # Check for blocks
-                block_result = detect_block(
-                    result.html,
-                    status_code=result.status_code or 200,
-                )
+            # Extract product data
+            try:
+                product_data = await self._extract(result.html, domain, url)
 
-                if block_result.is_blocked:
+                if product_data and product_data.name and product_data.price:
                     results.append(ScrapeResult(
-                        success=False,
+                        success=True,
+                        product=product_data,
                         url=url,
                         domain=domain,
-                        error_type=ScrapeErrorType.BLOCKED,
-                        error_message=f"Blocked: {block_result.details}",
+                        strategy_used=product_data.strategy_used,
+                        status_code=result.status_code,
                         response_time_ms=self._elapsed_ms(start_time),
                     ))
-                    continue
-
-                # Extract product data
-                try:
-                    product_data = await self._extract(result.html, domain, url)
-
-                    if product_data and product_data.name and product_data.price:
-                        results.append(ScrapeResult(
-                            success=True,
-                            product=product_data,
-                            url=url,
-                            domain=domain,
-                            strategy_used=product_data.strategy_used,
-                            status_code=result.status_code,
-                            response_time_ms=self._elapsed_ms(start_time),
-                        ))
-                    else:
-                        results.append(ScrapeResult(
-                            success=False,
-                            url=url,
-                            domain=domain,
-                            error_type=ScrapeErrorType.PARSE_FAILURE,
-                            error_message="Failed to extract product data",
-                            response_time_ms=self._elapsed_ms(start_time),
-                        ))
-                except Exception as e:
+                else:
                     results.append(ScrapeResult(
                         success=False,
                         url=url,
                         domain=domain,
-                        error_type=self._categorize_error(e),
-                        error_message=str(e),
+                        error_type=ScrapeErrorType.PARSE_FAILURE,
+                        error_message="Failed to extract product data",
                         response_time_ms=self._elapsed_ms(start_time),
                     ))
+            except Exception as e:
+                results.append(ScrapeResult(
+                    success=False,
+                    url=url,
+                    domain=domain,
+                    error_type=self._categorize_error(e),
+                    error_message=str(e),
+                    response_time_ms=self._elapsed_ms(start_time),
+                ))
 
         return results
 
@@ -167,29 +167,54 @@ class TokenBucket:
     """
     Token bucket rate limiter for smooth rate limiting.
     Alternative to sliding window for some use cases.
+
+    Refill is computed lazily on each check, so a check is O(1). When the
+    bucket runs dry the time of the next refill is remembered and
+    non-blocking checks before then are rejected without recomputing.
     """
 
-    def __init__(self, rate: float, capacity: int):
+    def __init__(self, rate: float, capacity: int, name: str = "default"):
         """
         Initialize token bucket.
 
         Args:
             rate: Tokens added per second
             capacity: Max tokens in bucket
+            name: Bucket name (for stats/logging)
         """
+        self.name = name
         self.rate = rate
         self.capacity = capacity
-        self.tokens = capacity
-        self.last_update = time.time()
+        self.tokens = float(capacity)
+        self.last_update = time.monotonic()
+        self._empty_until = 0.0
         self._lock = asyncio.Lock()
 
-    def _add_tokens(self) -> None:
+    def _add_tokens(self, now: float) -> None:
         """Add tokens based on elapsed time."""
-        now = time.time()
         elapsed = now - self.last_update
         self.tokens = min(self.capacity, self.tokens + elapsed * self.rate)
         self.last_update = now
 
+    def _take(self, tokens: int, now: float) -> float:
+        """
+        Take tokens if available.
+
+        Returns:
+            0 if tokens were taken, otherwise seconds until they will be
+        """
+        if now < self._empty_until:
+            return self._empty_until - now
+
+        self._add_tokens(now)
+        if self.tokens >= tokens:
+            self.tokens -= tokens
+            return 0.0
+
+        wait_time = (tokens - self.tokens) / self.rate
+        self._empty_until = now + wait_time
+        return wait_time
+
     async def acquire(self, tokens: int = 1) -> None:
         """
         Acquire tokens from the bucket.
@@ -200,13 +225,9 @@ class TokenBucket:
         """
         async with self._lock:
             while True:
-                self._add_tokens()
-                if self.tokens >= tokens:
-                    self.tokens -= tokens
+                wait_time = self._take(tokens, time.monotonic())
+                if wait_time == 0:
                     return
-                # Calculate wait time
-                needed = tokens - self.tokens
-                wait_time = needed / self.rate
                 await asyncio.sleep(wait_time)
 
     def try_acquire(self, tokens: int = 1) -> bool:
@@ -219,11 +240,23 @@ class TokenBucket:
         Returns:
             True if tokens acquired
         """
-        self._add_tokens()
-        if self.tokens >= tokens:
-            self.tokens -= tokens
-            return True
-        return False
+        return self._take(tokens, time.monotonic()) == 0
+
+    def wait_time(self, tokens: int = 1) -> float:
+        """
+        Get seconds until the given number of tokens is available.
+
+        Args:
+            tokens: Number of tokens needed
+
+        Returns:
+            Seconds to wait (0 if available now)
+        """
+        now = time.monotonic()
+        if now < self._empty_until:
+            return self._empty_until - now
+        self._add_tokens(now)
+        return max(0.0, (tokens - self.tokens) / self.rate)
 
 
 # ===========================================
@@ -4,13 +4,13 @@ Implements exponential backoff with configurable retry matrix.
 """
 
 import asyncio
-import random
 from collections.abc import Callable
 from dataclasses import dataclass, field
 from enum import Enum
 from typing import Any, TypeVar
 
-from src.core.constants import MAX_RETRIES, RETRY_DELAYS
+from src.core.backoff import compute_delay, max_attempts
+from src.core.constants import MAX_RETRIES, RETRY_BACKOFF
 from src.core.exceptions import (
     BlockedError,
     NetworkError,
@@ -40,8 +40,9 @@ class RetryConfig:
     """Configuration for retry behavior."""
 
     max_retries: int = MAX_RETRIES
-    delays: dict[str, list[float]] = field(default_factory=lambda: RETRY_DELAYS.copy())
-    jitter: float = 0.2  # Random jitter factor (0.2 = +-20%)
+    backoff: dict[str, tuple[float, float, int]] = field(
+        default_factory=lambda: RETRY_BACKOFF.copy()
+    )
 
     def get_delay(self, category: ErrorCategory, attempt: int) -> float:
         """
@@ -54,12 +55,7 @@ class RetryConfig:
         Returns:
             Delay in seconds with jitter applied
         """
-        delays = self.delays.get(category.value, [2, 4, 8])
-        base_delay = delays[min(attempt, len(delays) - 1)]
-
-        # Apply jitter
-        jitter_range = base_delay * self.jitter
-        return base_delay + random.uniform(-jitter_range, jitter_range)
+        return compute_delay(category.value, attempt, self.backoff)
 
     def should_retry(self, category: ErrorCategory, attempt: int) -> bool:
         """
@@ -76,10 +72,6 @@ class RetryConfig:
         if category == ErrorCategory.NOT_FOUND:
             return False
 
-        # Forbidden gets only 1 retry
-        if category == ErrorCategory.FORBIDDEN:
-            return attempt < 1
-
         # Blocked gets limited retries
         if category == ErrorCategory.BLOCKED:
             return attempt < 2
@@ -88,6 +80,10 @@ class RetryConfig:
         if category == ErrorCategory.PARSE_ERROR:
             return attempt < 2
 
+        limit = max_attempts(category.value, self.backoff)
+        if limit is not None:
+            return attempt < min(limit, self.max_retries)
+
         return attempt < self.max_retries
 
 
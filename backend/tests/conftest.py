@@ -5,13 +5,16 @@ Pytest fixtures for Perpee tests.
 import asyncio
 from collections.abc import AsyncGenerator
 
+import orjson
 import pytest
 from httpx import ASGITransport, AsyncClient
+from sqlalchemy import event
 from sqlalchemy.ext.asyncio import AsyncSession, async_sessionmaker, create_async_engine
 from sqlmodel import SQLModel
 
 from src.api.main import app
 from src.database.models import Alert, AlertType, Product, ProductStatus, Store
+from src.database.session import enable_sqlite_foreign_keys, json_serializer
 
 
 @pytest.fixture(scope="session")
@@ -29,7 +32,10 @@ async def async_engine():
         "sqlite+aiosqlite:///:memory:",
         echo=False,
         future=True,
+        json_serializer=json_serializer,
+        json_deserializer=orjson.loads,
     )
+    event.listen(engine.sync_engine, "connect", enable_sqlite_foreign_keys)
 
     async with engine.begin() as conn:
         await conn.run_sync(SQLModel.metadata.create_all)
@@ -3,19 +3,36 @@ Phase 6 tests - API and Notification verification.
 Tests API endpoints, WebSocket chat, and notification service.
 """
 
+import asyncio
+from contextlib import asynccontextmanager
+from unittest.mock import AsyncMock, MagicMock, patch
+
+import orjson
 import pytest
 from httpx import AsyncClient
+from resend.exceptions import ResendError
+from sqlalchemy import select
+from sqlalchemy.ext.asyncio import async_sessionmaker, create_async_engine
+from sqlmodel import SQLModel
 
 from src.api.schemas import (
     AlertCreate,
     ProductCreate,
     ScheduleCreate,
 )
+from src.core.exceptions import NotificationError
 from src.database.models import (
     Alert,
     AlertType,
+    Notification,
+    NotificationChannel,
+    NotificationStatus,
+    Product,
+    Store,
 )
-from src.notifications.channels.email import EmailChannel
+from src.database.session import json_serializer
+from src.notifications.channels.email import EmailChannel, EmailResult
+from src.notifications.sender import NotificationSender
 from src.notifications.service import NotificationService
 from src.notifications.templates import (
     render_back_in_stock,
@@ -97,6 +114,15 @@ class TestEmailTemplates:
         assert result.html is not None
         assert "35%" in result.html
 
+    def test_render_reuses_identical_emails(self):
+        """Test identical render calls share one cached result."""
+        kwargs = {"product_name": "Cached Product", "store_name": "Store", "current_price": 9.99}
+
+        first = render_price_alert(**kwargs)
+
+        assert render_price_alert(**kwargs) is first
+        assert render_price_alert(**{**kwargs, "current_price": 8.99}) is not first
+
 
 # ===========================================
 # Email Channel Tests
@@ -116,6 +142,138 @@ class TestEmailChannel:
         channel = EmailChannel(api_key="test_key", from_email="test@example.com")
         assert channel.is_configured is True
 
+    @pytest.mark.asyncio
+    async def test_send_batch_uses_batch_endpoint(self):
+        """Test send_batch sends up to 100 emails per batch request."""
+        channel = EmailChannel(api_key="test_key", from_email="test@example.com")
+        emails = [
+            {"to": f"user{i}@example.com", "subject": "Hi", "html_content": "<p>Hi</p>"}
+            for i in range(150)
+        ]
+
+        def batch_send(params_list):
+            return {"data": [{"id": f"id-{p['to'][0]}"} for p in params_list]}
+
+        with patch("resend.Batch.send", side_effect=batch_send) as mock_send:
+            results = await channel.send_batch(emails)
+
+        assert [len(call.args[0]) for call in mock_send.call_args_list] == [100, 50]
+        assert all(r.success for r in results)
+        assert [r.message_id for r in results] == [f"id-{e['to']}" for e in emails]
+
+    @pytest.mark.asyncio
+    async def test_send_runs_on_resend_executor(self):
+        """Test Resend calls run on the dedicated executor, not the default one."""
+        import threading
+
+        channel = EmailChannel(api_key="test_key", from_email="test@example.com")
+        thread_names = []
+
+        def send(params):
+            thread_names.append(threading.current_thread().name)
+            return {"id": "abc"}
+
+        with patch("resend.Emails.send", side_effect=send):
+            await channel.send("user@example.com", "Hi", "<p>Hi</p>")
+
+        assert thread_names[0].startswith("resend")
+
+    @pytest.mark.asyncio
+    async def test_send_retries_server_errors_only(self):
+        """Test send retries transient failures but not client errors."""
+        channel = EmailChannel(api_key="test_key", from_email="test@example.com")
+
+        def error(code):
+            return ResendError(code=code, error_type="error", message="failed", suggested_action="")
+
+        with (
+            patch("resend.Emails.send", side_effect=[error(500), {"id": "abc"}]) as mock_send,
+            patch("asyncio.sleep", new=AsyncMock()),
+        ):
+            result = await channel.send("user@example.com", "Hi", "<p>Hi</p>")
+        assert result.message_id == "abc"
+        assert mock_send.call_count == 2
+
+        with patch("resend.Emails.send", side_effect=error(422)) as mock_send:
+            with pytest.raises(NotificationError):
+                await channel.send("user@example.com", "Hi", "<p>Hi</p>")
+        assert mock_send.call_count == 1
+
+    @pytest.mark.asyncio
+    async def test_send_batch_falls_back_to_concurrent_sends(self):
+        """Test a rejected batch request falls back to concurrent single sends."""
+        channel = EmailChannel(api_key="test_key", from_email="test@example.com")
+        emails = [
+            {"to": f"user{i}@example.com", "subject": "Hi", "html_content": "<p>Hi</p>"}
+            for i in range(20)
+        ]
+        in_flight = 0
+        peak = 0
+
+        async def send(to, **kwargs):
+            nonlocal in_flight, peak
+            in_flight += 1
+            peak = max(peak, in_flight)
+            await asyncio.sleep(0.01)
+            in_flight -= 1
+            return EmailResult(success=True, message_id=f"id-{to}")
+
+        rejected = ResendError(code=422, error_type="error", message="invalid", suggested_action="")
+        channel.send = send
+
+        with patch("resend.Batch.send", side_effect=rejected):
+            results = await channel.send_batch(emails)
+
+        assert peak == 10
+        assert [r.message_id for r in results] == [f"id-{e['to']}" for e in emails]
+
+    @pytest.mark.asyncio
+    async def test_send_batch_does_not_resend_after_unknown_failure(self):
+        """Test a batch that may have been delivered is not sent again."""
+        channel = EmailChannel(api_key="test_key", from_email="test@example.com")
+        emails = [
+            {"to": f"user{i}@example.com", "subject": "Hi", "html_content": "<p>Hi</p>"}
+            for i in range(3)
+        ]
+        channel.send = AsyncMock()
+
+        with (
+            patch("resend.Batch.send", side_effect=TimeoutError("read timed out")),
+            patch("asyncio.sleep", new=AsyncMock()),
+        ):
+            results = await channel.send_batch(emails)
+
+        channel.send.assert_not_awaited()
+        assert [r.success for r in results] == [False, False, False]
+
+    @pytest.mark.asyncio
+    async def test_send_batch_retries_rate_limit_only(self):
+        """Test a batch request is retried on 429 but not on a server error."""
+        channel = EmailChannel(api_key="test_key", from_email="test@example.com")
+        emails = [
+            {"to": f"user{i}@example.com", "subject": "Hi", "html_content": "<p>Hi</p>"}
+            for i in range(2)
+        ]
+
+        def error(code):
+            return ResendError(code=code, error_type="error", message="failed", suggested_action="")
+
+        with (
+            patch("resend.Batch.send", side_effect=[error(429), {"data": []}]) as mock_send,
+            patch("asyncio.sleep", new=AsyncMock()),
+        ):
+            results = await channel.send_batch(emails)
+        assert mock_send.call_count == 2
+        assert all(r.success for r in results)
+
+        with (
+            patch("resend.Batch.send", side_effect=error(500)) as mock_send,
+            patch("asyncio.sleep", new=AsyncMock()),
+        ):
+            results = await channel.send_batch(emails)
+        assert mock_send.call_count == 1
+        assert not any(r.success for r in results)
+
 
 # ===========================================
 # Notification Service Tests
@@ -292,6 +450,198 @@ class TestNotificationService:
         assert result.triggered is False
         assert "out of stock" in result.reason.lower()
 
+    @pytest.mark.asyncio
+    async def test_process_price_change_skips_duplicate_alerts(self, async_session):
+        """Test alerts already notified at this price are not sent again."""
+        store = Store(domain="dup.example.com", name="Dup Store")
+        product = Product(
+            url="https://dup.example.com/p",
+            store_domain=store.domain,
+            name="Product",
+            current_price=90.0,
+        )
+        async_session.add_all([store, product])
+        await async_session.flush()
+        alerts = [
+            Alert(product_id=product.id, alert_type=AlertType.TARGET_PRICE, target_value=100.0)
+            for _ in range(2)
+        ]
+        async_session.add_all(alerts)
+        await async_session.flush()
+        async_session.add(
+            Notification(
+                alert_id=alerts[0].id,
+                product_id=product.id,
+                channel=NotificationChannel.EMAIL,
+                status=NotificationStatus.SENT,
+                payload={"current_price": 90.0},
+            )
+        )
+        await async_session.flush()
+
+        email = MagicMock()
+        email.send = AsyncMock(return_value=EmailResult(success=True, message_id="id"))
+        service = NotificationService(async_session, email, user_email="user@example.com")
+
+        results = await service.process_price_change(
+            product, new_price=90.0, new_stock=True, old_price=110.0, old_stock=True
+        )
+
+        assert [r.success for r in results] == [False, True]
+        assert results[0].error_message == "Duplicate notification prevented"
+        email.send.assert_awaited_once()
+
+    async def test_process_price_change_sends_emails_concurrently(self, async_session):
+        """Test triggered alert emails are sent together, results in alert order."""
+        store = Store(domain="many.example.com", name="Many Store")
+        product = Product(
+            url="https://many.example.com/p",
+            store_domain=store.domain,
+            name="Product",
+            current_price=90.0,
+        )
+        async_session.add_all([store, product])
+        await async_session.flush()
+        async_session.add_all(
+            [
+                Alert(product_id=product.id, alert_type=AlertType.TARGET_PRICE, target_value=100.0)
+                for _ in range(3)
+            ]
+        )
+        await async_session.flush()
+
+        in_flight = 0
+        peak = 0
+        calls = 0
+
+        async def send(**kwargs):
+            nonlocal in_flight, peak, calls
+            calls += 1
+            failed = calls == 2
+            in_flight += 1
+            peak = max(peak, in_flight)
+            await asyncio.sleep(0.01)
+            in_flight -= 1
+            if failed:
+                return EmailResult(success=False, error_message="rejected")
+            return EmailResult(success=True, message_id="id")
+
+        email = MagicMock()
+        email.send = send
+        service = NotificationService(async_session, email, user_email="user@example.com")
+
+        results = await service.process_price_change(
+            product, new_price=90.0, new_stock=True, old_price=110.0, old_stock=True
+        )
+
+        assert peak == 3
+        assert [r.success for r in results] == [True, False, True]
+        notifications = [await async_session.get(Notification, r.notification_id) for r in results]
+        assert [n.status for n in notifications] == [
+            NotificationStatus.SENT,
+            NotificationStatus.FAILED,
+            NotificationStatus.SENT,
+        ]
+
+    async def test_send_store_flagged_has_no_product(self, async_session, sample_store):
+        """Test a store warning is recorded without a product while FKs are enforced."""
+        email = MagicMock()
+        email.send = AsyncMock(return_value=EmailResult(success=True, message_id="id"))
+        service = NotificationService(async_session, email, user_email="user@example.com")
+
+        result = await service.send_store_flagged(
+            sample_store, products_affected=3, failed_scrapes=5, failure_reason="Selectors broke"
+        )
+
+        assert result.success
+        notification = await async_session.get(Notification, result.notification_id)
+        assert notification.product_id is None
+        assert notification.status == NotificationStatus.SENT
+
+    async def test_process_price_change_queues_emails_after_commit(self, tmp_path):
+        """Test queued emails are sent only for committed notifications."""
+        engine = create_async_engine(
+            f"sqlite+aiosqlite:///{tmp_path / 'queue.db'}",
+            json_serializer=json_serializer,
+            json_deserializer=orjson.loads,
+        )
+        async with engine.begin() as conn:
+            await conn.run_sync(SQLModel.metadata.create_all)
+        try:
+            session_factory = async_sessionmaker(engine, expire_on_commit=False)
+
+            @asynccontextmanager
+            async def worker_session():
+                async with session_factory() as session:
+                    yield session
+                    await session.commit()
+
+            release = asyncio.Event()
+            sent = []
+
+            async def send(**kwargs):
+                await release.wait()
+                sent.append(kwargs["subject"])
+                return EmailResult(success=True, message_id="id")
+
+            email = MagicMock()
+            email.send = send
+            sender = NotificationSender(email, workers=2, session_factory=worker_session)
+
+            async with session_factory() as session:
+                store = Store(domain="queue.example.com", name="Queue Store")
+                product = Product(
+                    url="https://queue.example.com/p",
+                    store_domain=store.domain,
+                    name="Product",
+                    current_price=90.0,
+                )
+                session.add_all([store, product])
+                await session.flush()
+                session.add(
+                    Alert(
+                        product_id=product.id, alert_type=AlertType.TARGET_PRICE, target_value=100.0
+                    )
+                )
+                await session.commit()
+
+                service = NotificationService(
+                    session, MagicMock(), user_email="user@example.com", sender=sender
+                )
+                change = {
+                    "new_price": 90.0,
+                    "new_stock": True,
+                    "old_price": 110.0,
+                    "old_stock": True,
+                }
+
+                # Rolled back notifications are never sent
+                await service.process_price_change(product, **change)
+                await session.rollback()
+                assert not sender.is_running
+                await session.refresh(product)
+
+                results = await service.process_price_change(product, **change)
+                assert [(r.success, r.queued) for r in results] == [(False, True)]
+                assert not sender.is_running
+                await session.commit()
+                assert sender.is_running
+
+                # A queued email blocks a repeat within the cooldown
+                repeat = await service.process_price_change(product, **change)
+                assert repeat[0].error_message == "Duplicate notification prevented"
+                await session.commit()
+
+            release.set()
+            await sender.drain()
+
+            assert len(sent) == 1
+            async with session_factory() as session:
+                statuses = (await session.execute(select(Notification.status))).scalars().all()
+            assert statuses == [NotificationStatus.SENT]
+        finally:
+            await engine.dispose()
+
 
 # ===========================================
 # API Schema Tests
@@ -422,6 +772,19 @@ class TestProductEndpoints:
         response = await test_client.get("/api/products/99999")
         assert response.status_code == 404
 
+    @pytest.mark.asyncio
+    async def test_refresh_product_runs_in_background(
+        self, test_client: AsyncClient, sample_product
+    ):
+        """Test that refreshing an unchecked product queues a background scrape."""
+        scrape = AsyncMock(return_value={"success": True})
+        with patch("src.api.routes.products.product_scrape_job", scrape):
+            response = await test_client.post(f"/api/products/{sample_product.id}/refresh")
+
+        assert response.status_code == 200
+        assert response.json()["message"] == f"Refresh queued for product {sample_product.id}"
+        scrape.assert_awaited_once_with(sample_product.id)
+
     @pytest.mark.asyncio
     async def test_create_product(self, test_client: AsyncClient, sample_store):
         """Test creating a product."""
@@ -454,6 +817,23 @@ class TestProductEndpoints:
         response = await test_client.get(f"/api/products/{sample_product.id}")
         assert response.status_code == 404
 
+    @pytest.mark.asyncio
+    async def test_update_product(self, test_client: AsyncClient, sample_product):
+        """Test updating a product, and that a deleted product cannot be updated."""
+        response = await test_client.patch(
+            f"/api/products/{sample_product.id}",
+            json={"name": "Renamed"},
+        )
+        assert response.status_code == 200
+        assert response.json()["name"] == "Renamed"
+
+        await test_client.delete(f"/api/products/{sample_product.id}")
+        response = await test_client.patch(
+            f"/api/products/{sample_product.id}",
+            json={"name": "Deleted"},
+        )
+        assert response.status_code == 404
+
     @pytest.mark.asyncio
     async def test_get_product_stats(self, test_client: AsyncClient, sample_product):
         """Test product statistics endpoint."""
@@ -610,7 +990,7 @@ class TestChatSchemas:
         """Test welcome message creation."""
         from src.api.schemas import create_welcome_message
 
-        msg = create_welcome_message("session-123")
+        msg = orjson.loads(create_welcome_message("session-123"))
         assert msg["type"] == "welcome"
         assert msg["data"]["session_id"] == "session-123"
 
@@ -618,7 +998,7 @@ class TestChatSchemas:
         """Test response message creation."""
         from src.api.schemas import create_response_message
 
-        msg = create_response_message("Hello, world!")
+        msg = orjson.loads(create_response_message("Hello, world!"))
         assert msg["type"] == "response"
         assert msg["data"]["content"] == "Hello, world!"
 
@@ -626,7 +1006,7 @@ class TestChatSchemas:
         """Test error message creation."""
         from src.api.schemas import create_error_message
 
-        msg = create_error_message("Something went wrong", "ERR001")
+        msg = orjson.loads(create_error_message("Something went wrong", "ERR001"))
         assert msg["type"] == "error"
         assert msg["data"]["message"] == "Something went wrong"
         assert msg["data"]["code"] == "ERR001"
@@ -635,5 +1015,5 @@ class TestChatSchemas:
         """Test thinking message creation."""
         from src.api.schemas import create_thinking_message
 
-        msg = create_thinking_message()
+        msg = orjson.loads(create_thinking_message())
         assert msg["type"] == "thinking"
@@ -2,10 +2,13 @@
 Tests for the self-healing module.
 """
 
-from unittest.mock import MagicMock, patch
+import asyncio
+import json
+from datetime import datetime, timedelta
+from unittest.mock import AsyncMock, MagicMock, patch
 
 import pytest
-from sqlmodel import Session, create_engine
+from sqlmodel import Session, create_engine, text
 from sqlmodel.pool import StaticPool
 
 from src.database.models import (
@@ -16,9 +19,11 @@ from src.database.models import (
     SQLModel,
     Store,
 )
+from src.database.retention import purge
 from src.healing.detector import (
     DEFAULT_FAILURE_THRESHOLD,
     HEALABLE_CATEGORIES,
+    FailureAnalysis,
     FailureCategory,
     FailureDetector,
     get_failure_detector,
@@ -28,6 +33,7 @@ from src.healing.health import (
     get_store_health_calculator,
 )
 from src.healing.regenerator import (
+    MAX_BATCH_SIZE,
     RegenerationResult,
     SelectorConfig,
     SelectorRegenerator,
@@ -98,19 +104,51 @@ def sample_product(test_session, sample_store):
 
 
 @pytest.fixture
-def failing_product(test_session, sample_store):
-    """Create failing product for testing."""
+async def async_sample_store(async_session):
+    """Create sample store in the async test session."""
+    store = Store(
+        domain="test.example.com",
+        name="Test Store",
+        is_whitelisted=True,
+        is_active=True,
+        rate_limit_rpm=10,
+        success_rate=1.0,
+        selectors={"price": {"css": [".price"]}},
+    )
+    async_session.add(store)
+    await async_session.flush()
+    return store
+
+
+@pytest.fixture
+async def async_sample_product(async_session, async_sample_store):
+    """Create sample product in the async test session."""
+    product = Product(
+        url="https://test.example.com/product/1",
+        store_domain=async_sample_store.domain,
+        name="Test Product",
+        current_price=99.99,
+        status=ProductStatus.ACTIVE,
+        consecutive_failures=0,
+    )
+    async_session.add(product)
+    await async_session.flush()
+    return product
+
+
+@pytest.fixture
+async def async_failing_product(async_session, async_sample_store):
+    """Create failing product in the async test session."""
     product = Product(
         url="https://test.example.com/product/2",
-        store_domain=sample_store.domain,
+        store_domain=async_sample_store.domain,
         name="Failing Product",
         current_price=49.99,
         status=ProductStatus.ERROR,
         consecutive_failures=5,
     )
-    test_session.add(product)
-    test_session.commit()
-    test_session.refresh(product)
+    async_session.add(product)
+    await async_session.flush()
     return product
 
 
@@ -179,90 +217,217 @@ class TestFailureDetector:
         assert FailureCategory.PRICE_VALIDATION in HEALABLE_CATEGORIES
         assert FailureCategory.BLOCKED not in HEALABLE_CATEGORIES
 
-    def test_analyze_product_not_found(self, test_session):
+    async def test_analyze_product_not_found(self, async_session):
         """Test analyze_product with non-existent product."""
         detector = FailureDetector()
-        result = detector.analyze_product(test_session, 99999)
+        result = await detector.analyze_product(async_session, 99999)
         assert result is None
 
-    def test_analyze_product_healthy(self, test_session, sample_product):
+    async def test_analyze_product_healthy(self, async_session, async_sample_product):
         """Test analyze_product with healthy product."""
         detector = FailureDetector()
-        result = detector.analyze_product(test_session, sample_product.id)
+        result = await detector.analyze_product(async_session, async_sample_product.id)
 
         assert result is not None
-        assert result.product_id == sample_product.id
+        assert result.product_id == async_sample_product.id
         assert result.consecutive_failures == 0
         assert not result.needs_healing
         assert not result.needs_attention
 
-    def test_analyze_product_failing(self, test_session, failing_product):
+    async def test_analyze_product_failing(self, async_session, async_failing_product):
         """Test analyze_product with failing product."""
         # Add a scrape log with parse failure
         log = ScrapeLog(
-            product_id=failing_product.id,
+            product_id=async_failing_product.id,
             success=False,
             error_type=ScrapeErrorType.PARSE_FAILURE,
             error_message="Failed to extract price",
         )
-        test_session.add(log)
-        test_session.commit()
+        async_session.add(log)
+        await async_session.flush()
 
         detector = FailureDetector()
-        result = detector.analyze_product(test_session, failing_product.id)
+        result = await detector.analyze_product(async_session, async_failing_product.id)
 
         assert result is not None
-        assert result.product_id == failing_product.id
+        assert result.product_id == async_failing_product.id
         assert result.consecutive_failures == 5
         assert result.category == FailureCategory.PARSE_FAILURE
         assert result.needs_healing  # Above threshold and healable
 
-    def test_record_failure_increments_count(self, test_session, sample_product):
+    async def test_record_failure_increments_count(self, async_session, async_sample_product):
         """Test that record_failure increments consecutive failures."""
         detector = FailureDetector()
 
-        initial_failures = sample_product.consecutive_failures
-        new_count = detector.record_failure(
-            test_session,
-            sample_product.id,
+        initial_failures = async_sample_product.consecutive_failures
+        new_count = await detector.record_failure(
+            async_session,
+            async_sample_product.id,
             ScrapeErrorType.PARSE_FAILURE,
         )
 
         assert new_count == initial_failures + 1
 
         # Refresh product to check update
-        test_session.refresh(sample_product)
-        assert sample_product.consecutive_failures == new_count
+        await async_session.refresh(async_sample_product)
+        assert async_sample_product.consecutive_failures == new_count
 
-    def test_record_success_resets_count(self, test_session, failing_product):
+    async def test_record_failure_queues_healing_on_commit(
+        self, async_session, async_sample_product
+    ):
+        """Test that reaching the threshold queues the product once committed."""
+        detector = FailureDetector(failure_threshold=2)
+        detector.publish_events = True
+
+        for _ in range(2):
+            await detector.record_failure(
+                async_session, async_sample_product.id, ScrapeErrorType.PARSE_FAILURE
+            )
+        assert detector.healing_queue.empty()
+
+        await async_session.commit()
+        assert detector.healing_queue.get_nowait() == async_sample_product.id
+
+        # Further failures do not queue it again
+        await detector.record_failure(
+            async_session, async_sample_product.id, ScrapeErrorType.PARSE_FAILURE
+        )
+        await async_session.commit()
+        assert detector.healing_queue.empty()
+
+    async def test_record_failure_not_queued_on_rollback(self, async_session, async_sample_product):
+        """Test that rolled back or non-healable failures are not queued."""
+        detector = FailureDetector(failure_threshold=1)
+        detector.publish_events = True
+
+        await detector.record_failure(
+            async_session, async_sample_product.id, ScrapeErrorType.PARSE_FAILURE
+        )
+        await async_session.rollback()
+        await async_session.commit()
+        assert detector.healing_queue.empty()
+
+        await detector.record_failure(
+            async_session, async_sample_product.id, ScrapeErrorType.NETWORK_ERROR
+        )
+        await async_session.commit()
+        assert detector.healing_queue.empty()
+
+    async def test_record_failure_not_queued_without_worker(
+        self, async_session, async_sample_product
+    ):
+        """Test that failures are only queued while a worker consumes them."""
+        detector = FailureDetector(failure_threshold=1)
+
+        await detector.record_failure(
+            async_session, async_sample_product.id, ScrapeErrorType.PARSE_FAILURE
+        )
+        await async_session.commit()
+        assert detector.healing_queue.empty()
+
+    async def test_full_healing_queue_drops_events(self, async_session, async_sample_product):
+        """Test that a full healing queue leaves products to the sweep."""
+        detector = FailureDetector(failure_threshold=1)
+        detector.publish_events = True
+        for product_id in range(detector.healing_queue.maxsize):
+            detector.healing_queue.put_nowait(product_id)
+
+        await detector.record_failure(
+            async_session, async_sample_product.id, ScrapeErrorType.PARSE_FAILURE
+        )
+        await async_session.commit()
+        assert detector.healing_queue.full()
+
+    async def test_record_success_resets_count(self, async_session, async_failing_product):
         """Test that record_success resets consecutive failures."""
         detector = FailureDetector()
 
-        assert failing_product.consecutive_failures > 0
+        assert async_failing_product.consecutive_failures > 0
+
+        await detector.record_success(async_session, async_failing_product.id)
+
+        await async_session.refresh(async_failing_product)
+        assert async_failing_product.consecutive_failures == 0
+        assert async_failing_product.status == ProductStatus.ACTIVE
+
+    async def test_record_success_bulk_resets_counts(
+        self, async_session, async_failing_product, async_sample_store
+    ):
+        """Test that record_success_bulk resets failures only for error states."""
+        detector = FailureDetector()
+        paused = Product(
+            url="https://test.example.com/paused",
+            store_domain=async_sample_store.domain,
+            name="Paused Product",
+            status=ProductStatus.PAUSED,
+            consecutive_failures=2,
+        )
+        async_session.add(paused)
+        await async_session.flush()
+
+        await detector.record_success_bulk(async_session, [async_failing_product.id, paused.id])
 
-        detector.record_success(test_session, failing_product.id)
+        await async_session.refresh(async_failing_product)
+        await async_session.refresh(paused)
+        assert async_failing_product.consecutive_failures == 0
+        assert async_failing_product.status == ProductStatus.ACTIVE
+        assert paused.consecutive_failures == 0
+        assert paused.status == ProductStatus.PAUSED
 
-        test_session.refresh(failing_product)
-        assert failing_product.consecutive_failures == 0
-        assert failing_product.status == ProductStatus.ACTIVE
+    async def test_has_any_needing_healing(
+        self, async_session, async_sample_product, async_failing_product
+    ):
+        """Test has_any_needing_healing finds products at the failure threshold."""
+        detector = FailureDetector()
 
-    def test_get_products_needing_healing(self, test_session, failing_product):
+        assert await detector.has_any_needing_healing(async_session)
+        assert await detector.has_any_needing_healing(async_session, "test.example.com")
+        assert not await detector.has_any_needing_healing(async_session, "other.example.com")
+
+        async_failing_product.consecutive_failures = 0
+        await async_session.flush()
+        assert not await detector.has_any_needing_healing(async_session)
+
+    async def test_get_products_needing_healing(self, async_session, async_failing_product):
         """Test get_products_needing_healing returns failing products."""
         # Add scrape log with healable error
         log = ScrapeLog(
-            product_id=failing_product.id,
+            product_id=async_failing_product.id,
             success=False,
             error_type=ScrapeErrorType.PARSE_FAILURE,
         )
-        test_session.add(log)
-        test_session.commit()
+        async_session.add(log)
+        await async_session.flush()
 
         detector = FailureDetector()
-        results = detector.get_products_needing_healing(test_session)
+        results = await detector.get_products_needing_healing(async_session)
 
         assert len(results) >= 1
         product_ids = [r.product_id for r in results]
-        assert failing_product.id in product_ids
+        assert async_failing_product.id in product_ids
+
+    async def test_get_products_needing_healing_uses_latest_failure(
+        self, async_session, async_failing_product
+    ):
+        """Test that only the most recent failure decides healability."""
+        for error_type, scraped_at in (
+            (ScrapeErrorType.PARSE_FAILURE, datetime(2026, 1, 1)),
+            (ScrapeErrorType.NOT_FOUND, datetime(2026, 1, 2)),
+        ):
+            async_session.add(
+                ScrapeLog(
+                    product_id=async_failing_product.id,
+                    success=False,
+                    error_type=error_type,
+                    scraped_at=scraped_at,
+                )
+            )
+        await async_session.flush()
+
+        detector = FailureDetector()
+        results = await detector.get_products_needing_healing(async_session)
+
+        assert results == []
 
     def test_get_failure_detector_singleton(self):
         """Test get_failure_detector returns singleton."""
@@ -365,6 +530,14 @@ class TestSelectorRegenerator:
 
         assert len(result) <= 50000
 
+    def test_truncate_html_product_marker(self, mock_regenerator):
+        """Test _truncate_html keeps the section around a product marker."""
+        long_html = "x" * 30000 + '<DIV Class="Product-card">' + "y" * 60000
+        result = mock_regenerator._truncate_html(long_html, max_chars=50000)
+
+        idx = long_html.index("Class=")
+        assert result == long_html[idx - 1000 : idx + 49000]
+
     def test_parse_response_valid_json(self, mock_regenerator):
         """Test _parse_response with valid JSON."""
         response = '{"selectors": {"price": {"css": [".price"]}}, "confidence": 0.9}'
@@ -386,6 +559,13 @@ More text'''
         assert result is not None
         assert "selectors" in result
 
+    def test_parse_response_trailing_text(self, mock_regenerator):
+        """Test _parse_response ignores text around an unfenced JSON object."""
+        response = 'Here you go: {"selectors": {}, "confidence": 0.8} Let me know!'
+        result = mock_regenerator._parse_response(response)
+
+        assert result == {"selectors": {}, "confidence": 0.8}
+
     def test_parse_response_invalid(self, mock_regenerator):
         """Test _parse_response with invalid JSON."""
         response = "Not JSON at all"
@@ -393,6 +573,56 @@ More text'''
 
         assert result is None
 
+    @pytest.mark.asyncio
+    async def test_regenerate_many_single_call(self, mock_regenerator):
+        """Test regenerate_many sends one prompt and fans results out per domain."""
+        response = {
+            "results": {
+                "a.com": {"selectors": {"price": {"css": [".price"]}}, "confidence": 0.9},
+                "b.com": {"selectors": {"price": {"css": [".p"]}}, "confidence": 0.3},
+            }
+        }
+        mock_regenerator._agent.run = AsyncMock(
+            return_value=MagicMock(data=f"```json\n{json.dumps(response)}\n```")
+        )
+
+        results = await mock_regenerator.regenerate_many(
+            [
+                ("a.com", "<html>a</html>", None),
+                ("b.com", "<html>b</html>", {"price": {"css": [".old"]}}),
+                ("c.com", "<html>c</html>", None),
+            ]
+        )
+
+        mock_regenerator._agent.run.assert_awaited_once()
+        prompt = mock_regenerator._agent.run.await_args.args[0]
+        for domain in ("a.com", "b.com", "c.com"):
+            assert f"<!-- DOMAIN: {domain} -->" in prompt
+
+        assert [r.domain for r in results] == ["a.com", "b.com", "c.com"]
+        assert results[0].success
+        assert results[0].selectors == {"price": {"css": [".price"]}}
+        assert not results[1].success
+        assert results[1].error == "Low confidence: 0.30"
+        assert not results[2].success
+
+    @pytest.mark.asyncio
+    async def test_regenerate_many_llm_error(self, mock_regenerator):
+        """Test regenerate_many reports an LLM failure for every domain."""
+        mock_regenerator._agent.run = AsyncMock(side_effect=RuntimeError("boom"))
+
+        results = await mock_regenerator.regenerate_many(
+            [
+                ("a.com", "<html>a</html>", None),
+                ("b.com", "<html>b</html>", None),
+            ]
+        )
+
+        assert [(r.domain, r.success, r.error) for r in results] == [
+            ("a.com", False, "boom"),
+            ("b.com", False, "boom"),
+        ]
+
     def test_regeneration_result_dataclass(self):
         """Test RegenerationResult dataclass."""
         result = RegenerationResult(
@@ -461,6 +691,81 @@ class TestStoreHealthCalculator:
         assert health.success_rate == 0.0
         assert not health.is_healthy
 
+    def test_calculate_store_health_mixed_scrapes(self, test_session, sample_store, sample_product):
+        """Test total and successful scrape counts with mixed results."""
+        for i in range(10):
+            test_session.add(ScrapeLog(product_id=sample_product.id, success=i < 6))
+        test_session.commit()
+
+        calculator = StoreHealthCalculator()
+        health = calculator.calculate_store_health(test_session, sample_store.domain)
+
+        assert health.total_scrapes == 10
+        assert health.successful_scrapes == 6
+        assert health.success_rate == 0.6
+
+    def test_scrape_stats_use_covering_index(self, test_session):
+        """Test that scrape stats are read from the covering index alone."""
+        plan = test_session.exec(
+            text(
+                "EXPLAIN QUERY PLAN "
+                "SELECT count(scrape_logs.id), sum(CASE WHEN success THEN 1 ELSE 0 END) "
+                "FROM scrape_logs JOIN products ON products.id = scrape_logs.product_id "
+                "WHERE products.store_domain = 'test.example.com' "
+                "AND products.deleted_at IS NULL AND scrape_logs.scraped_at >= '2020-01-01'"
+            )
+        ).all()
+
+        assert "COVERING INDEX ix_scrape_logs_product_scraped_success" in " ".join(
+            str(row[-1]) for row in plan
+        )
+
+    def test_calculate_store_health_product_counts(
+        self, test_session, sample_store, sample_product
+    ):
+        """Test total, active, and failing product counts."""
+        for i, status in enumerate([ProductStatus.ERROR, ProductStatus.NEEDS_ATTENTION]):
+            test_session.add(
+                Product(
+                    url=f"https://test.example.com/product/failing-{i}",
+                    store_domain=sample_store.domain,
+                    name="Failing Product",
+                    status=status,
+                )
+            )
+        test_session.add(
+            Product(
+                url="https://test.example.com/product/deleted",
+                store_domain=sample_store.domain,
+                name="Deleted Product",
+                status=ProductStatus.ERROR,
+                deleted_at=datetime.utcnow(),
+            )
+        )
+        test_session.commit()
+
+        calculator = StoreHealthCalculator()
+        health = calculator.calculate_store_health(test_session, sample_store.domain)
+
+        assert health.total_products == 3
+        assert health.active_products == 1
+        assert health.failing_products == 2
+
+    def test_calculate_store_health_no_products(self, test_session, sample_store):
+        """Test a store without products is healthy and skips the scrape query."""
+        calculator = StoreHealthCalculator(min_scrapes=0)
+        with patch.object(calculator, "_calculate_scrape_stats") as scrape_stats:
+            health = calculator.calculate_store_health(test_session, sample_store.domain)
+
+        scrape_stats.assert_not_called()
+        assert health.total_products == 0
+        assert health.active_products == 0
+        assert health.failing_products == 0
+        assert health.total_scrapes == 0
+        assert health.success_rate == 1.0
+        assert health.is_healthy
+        assert not health.needs_attention
+
     def test_calculate_all_health(self, test_session, sample_store, sample_product):
         """Test calculate_all_health."""
         calculator = StoreHealthCalculator()
@@ -470,6 +775,88 @@ class TestStoreHealthCalculator:
         assert report.total_stores >= 1
         assert len(report.store_health) >= 1
 
+    def test_calculate_all_health_per_store(self, test_session, sample_store, sample_product):
+        """Test that grouped counts match each store's own health."""
+        other = Store(domain="other.example.com", name="Other Store", is_active=True)
+        test_session.add(other)
+        failing = Product(
+            url="https://other.example.com/product/1",
+            store_domain=other.domain,
+            name="Other Product",
+            status=ProductStatus.ERROR,
+        )
+        test_session.add(failing)
+        test_session.commit()
+        for i in range(6):
+            test_session.add(ScrapeLog(product_id=sample_product.id, success=True))
+            test_session.add(ScrapeLog(product_id=failing.id, success=i == 0))
+        test_session.commit()
+
+        calculator = StoreHealthCalculator()
+        report = calculator.calculate_all_health(test_session)
+
+        by_domain = {h.domain: h for h in report.store_health}
+        for domain in (sample_store.domain, other.domain):
+            assert by_domain[domain] == calculator.calculate_store_health(test_session, domain)
+        assert by_domain[other.domain].failing_products == 1
+        assert by_domain[other.domain].successful_scrapes == 1
+        assert not by_domain[other.domain].is_healthy
+        assert report.overall_success_rate == 7 / 12
+
+    def test_calculate_all_health_cached(self, test_session, sample_store, sample_product):
+        """Test that the report is reused until a scrape, product, or store changes."""
+        calculator = StoreHealthCalculator()
+
+        report = calculator.calculate_all_health(test_session)
+        cached = calculator.calculate_all_health(test_session)
+        assert cached.calculated_at == report.calculated_at
+        other = calculator.calculate_all_health(test_session, active_only=False)
+        assert other.calculated_at != report.calculated_at
+
+        # Callers get their own copy
+        cached.store_health[0].total_scrapes = 99
+        assert calculator.calculate_all_health(test_session).store_health[0].total_scrapes == 0
+
+        test_session.add(ScrapeLog(product_id=sample_product.id, success=True))
+        test_session.commit()
+        assert calculator.calculate_all_health(test_session).store_health[0].total_scrapes == 1
+
+        sample_product.status = ProductStatus.ERROR
+        test_session.commit()
+        assert calculator.calculate_all_health(test_session).store_health[0].failing_products == 1
+
+    def test_calculate_all_health_cache_expires(self, test_session, sample_store):
+        """Test that a cached report is recalculated once cache_ttl has passed."""
+        calculator = StoreHealthCalculator(cache_ttl=0)
+
+        report = calculator.calculate_all_health(test_session)
+
+        assert calculator.calculate_all_health(test_session).calculated_at > report.calculated_at
+
+    async def test_calculate_all_health_after_purge(self, async_session, async_sample_product):
+        """Test that purged scrape logs are not counted from a cached report."""
+        now = datetime.utcnow()
+        async_session.add_all(
+            [
+                ScrapeLog(
+                    product_id=async_sample_product.id,
+                    success=True,
+                    scraped_at=now - timedelta(hours=2),
+                ),
+                ScrapeLog(product_id=async_sample_product.id, success=True, scraped_at=now),
+            ]
+        )
+        await async_session.commit()
+        calculator = StoreHealthCalculator()
+
+        report = await calculator.calculate_all_health_async(async_session)
+        assert report.store_health[0].total_scrapes == 2
+
+        # Deleting the older log leaves the newest id and timestamp unchanged
+        await purge(async_session, ScrapeLog, ScrapeLog.scraped_at, now - timedelta(hours=1))
+        report = await calculator.calculate_all_health_async(async_session)
+        assert report.store_health[0].total_scrapes == 1
+
     def test_update_store_health(self, test_session, sample_store, sample_product):
         """Test update_store_health updates database."""
         calculator = StoreHealthCalculator()
@@ -481,6 +868,62 @@ class TestStoreHealthCalculator:
         # Success rate should be updated (1.0 for no failures)
         assert sample_store.success_rate is not None
 
+    def test_update_all_health(self, test_session, sample_store, sample_product):
+        """Test update_all_health writes each store's success rate."""
+        other = Store(domain="other.example.com", name="Other Store", is_active=True)
+        test_session.add(other)
+        failing = Product(
+            url="https://other.example.com/product/1",
+            store_domain=other.domain,
+            name="Other Product",
+        )
+        test_session.add(failing)
+        test_session.commit()
+        for i in range(10):
+            test_session.add(ScrapeLog(product_id=failing.id, success=i < 2))
+        test_session.commit()
+
+        calculator = StoreHealthCalculator()
+        assert calculator.update_all_health(test_session) == 2
+
+        assert sample_store.success_rate == 1.0
+        assert other.success_rate == 0.2
+
+    def test_record_scrape_success_bulk(self, test_session, sample_store):
+        """Test record_scrape_success_bulk stamps every listed store."""
+        other = Store(domain="other.example.com", name="Other Store")
+        idle = Store(domain="idle.example.com", name="Idle Store")
+        test_session.add_all([other, idle])
+        test_session.commit()
+
+        calculator = StoreHealthCalculator()
+        calculator.record_scrape_success_bulk(
+            test_session, [sample_store.domain, other.domain, "missing.example.com"]
+        )
+
+        assert sample_store.last_success_at is not None
+        assert other.last_success_at == sample_store.last_success_at
+        assert idle.last_success_at is None
+
+    async def test_health_on_async_session(
+        self, async_session, async_sample_store, async_sample_product
+    ):
+        """Test the async wrappers run the calculations on an AsyncSession."""
+        for i in range(5):
+            async_session.add(ScrapeLog(product_id=async_sample_product.id, success=i > 0))
+        await async_session.flush()
+
+        calculator = StoreHealthCalculator()
+        health = await calculator.calculate_store_health_async(
+            async_session, async_sample_store.domain
+        )
+        report = await calculator.calculate_all_health_async(async_session)
+
+        assert health.total_products == 1
+        assert health.success_rate == 0.8
+        assert report.store_health == [health]
+        assert await calculator.calculate_store_health_async(async_session, "missing.com") is None
+
     def test_get_store_health_calculator_singleton(self):
         """Test get_store_health_calculator returns singleton."""
         calc1 = get_store_health_calculator()
@@ -522,7 +965,8 @@ class TestSelfHealingService:
         """Test run_healing_cycle with no products needing healing."""
         # Mock the dependencies
         mock_detector = MagicMock()
-        mock_detector.get_products_needing_healing.return_value = []
+        mock_detector.has_any_needing_healing = AsyncMock(return_value=True)
+        mock_detector.get_products_needing_healing = AsyncMock(return_value=[])
 
         with patch("src.healing.regenerator.settings") as mock_settings:
             mock_settings.primary_model = "test-model"
@@ -543,6 +987,314 @@ class TestSelfHealingService:
         assert report.total_products_checked == 0
         assert report.products_healed == 0
 
+    async def test_run_healing_cycle_skips_full_query_when_healthy(self, async_session):
+        """Test run_healing_cycle returns early when no product is failing."""
+        mock_detector = MagicMock()
+        mock_detector.has_any_needing_healing = AsyncMock(return_value=False)
+        mock_detector.get_products_needing_healing = AsyncMock()
+
+        service = SelfHealingService(
+            detector=mock_detector,
+            regenerator=MagicMock(),
+            scraper=MagicMock(),
+        )
+        report = await service.run_healing_cycle(async_session)
+
+        assert report.total_products_checked == 0
+        mock_detector.get_products_needing_healing.assert_not_awaited()
+
+    async def test_run_healing_cycle_stores_concurrently(self, async_session):
+        """Test that stores are fetched concurrently and regenerated in one batch."""
+        analyses = []
+        for i in range(3):
+            store = Store(domain=f"store{i}.example.com", name=f"Store {i}")
+            product = Product(
+                url=f"https://store{i}.example.com/p",
+                store_domain=store.domain,
+                name="Product",
+                status=ProductStatus.ERROR,
+            )
+            async_session.add_all([store, product])
+            await async_session.flush()
+            analyses.append(
+                FailureAnalysis(
+                    product_id=product.id,
+                    category=FailureCategory.PARSE_FAILURE,
+                    consecutive_failures=3,
+                    needs_healing=True,
+                    needs_attention=False,
+                )
+            )
+
+        in_flight = 0
+        peak = 0
+
+        async def scrape(url, validate_ssrf=True, return_raw=False):
+            nonlocal in_flight, peak
+            in_flight += 1
+            peak = max(peak, in_flight)
+            await asyncio.sleep(0.01)
+            in_flight -= 1
+            # Extraction failed, but the page came back
+            return MagicMock(success=False, raw_html="<html></html>")
+
+        mock_detector = MagicMock()
+        mock_detector.has_any_needing_healing = AsyncMock(return_value=True)
+        mock_detector.get_products_needing_healing = AsyncMock(return_value=analyses)
+        mock_regenerator = MagicMock(max_attempts=3)
+        mock_regenerator.regenerate_many = AsyncMock(
+            side_effect=lambda items: [
+                RegenerationResult(success=False, domain=domain, error="no match")
+                for domain, _, _ in items
+            ]
+        )
+        mock_scraper = MagicMock()
+        mock_scraper.scrape = scrape
+        mock_scraper.ensure_crawler = AsyncMock()
+
+        service = SelfHealingService(
+            detector=mock_detector,
+            regenerator=mock_regenerator,
+            scraper=mock_scraper,
+            store_concurrency=2,
+        )
+        report = await service.run_healing_cycle(async_session)
+
+        assert peak == 2
+        mock_scraper.ensure_crawler.assert_awaited_once()
+        mock_regenerator.regenerate_many.assert_awaited_once()
+        items = mock_regenerator.regenerate_many.await_args.args[0]
+        assert [html for _, html, _ in items] == ["<html></html>"] * 3
+        assert sorted(a.domain for a in report.attempts) == [
+            "store0.example.com",
+            "store1.example.com",
+            "store2.example.com",
+        ]
+        assert report.products_failed == 3
+
+    async def test_regenerate_stores_splits_batches(self):
+        """Test that stores are regenerated MAX_BATCH_SIZE per LLM call."""
+        mock_regenerator = MagicMock(max_attempts=3)
+        mock_regenerator.regenerate_many = AsyncMock(
+            side_effect=lambda items: [
+                RegenerationResult(success=True, domain=domain) for domain, _, _ in items
+            ]
+        )
+        runs = [
+            MagicMock(domain=f"store{i}.com", selectors=None) for i in range(MAX_BATCH_SIZE + 1)
+        ]
+
+        service = SelfHealingService(
+            detector=MagicMock(),
+            regenerator=mock_regenerator,
+            scraper=MagicMock(),
+        )
+        results = await service._regenerate_stores([(run, "<html></html>") for run in runs])
+
+        assert [len(call.args[0]) for call in mock_regenerator.regenerate_many.await_args_list] == [
+            MAX_BATCH_SIZE,
+            1,
+        ]
+        assert set(results) == {run.domain for run in runs}
+
+    async def test_run_healing_cycle_flags_store_products_for_attention(
+        self, async_session, caplog
+    ):
+        """Test that a store's last failed attempt flags all its products."""
+        store = Store(domain="flag.example.com", name="Flag Store")
+        async_session.add(store)
+        products = [
+            Product(
+                url=f"https://flag.example.com/p{i}",
+                store_domain=store.domain,
+                name="Product",
+                status=ProductStatus.ERROR,
+            )
+            for i in range(3)
+        ]
+        async_session.add_all(products)
+        await async_session.flush()
+        analyses = [
+            FailureAnalysis(
+                product_id=product.id,
+                category=FailureCategory.PARSE_FAILURE,
+                consecutive_failures=3,
+                needs_healing=True,
+                needs_attention=False,
+            )
+            for product in products
+        ]
+
+        mock_detector = MagicMock()
+        mock_detector.has_any_needing_healing = AsyncMock(return_value=True)
+        mock_detector.get_products_needing_healing = AsyncMock(return_value=analyses)
+        mock_scraper = MagicMock()
+        mock_scraper.scrape = AsyncMock(
+            return_value=MagicMock(success=False, raw_html="<html></html>")
+        )
+        mock_scraper.ensure_crawler = AsyncMock()
+
+        mock_regenerator = MagicMock(max_attempts=3)
+        mock_regenerator.regenerate_many = AsyncMock(
+            return_value=[RegenerationResult(success=False, domain=store.domain, error="no match")]
+        )
+
+        service = SelfHealingService(
+            detector=mock_detector,
+            regenerator=mock_regenerator,
+            scraper=mock_scraper,
+        )
+        service._healing_attempts[products[0].id] = 2
+
+        with caplog.at_level("DEBUG", logger="src.healing.service"):
+            report = await service.run_healing_cycle(async_session)
+
+        assert report.products_flagged_attention == 3
+        # One summary record for the whole cycle
+        assert len(caplog.records) == 1
+        assert caplog.records[0].report["products_flagged_attention"] == 3
+        for product in products:
+            await async_session.refresh(product)
+            assert product.status == ProductStatus.NEEDS_ATTENTION
+
+    async def test_regenerate_store_reuses_recent_html(self):
+        """Test that a page fetched for healing is reused within the cache TTL."""
+        mock_scraper = MagicMock()
+        mock_scraper.scrape = AsyncMock(
+            return_value=MagicMock(success=False, raw_html="<html></html>")
+        )
+        mock_regenerator = MagicMock(max_attempts=3)
+        mock_regenerator.regenerate = AsyncMock(
+            return_value=RegenerationResult(success=False, domain="test.com")
+        )
+        run = MagicMock(domain="test.com", selectors=None, attempt_number=1)
+        run.product.url = "https://test.com/p"
+
+        service = SelfHealingService(
+            detector=MagicMock(),
+            regenerator=mock_regenerator,
+            scraper=mock_scraper,
+        )
+        await service._regenerate_store(run)
+        await service._regenerate_store(run)
+        assert mock_scraper.scrape.await_count == 1
+        assert mock_regenerator.regenerate.await_count == 2
+
+        service.html_cache_ttl = 0
+        await service._regenerate_store(run)
+        assert mock_scraper.scrape.await_count == 2
+
+    async def test_successful_healing_scrape_skips_regeneration(self, async_session):
+        """Test that a store whose scrape works again is not regenerated."""
+        store = Store(domain="recovered.example.com", name="Recovered")
+        product = Product(
+            url="https://recovered.example.com/p",
+            store_domain=store.domain,
+            name="Product",
+            consecutive_failures=3,
+            status=ProductStatus.ERROR,
+        )
+        async_session.add_all([store, product])
+        await async_session.flush()
+        analysis = FailureAnalysis(
+            product_id=product.id,
+            category=FailureCategory.PARSE_FAILURE,
+            consecutive_failures=3,
+            needs_healing=True,
+            needs_attention=False,
+        )
+
+        mock_scraper = MagicMock()
+        mock_scraper.scrape = AsyncMock(
+            return_value=MagicMock(success=True, raw_html="<html></html>")
+        )
+        mock_scraper.ensure_crawler = AsyncMock()
+        mock_regenerator = MagicMock(max_attempts=3)
+        mock_regenerator.regenerate_many = AsyncMock()
+
+        service = SelfHealingService(
+            detector=FailureDetector(),
+            regenerator=mock_regenerator,
+            scraper=mock_scraper,
+        )
+        service.detector.has_any_needing_healing = AsyncMock(return_value=True)
+        service.detector.get_products_needing_healing = AsyncMock(return_value=[analysis])
+
+        report = await service.run_healing_cycle(async_session)
+
+        mock_regenerator.regenerate_many.assert_not_awaited()
+        assert report.products_failed == 0
+        await async_session.refresh(product)
+        assert product.consecutive_failures == 0
+        assert product.status == ProductStatus.ACTIVE
+
+    async def test_check_store_health_flags_failing_stores(self, async_session):
+        """Test that stores with over half their products failing are flagged."""
+        for domain, statuses in (
+            ("bad.example.com", (ProductStatus.ERROR, ProductStatus.NEEDS_ATTENTION, None)),
+            ("ok.example.com", (ProductStatus.ERROR, None, None)),
+        ):
+            async_session.add(Store(domain=domain, name=domain))
+            for i, status in enumerate(statuses):
+                async_session.add(
+                    Product(
+                        url=f"https://{domain}/p{i}",
+                        store_domain=domain,
+                        name="Product",
+                        status=status or ProductStatus.ACTIVE,
+                    )
+                )
+        await async_session.flush()
+
+        service = SelfHealingService(
+            detector=MagicMock(),
+            regenerator=MagicMock(),
+            scraper=MagicMock(),
+        )
+        report = HealingReport()
+        await service._check_store_health(async_session, report)
+
+        assert report.stores_flagged_attention == ["bad.example.com"]
+
+    @pytest.mark.asyncio
+    async def test_event_worker_heals_queued_products(self):
+        """Test that the event worker heals products from the detector queue."""
+        detector = FailureDetector()
+        service = SelfHealingService(
+            detector=detector,
+            regenerator=MagicMock(),
+            scraper=MagicMock(),
+        )
+        healed = asyncio.Event()
+
+        async def heal(session, product_id):
+            healed.set()
+            return HealingAttempt(
+                product_id=product_id, domain="test.com", success=True, attempt_number=1
+            )
+
+        service.heal_single_product = AsyncMock(side_effect=heal)
+        session = AsyncMock()
+        session_factory = MagicMock()
+        session_factory.return_value.__aenter__.return_value = session
+
+        service.start_event_worker(session_factory)
+        assert service.is_listening
+        assert detector.publish_events
+
+        # Products a healing cycle is already working on are skipped
+        service._healing_in_progress.add(7)
+        detector.healing_queue.put_nowait(7)
+        detector.healing_queue.put_nowait(42)
+        await asyncio.wait_for(healed.wait(), 1)
+
+        service.heal_single_product.assert_awaited_once_with(session, 42)
+        assert service._healing_in_progress == {7}
+
+        await service.stop_event_worker()
+        assert not service.is_listening
+        assert not detector.publish_events
+
     def test_reset_healing_attempts(self):
         """Test reset_healing_attempts clears counters."""
         # Mock the dependencies
@@ -585,25 +1337,25 @@ class TestSelfHealingService:
 class TestHealingIntegration:
     """Integration tests for healing module."""
 
-    def test_detector_to_service_flow(self, test_session, sample_store, failing_product):
+    async def test_detector_to_service_flow(self, async_session, async_failing_product):
         """Test flow from detector to service."""
         # Add scrape log
         log = ScrapeLog(
-            product_id=failing_product.id,
+            product_id=async_failing_product.id,
             success=False,
             error_type=ScrapeErrorType.PARSE_FAILURE,
         )
-        test_session.add(log)
-        test_session.commit()
+        async_session.add(log)
+        await async_session.flush()
 
         # Detect failing products
         detector = FailureDetector()
-        analyses = detector.get_products_needing_healing(test_session)
+        analyses = await detector.get_products_needing_healing(async_session)
 
         assert len(analyses) >= 1
 
         # Check analysis
-        analysis = next(a for a in analyses if a.product_id == failing_product.id)
+        analysis = next(a for a in analyses if a.product_id == async_failing_product.id)
         assert analysis.needs_healing
         assert analysis.category == FailureCategory.PARSE_FAILURE
 
@@ -3,14 +3,21 @@ Phase 1 tests - Foundation verification.
 Tests database models, core utilities, and security functions.
 """
 
+import asyncio
+from contextlib import asynccontextmanager
+from datetime import datetime, timedelta
+
 import pytest
+from sqlalchemy import func, inspect, select, text
 
 from config.settings import Settings
+from src.core.cache import Freshness, classify, get_or_refresh
 from src.core.constants import P0_STORES, STORE_CATEGORIES
 from src.core.exceptions import (
     InvalidURLError,
     PerpeeError,
     PrivateIPError,
+    RateLimitError,
     UnsupportedStoreError,
 )
 from src.core.security import (
@@ -25,15 +32,25 @@ from src.core.security import (
     validate_url,
     validate_whitelisted_url,
 )
+from src.database import repository
 from src.database.models import (
+    ACTIVE_PRODUCT_WHERE,
+    ACTIVE_STORE_WHERE,
+    FAILED_SCRAPE_WHERE,
+    NEEDS_ATTENTION_WHERE,
     Alert,
     AlertType,
     ExtractionStrategy,
     PriceHistory,
     Product,
     ProductStatus,
+    ScrapeLog,
     Store,
+    url_hash,
 )
+from src.database.retention import purge
+from src.database.scrape_log_batcher import ScrapeLogBatcher
+from src.database.session import STATEMENT_CACHE_SIZE, engine_options
 
 
 class TestSettings:
@@ -52,6 +69,15 @@ class TestSettings:
         assert settings.max_scrapes_per_minute == 10
         assert settings.conversation_window_size == 15
 
+    def test_engine_options_per_backend(self):
+        """Test that pool and statement cache options match the backend."""
+        sqlite = engine_options("sqlite+aiosqlite:///./data/perpee.db")
+        postgres = engine_options("postgresql+asyncpg://perpee@localhost/perpee")
+
+        assert sqlite == {"connect_args": {"cached_statements": STATEMENT_CACHE_SIZE}}
+        assert postgres["pool_pre_ping"] is True
+        assert postgres["connect_args"]["statement_cache_size"] == STATEMENT_CACHE_SIZE
+
 
 class TestDatabaseModels:
     """Test database model definitions."""
@@ -132,6 +158,440 @@ class TestDatabaseModels:
         assert history.original_price == 129.99
 
 
+class TestProductURLHash:
+    """Test hashed product URL lookups."""
+
+    async def test_url_hash_populated_on_insert(self, async_session, sample_product):
+        """Test that url_hash is filled in from the URL."""
+        assert sample_product.url_hash == url_hash(sample_product.url)
+
+    async def test_get_product_by_url(self, async_session, sample_product):
+        """Test lookup by URL through the hash index."""
+        found = await repository.get_product_by_url(async_session, sample_product.url)
+        missing = await repository.get_product_by_url(async_session, "https://amazon.ca/dp/X")
+
+        assert found is not None and found.id == sample_product.id
+        assert missing is None
+
+
+class TestUpsertStore:
+    """Test single-statement store upsert."""
+
+    async def test_upsert_inserts_then_updates(self, async_session):
+        """Test that upsert creates a store, then updates only the given fields."""
+        created = await repository.upsert_store(
+            async_session,
+            Store(domain="bestbuy.ca", name="Best Buy", selectors={"price": ".price"}),
+        )
+        updated = await repository.upsert_store(
+            async_session,
+            Store(domain="bestbuy.ca", name="Best Buy Canada", rate_limit_rpm=5),
+        )
+
+        assert created.domain == updated.domain == "bestbuy.ca"
+        assert updated.name == "Best Buy Canada"
+        assert updated.rate_limit_rpm == 5
+        assert updated.selectors == {"price": ".price"}
+        count = await async_session.execute(select(func.count()).select_from(Store))
+        assert count.scalar_one() == 1
+
+
+class TestServerGeneratedValues:
+    """Test that inserts return server-generated values without a refresh."""
+
+    async def test_create_populates_id_and_timestamps(self, async_session, sample_product):
+        """Test that id and timestamps are loaded by the INSERT itself."""
+        log = await repository.add_scrape_log(
+            async_session, ScrapeLog(product_id=sample_product.id, success=True)
+        )
+        alert = await repository.create(
+            async_session,
+            Alert(product_id=sample_product.id, alert_type=AlertType.ANY_CHANGE),
+        )
+
+        for obj, attrs in ((log, ("id", "scraped_at")), (alert, ("id", "created_at"))):
+            state = inspect(obj)
+            assert not state.expired_attributes
+            assert all(getattr(obj, attr) is not None for attr in attrs)
+
+
+class TestProductFailureCounters:
+    """Test single-statement failure counter updates."""
+
+    async def test_increment_then_reset(self, async_session, sample_product):
+        """Test that failures escalate status and reset restores it."""
+        created_updated_at = sample_product.updated_at
+
+        for _ in range(3):
+            product = await repository.increment_product_failures(async_session, sample_product)
+
+        assert product.consecutive_failures == 3
+        assert product.status == ProductStatus.NEEDS_ATTENTION
+        assert product.updated_at >= created_updated_at
+
+        product = await repository.reset_product_failures(async_session, product)
+
+        assert product.consecutive_failures == 0
+        assert product.status == ProductStatus.ACTIVE
+        assert product.last_checked_at is not None
+
+
+class TestStreaming:
+    """Test streaming query helpers."""
+
+    async def test_iter_products_needing_attention(self, async_session, sample_store):
+        """Test that streaming yields every matching product."""
+        for i, status in enumerate(
+            [ProductStatus.NEEDS_ATTENTION, ProductStatus.PRICE_UNAVAILABLE, ProductStatus.ACTIVE]
+        ):
+            async_session.add(
+                Product(
+                    url=f"https://amazon.ca/dp/{i}",
+                    store_domain=sample_store.domain,
+                    name=f"Product {i}",
+                    status=status,
+                )
+            )
+        await async_session.flush()
+
+        streamed = [p async for p in repository.iter_products_needing_attention(async_session)]
+        listed = await repository.get_products_needing_attention(async_session)
+        limited = await repository.get_products_needing_attention(async_session, limit=1)
+
+        assert len(streamed) == 2
+        assert ProductStatus.ACTIVE not in {p.status for p in streamed}
+        assert {p.id for p in listed} == {p.id for p in streamed}
+        assert len(limited) == 1
+
+
+class TestPartialIndexes:
+    """Test that queries are matched to the partial indexes."""
+
+    async def test_active_products_use_partial_index(self, async_session, sample_product):
+        """Test that the active-product page is matched to the partial index."""
+        products, _ = await repository.get_active_products(async_session)
+        plan = await _query_plan(
+            async_session, select(Product).where(ACTIVE_PRODUCT_WHERE).order_by(Product.id)
+        )
+
+        assert [product.id for product in products] == [sample_product.id]
+        assert "ix_products_active" in plan
+
+    async def test_needing_attention_uses_partial_index(self, async_session, sample_product):
+        """Test that the attention query is matched to the partial index."""
+        sample_product.status = ProductStatus.NEEDS_ATTENTION
+        await async_session.flush()
+
+        products = await repository.get_products_needing_attention(async_session)
+        plan = await _query_plan(async_session, select(Product.id).where(NEEDS_ATTENTION_WHERE))
+
+        assert [product.id for product in products] == [sample_product.id]
+        assert "ix_products_attention" in plan
+
+    async def test_needing_attention_columns_use_partial_index(self, async_session, sample_product):
+        """Test that a column projection returns rows via the partial index."""
+        sample_product.status = ProductStatus.NEEDS_ATTENTION
+        await async_session.flush()
+        columns = [Product.id, Product.url, Product.status]
+
+        rows = await repository.get_products_needing_attention(async_session, columns=columns)
+        plan = await _query_plan(async_session, select(*columns).where(NEEDS_ATTENTION_WHERE))
+
+        assert [tuple(row) for row in rows] == [
+            (sample_product.id, sample_product.url, ProductStatus.NEEDS_ATTENTION)
+        ]
+        assert "ix_products_attention" in plan
+
+    async def test_whitelisted_stores_use_partial_index(self, async_session, sample_store):
+        """Test that inactive stores are excluded via the partial index."""
+        async_session.add(
+            Store(domain="closed.ca", name="Closed", is_whitelisted=True, is_active=False)
+        )
+        await async_session.flush()
+
+        stores = await repository.get_whitelisted_stores(async_session)
+        plan = await _query_plan(async_session, select(Store.domain).where(ACTIVE_STORE_WHERE))
+
+        assert [store.domain for store in stores] == [sample_store.domain]
+        assert "ix_stores_active" in plan
+
+    async def test_failed_scrape_lookup_uses_partial_index(self, async_session, sample_product):
+        """Test that the latest-failure lookup is matched to the partial index."""
+        plan = await _query_plan(
+            async_session,
+            select(ScrapeLog)
+            .where(ScrapeLog.product_id == sample_product.id, FAILED_SCRAPE_WHERE)
+            .order_by(ScrapeLog.scraped_at.desc()),
+        )
+
+        assert "ix_scrape_logs_product_failed" in plan
+
+    async def test_predicates_are_unambiguous_in_joins(self, async_session, sample_product):
+        """Test that the predicates name their table when joined with alerts."""
+        sample_product.status = ProductStatus.PRICE_UNAVAILABLE
+        async_session.add(Alert(product_id=sample_product.id, alert_type=AlertType.ANY_CHANGE))
+        await async_session.flush()
+
+        result = await async_session.execute(
+            select(Alert.id)
+            .join(Product, Alert.product_id == Product.id)
+            .join(Store, Product.store_domain == Store.domain)
+            .where(NEEDS_ATTENTION_WHERE, ACTIVE_STORE_WHERE, Alert.deleted_at.is_(None))
+        )
+
+        assert len(result.all()) == 1
+
+
+async def _query_plan(session, stmt) -> str:
+    """SQLite's query plan for stmt, with parameters rendered inline."""
+    sql = stmt.compile(session.bind, compile_kwargs={"literal_binds": True})
+    result = await session.execute(text(f"EXPLAIN QUERY PLAN {sql}"))
+    return " ".join(str(row[-1]) for row in result)
+
+
+class TestStoreStats:
+    """Test store statistics query."""
+
+    async def test_store_stats_counts(self, async_session, sample_store, sample_product):
+        """Test product and active alert counts for a store."""
+        async_session.add(Alert(product_id=sample_product.id, alert_type=AlertType.ANY_CHANGE))
+        async_session.add(
+            Alert(
+                product_id=sample_product.id,
+                alert_type=AlertType.BACK_IN_STOCK,
+                is_active=False,
+            )
+        )
+        await async_session.flush()
+
+        stats = await repository.get_store_stats(async_session, sample_store.domain)
+
+        assert stats == {"product_count": 1, "alert_count": 1}
+
+    async def test_product_count_estimate(self, async_session, sample_product, monkeypatch):
+        """Test exact fallback without statistics and estimate after ANALYZE."""
+        deleted = Product(
+            url="https://www.amazon.ca/dp/B0DELETED",
+            store_domain=sample_product.store_domain,
+            name="Deleted Product",
+            deleted_at=datetime.utcnow(),
+        )
+        async_session.add(deleted)
+        await async_session.flush()
+
+        # No statistics yet: exact count of non-deleted products
+        assert await repository.get_product_count_estimate(async_session) == 1
+
+        await async_session.execute(text("ANALYZE"))
+        # Small table: still counted exactly
+        assert await repository.get_product_count_estimate(async_session) == 1
+
+        # Above the threshold the statistics are used, deleted rows included
+        monkeypatch.setattr(repository, "EXACT_COUNT_THRESHOLD", 0)
+        assert await repository.get_product_count_estimate(async_session) == 2
+
+
+class TestUpdate:
+    """Test single-statement update by primary key."""
+
+    async def test_update_by_pk(self, async_session, sample_product):
+        """Test that known fields are updated and unknown keys ignored."""
+        product = await repository.update(
+            async_session,
+            Product,
+            sample_product.id,
+            {"name": "Renamed", "current_price": 79.99, "not_a_column": 1},
+        )
+
+        assert product is sample_product
+        assert product.name == "Renamed"
+        assert product.current_price == 79.99
+
+    async def test_update_missing_record(self, async_session):
+        """Test that updating a missing record returns None."""
+        assert await repository.update(async_session, Product, 99999, {"name": "x"}) is None
+
+    async def test_update_skips_soft_deleted(self, async_session, sample_product):
+        """Test that a soft-deleted record is not updated unless asked."""
+        sample_product.deleted_at = datetime.utcnow()
+        await async_session.flush()
+
+        assert (
+            await repository.update(async_session, Product, sample_product.id, {"name": "x"})
+            is None
+        )
+        assert await repository.update(async_session, Product, sample_product.id, {}) is None
+        product = await repository.update(
+            async_session, Product, sample_product.id, {"name": "x"}, include_deleted=True
+        )
+        assert product.name == "x"
+
+    async def test_update_without_values(self, async_session, sample_product):
+        """Test that an empty update returns the record unchanged."""
+        product = await repository.update(async_session, Product, sample_product.id, {})
+
+        assert product is sample_product
+        assert product.name == sample_product.name
+
+
+class TestBatchFetch:
+    """Test multi-key fetch helpers."""
+
+    async def test_get_products_by_ids(self, async_session, sample_product):
+        """Test that products are keyed by id and missing ids are skipped."""
+        products = await repository.get_products_by_ids(
+            async_session, [sample_product.id, sample_product.id, 99999]
+        )
+
+        assert list(products) == [sample_product.id]
+        assert await repository.get_products_by_ids(async_session, []) == {}
+
+    async def test_get_stores_by_domains(self, async_session, sample_store):
+        """Test that stores are keyed by domain."""
+        stores = await repository.get_stores_by_domains(
+            async_session, [sample_store.domain, "unknown.ca"]
+        )
+
+        assert stores == {sample_store.domain: sample_store}
+
+
+class TestKeysetPagination:
+    """Test cursor-based pagination in the repository."""
+
+    async def test_price_history_pages_without_gaps_or_repeats(self, async_session, sample_product):
+        """Test paging through rows that share a timestamp."""
+        tied = datetime(2026, 1, 1, 12, 0, 0)
+        for price in (10.0, 11.0, 12.0):
+            async_session.add(
+                PriceHistory(product_id=sample_product.id, price=price, scraped_at=tied)
+            )
+        # Server-side timestamps must compare correctly with Python ones
+        for price in (13.0, 14.0):
+            async_session.add(PriceHistory(product_id=sample_product.id, price=price))
+        await async_session.flush()
+
+        seen = []
+        cursor = None
+        while True:
+            page, cursor = await repository.get_price_history(
+                async_session, sample_product.id, cursor=cursor, limit=2
+            )
+            seen.extend(page)
+            if cursor is None:
+                break
+
+        assert len({h.id for h in seen}) == len(seen) == 5
+        keys = [(h.scraped_at, h.id) for h in seen]
+        assert keys == sorted(keys, reverse=True)
+
+    async def test_get_all_returns_next_cursor(self, async_session, sample_store):
+        """Test that get_all pages in id order and ends with no cursor."""
+        for i in range(3):
+            async_session.add(
+                Product(
+                    url=f"https://amazon.ca/dp/{i}",
+                    store_domain=sample_store.domain,
+                    name=f"Product {i}",
+                )
+            )
+        await async_session.flush()
+
+        first, cursor = await repository.get_all(async_session, Product, limit=2)
+        second, end = await repository.get_all(async_session, Product, cursor=cursor, limit=2)
+
+        assert [p.id for p in first + second] == sorted(p.id for p in first + second)
+        assert len(first) == 2 and len(second) == 1
+        assert end is None
+
+
+class TestBulkInserts:
+    """Test multi-row insert helpers."""
+
+    async def test_bulk_add_price_history(self, async_session, sample_product):
+        """Test that all rows are inserted and timestamps default server-side."""
+        records = [{"product_id": sample_product.id, "price": p} for p in (9.99, 19.99, 29.99)]
+
+        inserted = await repository.bulk_add_price_history(async_session, records)
+
+        assert inserted == 3
+        history, _ = await repository.get_price_history(async_session, sample_product.id)
+        assert sorted(h.price for h in history) == [9.99, 19.99, 29.99]
+        assert all(h.scraped_at is not None for h in history)
+
+    async def test_bulk_add_empty(self, async_session):
+        """Test that an empty batch is a no-op."""
+        assert await repository.bulk_add_scrape_logs(async_session, []) == 0
+
+
+class TestRetention:
+    """Test batched retention cleanup."""
+
+    async def test_purge_deletes_old_rows_in_batches(self, async_session, sample_product):
+        """Test that purge removes only rows older than the cutoff."""
+        now = datetime.utcnow()
+        for days_old in (1, 40, 50, 60, 70, 80):
+            async_session.add(
+                ScrapeLog(
+                    product_id=sample_product.id,
+                    success=True,
+                    scraped_at=now - timedelta(days=days_old),
+                )
+            )
+        await async_session.flush()
+
+        cutoff = now - timedelta(days=30)
+        deleted = await purge(async_session, ScrapeLog, ScrapeLog.scraped_at, cutoff, batch_size=2)
+
+        assert deleted == 5
+        remaining = await async_session.execute(select(func.count()).select_from(ScrapeLog))
+        assert remaining.scalar_one() == 1
+
+    async def test_product_delete_cascades_to_children(
+        self, async_session, sample_product, sample_alert
+    ):
+        """Test that deleting a product removes its child rows in the database."""
+        async_session.add(PriceHistory(product_id=sample_product.id, price=99.99))
+        async_session.add(ScrapeLog(product_id=sample_product.id, success=True))
+        await async_session.flush()
+
+        await async_session.delete(sample_product)
+        await async_session.flush()
+
+        for model in (Alert, PriceHistory, ScrapeLog):
+            count = await async_session.execute(select(func.count()).select_from(model))
+            assert count.scalar_one() == 0
+
+
+class TestScrapeLogBatcher:
+    """Test batched scrape log writes."""
+
+    async def test_stop_writes_queued_logs(self, async_session, sample_product):
+        """Test that queued logs are written in batches and drained on stop."""
+        batch_sizes = []
+
+        @asynccontextmanager
+        async def session_factory():
+            yield async_session
+
+        batcher = ScrapeLogBatcher(batch_size=2, flush_interval=60, session_factory=session_factory)
+        original_write = batcher._write
+
+        async def record_write(rows):
+            batch_sizes.append(len(rows))
+            await original_write(rows)
+
+        batcher._write = record_write
+
+        for _ in range(5):
+            await batcher.emit(ScrapeLog(product_id=sample_product.id, success=True))
+        await batcher.stop()
+
+        assert not batcher.is_running
+        assert sorted(batch_sizes) == [1, 2, 2]
+        count = await async_session.execute(select(func.count()).select_from(ScrapeLog))
+        assert count.scalar_one() == 5
+
+
 class TestURLValidation:
     """Test URL validation functions."""
 
@@ -286,6 +746,19 @@ class TestPriceNormalization:
         """Test price with thousand separators."""
         assert normalize_price("$1,234.56") == 1234.56
 
+    def test_price_range(self):
+        """Test price range takes the lower price."""
+        assert normalize_price("$10.99 - $20.99") == 10.99
+
+    def test_negative_price(self):
+        """Test a negative price is rejected rather than read as a range."""
+        assert normalize_price("-5") is None
+        assert normalize_price("$-5.00") is None
+
+    def test_comma_is_thousands_separator(self):
+        """Test every comma is dropped as a thousands separator."""
+        assert normalize_price("12,99") == 1299
+
     def test_invalid_price(self):
         """Test invalid price returns None."""
         assert normalize_price("not a price") is None
@@ -299,6 +772,45 @@ class TestPriceNormalization:
         assert validate_price(-10.00) is False
 
 
+class TestStaleWhileRevalidate:
+    """Test stale-while-revalidate freshness decisions."""
+
+    def test_classify(self):
+        """Test freshness windows."""
+        now = datetime.utcnow()
+
+        assert classify(now - timedelta(minutes=5), 3600, 86400, now) == Freshness.FRESH
+        assert classify(now - timedelta(hours=2), 3600, 86400, now) == Freshness.STALE
+        assert classify(now - timedelta(days=2), 3600, 86400, now) == Freshness.EXPIRED
+        assert classify(None, 3600, 86400, now) == Freshness.EXPIRED
+
+    async def test_stale_value_served_while_refreshing(self):
+        """Test that a stale value is returned and refreshed once in the background."""
+        calls = []
+
+        async def refresh():
+            calls.append(1)
+            return 2
+
+        stale_at = datetime.utcnow() - timedelta(hours=2)
+        value, freshness = await get_or_refresh("key", 1, stale_at, refresh, 3600, 86400)
+        again, _ = await get_or_refresh("key", 1, stale_at, refresh, 3600, 86400)
+        await asyncio.sleep(0)
+
+        assert (value, again, freshness) == (1, 1, Freshness.STALE)
+        assert calls == [1]
+
+    async def test_expired_value_refreshed_first(self):
+        """Test that an expired value is refreshed before returning."""
+
+        async def refresh():
+            return 2
+
+        value, freshness = await get_or_refresh("expired", 1, None, refresh)
+
+        assert (value, freshness) == (2, Freshness.EXPIRED)
+
+
 class TestStoreConstants:
     """Test store constants."""
 
@@ -346,6 +858,13 @@ class TestExceptions:
         assert "SSRF detected" in str(error)
         assert error.details["ip"] == "127.0.0.1"
 
+    def test_exception_attributes_use_slots(self):
+        """Test that exception attributes are stored in slots, not __dict__."""
+        error = RateLimitError("scrapes", retry_after=30)
+        assert error.retry_after == 30
+        assert error.details["limit_type"] == "scrapes"
+        assert not {"message", "details", "limit_type", "retry_after"} & error.__dict__.keys()
+
 
 class TestStoreSeedData:
     """Test store seed data."""
@@ -11,7 +11,7 @@ import pytest
 from src.core.security import normalize_price
 from src.database.models import ExtractionStrategy
 from src.scraper.block_detection import BlockType, detect_block
-from src.scraper.rate_limiter import RateLimiter, RateLimitState
+from src.scraper.rate_limiter import RateLimiter, RateLimitState, TokenBucket
 from src.scraper.retry import ErrorCategory, RetryConfig, categorize_error
 from src.scraper.strategies import (
     CssSelectorStrategy,
@@ -333,6 +333,15 @@ class TestRateLimiter:
         assert stats["global"]["current"] == 1
         assert "test.com" in stats["stores"]
 
+    def test_token_bucket_empty_until_refill(self):
+        """Test that an empty bucket rejects until its next refill."""
+        bucket = TokenBucket(rate=1.0, capacity=2)
+
+        assert bucket.try_acquire()
+        assert bucket.try_acquire()
+        assert not bucket.try_acquire()
+        assert 0 < bucket.wait_time() <= 1.0
+
 
 # ===========================================
 # Block Detection Tests
@@ -459,6 +468,17 @@ class TestRetryLogic:
         assert config.should_retry(ErrorCategory.FORBIDDEN, 0)
         assert not config.should_retry(ErrorCategory.FORBIDDEN, 1)
 
+    def test_retry_config_delay_backoff(self):
+        """Test jittered exponential backoff delays."""
+        config = RetryConfig(backoff={"network_error": (2.0, 1.0, 3)})
+
+        for attempt in range(3):
+            delay = config.get_delay(ErrorCategory.NETWORK, attempt)
+            assert 2.0 * 2**attempt <= delay <= 2.0 * 2**attempt + 1.0
+
+        # Capped at the max delay
+        assert config.get_delay(ErrorCategory.NETWORK, 10) == 60.0
+
 
 # ===========================================
 # User Agent Tests
@@ -593,3 +613,82 @@ class TestScraperIntegration:
             assert "selectors" in config, f"Missing selectors for {domain}"
             assert "price" in config["selectors"], f"Missing price selector for {domain}"
             assert "name" in config["selectors"], f"Missing name selector for {domain}"
+
+    @pytest.mark.asyncio
+    async def test_ensure_crawler_starts_one_shared_browser(self):
+        """Test that concurrent callers share one started crawler."""
+        import asyncio
+        from unittest.mock import AsyncMock, patch
+
+        from src.scraper.engine import ScraperEngine
+
+        engine = ScraperEngine()
+        with patch("src.scraper.engine.AsyncWebCrawler") as mock_crawler_cls:
+            mock_crawler_cls.return_value.start = AsyncMock()
+            mock_crawler_cls.return_value.close = AsyncMock()
+
+            crawlers = await asyncio.gather(*(engine.ensure_crawler() for _ in range(3)))
+
+            assert all(c is crawlers[0] for c in crawlers)
+            mock_crawler_cls.return_value.start.assert_awaited_once()
+
+            await engine.close()
+            mock_crawler_cls.return_value.close.assert_awaited_once()
+            assert engine._crawler is None
+
+    @pytest.mark.asyncio
+    async def test_crashed_browser_is_restarted(self):
+        """Test that a scrape on a dead shared browser retries on a new one."""
+        from unittest.mock import AsyncMock, MagicMock, patch
+
+        from src.scraper.engine import ScraperConfig, ScraperEngine
+
+        dead = MagicMock()
+        dead.start = AsyncMock()
+        dead.close = AsyncMock(side_effect=RuntimeError("already closed"))
+        dead.arun = AsyncMock(
+            return_value=MagicMock(success=False, error_message="Browser has been closed")
+        )
+        fresh = MagicMock()
+        fresh.start = AsyncMock()
+        fresh.arun = AsyncMock(
+            return_value=MagicMock(success=False, error_message="net::ERR_NAME_NOT_RESOLVED")
+        )
+        engine = ScraperEngine(ScraperConfig(respect_robots=False, enable_retries=False))
+
+        with (
+            patch("src.scraper.engine.AsyncWebCrawler", side_effect=[dead, fresh]),
+            patch("src.scraper.engine.CrawlerRunConfig"),
+        ):
+            result = await engine.scrape("https://example.com/product", validate_ssrf=False)
+
+        # Retried once on the new browser, which is kept for later scrapes
+        assert "ERR_NAME_NOT_RESOLVED" in result.error_message
+        dead.close.assert_awaited_once()
+        fresh.arun.assert_awaited_once()
+        assert engine._crawler is fresh
+
+    @pytest.mark.asyncio
+    async def test_scrape_return_raw_keeps_html_on_parse_failure(self):
+        """Test that return_raw includes the page even when extraction fails."""
+        from unittest.mock import AsyncMock, MagicMock, patch
+
+        from src.database.models import ScrapeErrorType
+        from src.scraper.engine import ScraperConfig, ScraperEngine
+
+        html = "<html><body>" + "<p>No product data on this page.</p>" * 50 + "</body></html>"
+        crawler = MagicMock()
+        crawler.arun = AsyncMock(return_value=MagicMock(success=True, html=html, status_code=200))
+        engine = ScraperEngine(ScraperConfig(respect_robots=False, enable_retries=False))
+        engine.ensure_crawler = AsyncMock(return_value=crawler)
+
+        with patch("src.scraper.engine.CrawlerRunConfig"):
+            result = await engine.scrape(
+                "https://example.com/product", validate_ssrf=False, return_raw=True
+            )
+            assert not result.success
+            assert result.error_type == ScrapeErrorType.PARSE_FAILURE
+            assert result.raw_html == html
+
+            result = await engine.scrape("https://example.com/product", validate_ssrf=False)
+            assert result.raw_html is None